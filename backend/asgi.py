@@ -0,0 +1,65 @@
+# coding=utf-8
+import time
+from dotenv import dotenv_values
+
+from quart import Quart, Response, jsonify, g, request
+from quart_cors import cors
+
+def create_app() -> Quart:
+    """Create the asynchronous variant of the backend as an ASGI application, which offers the item and recipe routes of the Flask application but handles requests concurrently on one event loop instead of one thread per request.
+    Run it with an ASGI server, e.g., `hypercorn asgi:app --bind 0.0.0.0:5000`, or with several worker processes via `SERVER=asgi gunicorn --config gunicorn.conf.py`.
+
+    returns:
+      app -- the Quart application"""
+    # import the blueprints which handle the incoming data
+    from src.blueprints.asyncitemblueprint import async_item_blueprint
+    from src.blueprints.asyncrecipeblueprint import async_recipe_blueprint
+    from src.util import metrics
+
+    # create the Quart application and configure CORS for cross-origin resource sharing (between the frontend and backend)
+    app = cors(Quart('chef-backend'), allow_origin='*')
+
+    # register blueprints
+    app.register_blueprint(async_item_blueprint, url_prefix='/items')
+    app.register_blueprint(async_recipe_blueprint, url_prefix='/recipes')
+
+    # create the partitions of the recipe catalog at once, such that the workers of a pre-forking server share them (see wsgi.create_app)
+    from src.blueprints.asyncrecipeblueprint import controller
+    controller.catalog.prepare()
+
+    # optionally record the latency of the routes, controllers, and data access objects (see main.py), where requests are not profiled as a profiler does not follow the coroutines of a request
+    if metrics.enabled():
+        from src.util.asyncdao import AsyncDAO
+        from src.controllers.asynccontroller import AsyncController
+        from src.controllers.asyncrecipecontroller import AsyncRecipeController
+        metrics.instrument_dao(AsyncDAO, metrics.DAO_METHODS)
+        metrics.instrument_controller(AsyncController, ['create', 'create_many', 'get', 'get_all', 'update', 'bulk_update', 'delete'])
+        metrics.instrument_controller(AsyncRecipeController, ['get_available_items', 'get_readiness_of_recipes', 'score_recipes', 'get_recipe', 'get_top_recipes', 'get_recipe_by_name'])
+
+        @app.before_request
+        async def start_timer():
+            g.request_start = time.perf_counter()
+
+        @app.after_request
+        async def stop_timer(response):
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            metrics.request_duration.observe(time.perf_counter() - g.request_start, request.method, route, response.status_code)
+            return response
+
+    @app.route('/metrics')
+    async def get_metrics():
+        """Export the latency of the routes, controllers, and data access objects in the Prometheus text format (see main.py)."""
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4'), 200
+
+    @app.route('/')
+    async def ping():
+        """Heartbeat method to check if the server is running and which version is currently active.
+
+        returns:
+          version -- version string of the current backend version"""
+        VERSION = dotenv_values('.env').get('VERSION')
+        return jsonify({'version': VERSION}), 200
+
+    return app
+
+app = create_app()
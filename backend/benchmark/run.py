@@ -0,0 +1,175 @@
+# coding=utf-8
+"""Benchmark suite for the recipe recommendation and item CRUD hot paths.
+
+Run it from the backend folder with `python -m benchmark.run`. The suite generates synthetic recipe catalogs and pantries
+at several scales and writes the timings to a JSON file, which can be compared to the results of a previous run via
+`python -m benchmark.run --compare <previous results>`. No database is required, as the item collection is kept in
+memory (see MemoryCollection). The caches of the readiness, the pantries, and the responses are cleared before every
+repetition, such that the benchmarks measure the computation of a result rather than a cache hit, unless the name of a
+benchmark says otherwise."""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+# the benchmark has to be started from the backend folder, as the application reads its static files relative to it
+sys.path.insert(0, os.getcwd())
+
+from src.util import dao
+from src.util.httpcache import response_cache
+from src.static.diets import Diet
+from src.util.calculator import calculate_readiness
+from src.util.catalog import RecipeCatalog
+
+scales = {
+    'quick': {'recipes': [10, 1000], 'items': [10, 1000]},
+    'full': {'recipes': [10, 1000, 100000], 'items': [10, 1000, 100000]}
+}
+
+def load(collection, documents: list[dict]):
+    """Replace the content of the in-memory item collection by the given documents."""
+    collection.drop()
+    collection.insert_many(documents)
+    dao.snapshot_cache.invalidate('item')
+
+def generate_ingredients(count: int) -> list[str]:
+    return [f'Ingredient {i}' for i in range(count)]
+
+def generate_recipes(count: int, rng: random.Random) -> list[dict]:
+    """Generate a synthetic recipe catalog, where every recipe requires 3 to 12 ingredients from a vocabulary that grows with the catalog."""
+    ingredients = generate_ingredients(max(50, count // 10))
+    diets = [['normal'], ['normal', 'vegetarian'], ['normal', 'vegetarian', 'vegan']]
+    return [{
+        'name': f'Recipe {i}',
+        'diets': rng.choice(diets),
+        'ingredients': {ingredient: rng.randint(1, 500) for ingredient in rng.sample(ingredients, rng.randint(3, 12))}
+    } for i in range(count)]
+
+def generate_items(count: int, recipe_count: int, rng: random.Random) -> list[dict]:
+    """Generate a synthetic pantry of BSON documents, of which some match ingredients of the recipe catalog."""
+    ingredients = generate_ingredients(max(50, recipe_count // 10))
+    return [{
+        '_id': ObjectId(),
+        'name': ingredients[i] if i < len(ingredients) else f'Item {i}',
+        'quantity': float(rng.randint(0, 1000)),
+        'unit': rng.choice(['gram', 'milliliter', 'pack'])
+    } for i in range(count)]
+
+def clear_caches(controller):
+    """Forget the readiness, the available items, and the responses cached by the application, whereas the snapshot of the item collection is kept, as it stays valid until the collection changes."""
+    controller.readiness_cache.clear()
+    controller.pantries.clear()
+    response_cache.reset()
+
+def measure(function, repeat: int, setup=None) -> dict:
+    """Call a function repeatedly and summarize the durations in milliseconds, where setup is called before every call without being measured."""
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': min(durations),
+        'median_ms': statistics.median(durations),
+        'mean_ms': statistics.mean(durations)
+    }
+
+def repetitions(size: int) -> int:
+    return max(3, min(100, 100000 // max(size, 1)))
+
+def run(scale: str, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    results = []
+
+    def record(name: str, recipes: int, items: int, function, repeat: int, cached: bool = False):
+        result = {'benchmark': name, 'recipes': recipes, 'items': items, **measure(function, repeat, None if cached else lambda: clear_caches(recipe_controller))}
+        results.append(result)
+        print(f"{name:<40} recipes={recipes:<7} items={items:<7} median={result['median_ms']:10.3f} ms")
+
+    # the routes obtain their DAO via getDao, hence the storage backend has to be selected before the application is imported
+    os.environ['STORAGE_BACKEND'] = 'memory'
+    collection = dao.getDao('item').collection
+    from main import app
+    from src.blueprints.recipeblueprint import controller as recipe_controller
+    client = app.test_client()
+
+    for item_count in scales[scale]['items']:
+        documents = generate_items(item_count, item_count, rng)
+        record('DAO.to_json', 0, item_count, lambda: [dao.bson_to_json(document) for document in documents], repetitions(item_count))
+
+        load(collection, documents)
+        record('GET /items/all', 0, item_count, lambda: client.get('/items/all'), repetitions(item_count))
+        record('GET /items/all?stream=ndjson', 0, item_count, lambda: client.get('/items/all?stream=ndjson').get_data(), repetitions(item_count))
+        record('GET /items/byid/<id>', 0, item_count, lambda: client.get(f"/items/byid/{documents[0]['_id']}"), 100)
+
+    record('POST /items/create', 0, 0, lambda: client.post('/items/create', data={'name': 'Flour', 'quantity': '1', 'unit': 'gram'}), 100)
+
+    for recipe_count in scales[scale]['recipes']:
+        recipes = generate_recipes(recipe_count, rng)
+        for item_count in scales[scale]['items']:
+            documents = generate_items(item_count, recipe_count, rng)
+            available_items = {document['name']: document['quantity'] for document in documents}
+            repeat = repetitions(recipe_count)
+
+            record('calculate_readiness', recipe_count, item_count, lambda: [calculate_readiness(recipe, available_items) for recipe in recipes], repetitions(recipe_count * 10))
+
+            # replace the recipes of the application by the synthetic catalog
+            load(collection, documents)
+            recipe_controller.set_catalog(RecipeCatalog(recipes))
+
+            record('get_readiness_of_recipes', recipe_count, item_count, lambda: recipe_controller.get_readiness_of_recipes(recipes=recipe_controller.recipes, diet=Diet.VEGETARIAN), repeat)
+            record('get_recipe', recipe_count, item_count, lambda: recipe_controller.get_recipe(diet=Diet.VEGETARIAN, take_best=True), repeat)
+            record('GET /recipes/', recipe_count, item_count, lambda: client.get('/recipes/', data={'diet': 'vegetarian', 'usage_mode': 'optimal'}), repeat)
+            record('GET /recipes/top?k=10', recipe_count, item_count, lambda: client.get('/recipes/top?k=10&diet=vegetarian'), repeat)
+            record('GET /recipes/top?k=10 (cached)', recipe_count, item_count, lambda: client.get('/recipes/top?k=10&diet=vegetarian'), repeat, cached=True)
+
+    return results
+
+def commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(results: list[dict], previous: list[dict]):
+    """Print the ratio of the median durations of the current and a previous run for all benchmarks contained in both."""
+    key = lambda result: (result['benchmark'], result['recipes'], result['items'])
+    previous_results = {key(result): result for result in previous}
+    for result in results:
+        if key(result) in previous_results:
+            ratio = result['median_ms'] / max(previous_results[key(result)]['median_ms'], 1e-9)
+            print(f"{result['benchmark']:<40} recipes={result['recipes']:<7} items={result['items']:<7} {ratio:6.2f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the recipe recommendation and item CRUD hot paths.')
+    parser.add_argument('--scale', choices=scales.keys(), default='quick', help='set of catalog and pantry sizes to benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--output', default='benchmark/results/benchmark-results.json', help='file to write the results to')
+    parser.add_argument('--compare', help='results of a previous run to compare to')
+    args = parser.parse_args()
+
+    results = run(args.scale, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'commit': commit(),
+            'date': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'scale': args.scale,
+            'results': results
+        }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
@@ -0,0 +1,35 @@
+# coding=utf-8
+# Configuration of the production server, to be started with `gunicorn --config gunicorn.conf.py` from the backend folder (see https://docs.gunicorn.org/en/stable/settings.html)
+import gc
+import multiprocessing
+
+from src.util.dao import getSetting, usesMemoryStorage
+from src.util.catalog import defer_watchers, start_deferred_watchers
+
+# serve the Flask application (wsgi) by default, or the Quart application (asgi) via uvicorn workers, where the module asgi already creates its application on import
+if getSetting('SERVER', 'wsgi').lower() == 'asgi':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'wsgi:create_app()'
+    worker_class = 'gthread'
+    threads = int(getSetting('WORKER_THREADS', 4))
+
+bind = f'{getSetting("FLASK_BIND_IP", "127.0.0.1")}:{getSetting("PORT", 5000)}'
+
+# the items of the memory storage backend are not shared between processes, hence it is only served by one worker
+workers = 1 if usesMemoryStorage() else int(getSetting('WORKERS', multiprocessing.cpu_count()))
+timeout = int(getSetting('WORKER_TIMEOUT', 30))
+
+# create the application (including the recipe catalog) in the master process, such that the workers share it copy-on-write
+preload_app = True
+
+# watch the recipe directory in every worker rather than in the master, which only manages the workers (see RECIPE_WATCH)
+defer_watchers()
+
+def when_ready(server):
+    # exclude all objects created so far from garbage collection, such that collections in the workers do not copy the pages of the shared objects (see https://docs.python.org/3/library/gc.html#gc.freeze)
+    gc.freeze()
+
+def post_fork(server, worker):
+    start_deferred_watchers()
@@ -2,7 +2,7 @@
 import os, json
 from dotenv import dotenv_values
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_cors import CORS, cross_origin
 
 # import the blueprints which handle the incoming data
@@ -21,8 +21,18 @@ app.config['CORS_HEADERS'] = 'Content-Type'
 app.register_blueprint(blueprint=item_blueprint, url_prefix='/items')
 app.register_blueprint(blueprint=recipe_blueprint, url_prefix='/recipes')
 
-from src.util.dao import getDao
+from src.util.dao import DAO, getDao, getHealth, snapshot_cache
+from src.util.httpcache import response_cache
+from src.util import metrics
 from src.controllers.controller import Controller
+from src.controllers.recipecontroller import RecipeController
+
+# optionally record the latency of the routes, controllers, and data access objects (see /metrics)
+if metrics.enabled():
+    metrics.instrument_dao(DAO, metrics.DAO_METHODS)
+    metrics.instrument_controller(Controller, ['create', 'create_many', 'get', 'get_all', 'update', 'bulk_update', 'delete'])
+    metrics.instrument_controller(RecipeController, ['get_available_items', 'get_readiness_of_recipes', 'score_recipes', 'select_recipes', 'get_recipe', 'get_top_recipes', 'get_recipe_by_name'])
+    metrics.install(app)
 
 @app.route('/')
 @cross_origin()
@@ -34,23 +44,53 @@ def ping():
     VERSION = dotenv_values('.env').get('VERSION')
     return jsonify({'version': VERSION}), 200
 
+@app.route('/health')
+@cross_origin()
+def health():
+    """Health check that reports whether the database is reachable and how the connection pool is used.
+
+    returns:
+      health -- database reachability, ping latency, and connection pool statistics"""
+    result = getHealth()
+    return jsonify(result), 200 if result['database'] else 503
+
+@app.route('/cache')
+@cross_origin()
+def cache():
+    """Report the usage of the in-process snapshot cache of the collections and of the cache of the response bodies.
+
+    returns:
+      stats -- number of cache hits and misses and the names of the currently cached collections, as well as the usage of the response cache at "responses" """
+    return jsonify({**snapshot_cache.stats(), 'responses': response_cache.stats()}), 200
+
+@app.route('/metrics')
+def get_metrics():
+    """Export the latency of the routes, controllers, and data access objects in the Prometheus text format, which is only recorded if the METRICS setting is enabled.
+
+    returns:
+      metrics -- the metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4'), 200
+
 # simple population method that adds initial data to the database
 @app.route('/populate', methods=['POST'])
 @cross_origin()
 def populate():
     itemcontroller = Controller(dao=getDao(collection_name="item"))
 
-    added_items: list[str] = []
+    items: list[dict] = []
     for filename in os.listdir('./src/static/dummy_items'):
         with open(f'./src/static/dummy_items/{filename}') as itemfile:
             item = json.load(itemfile)
 
-            itemcontroller.create({
+            items.append({
                 "name": item['name'],
                 "quantity": float(item['quantity']),
                 "unit": item['unit']
             })
-            added_items.append(item['name'])
+
+    # insert all items in one round trip
+    result = itemcontroller.create_many(items)
+    added_items: list[str] = [item['name'] for item in result['created']]
 
     return jsonify({"added": added_items}), 200
 
@@ -0,0 +1,182 @@
+from quart import Blueprint, Response, jsonify, abort, request
+from werkzeug.exceptions import HTTPException
+
+from pymongo.errors import WriteError
+from bson.objectid import ObjectId
+import json
+
+from src.controllers.asynccontroller import AsyncController
+from src.util.asyncdao import getAsyncDao
+from src.util.dao import getSchemaValidator
+from src.util.schema import ValidationError
+from src.util.pantry import parse_pantry_id
+from src.util.httpcache import response_cache
+from src.blueprints.itemblueprint import parse_listing_args, next_cursor, streams_end
+controller = AsyncController(dao=getAsyncDao(collection_name='item'))
+
+def get_controller() -> AsyncController:
+    """Obtain the controller of the items of the pantry selected by the request (see parse_pantry_id).
+
+    raises:
+      ValueError -- in case the request selects an invalid pantry
+    """
+    pantry_id = parse_pantry_id(request.headers)
+    if pantry_id is None:
+        return controller
+    return AsyncController(dao=getAsyncDao(collection_name='item', pantry_id=pantry_id))
+
+# instantiate the quart blueprint, which offers the same routes as the item_blueprint
+async_item_blueprint = Blueprint('async_item_blueprint', __name__)
+
+@async_item_blueprint.route('/create', methods=['POST'])
+async def create():
+    try:
+        data = (await request.form).to_dict(flat=False)
+
+        # convert all non-array fields back to simple values
+        for key in data:
+            if isinstance(data[key], list):
+                data[key] = data[key][0]
+
+        # convert the fields into the types of the validator (e.g., the quantity into a double)
+        data = getSchemaValidator('item').coerce(data)
+
+        item = await get_controller().create(data)
+
+        return jsonify(item), 200
+    except ValidationError as e:
+        abort(400, f'Invalid input data: {e}')
+    except (WriteError, ValueError) as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@async_item_blueprint.route('/bulk', methods=['POST', 'PUT'])
+async def bulk():
+    """Create or update several pantry items in one request (see item_blueprint.bulk)."""
+    data = await request.get_json(silent=True)
+    if not isinstance(data, list) or not all(isinstance(entry, dict) for entry in data):
+        abort(400, 'Invalid input data')
+
+    try:
+        if request.method == 'POST':
+            data = [getSchemaValidator('item').coerce(item) for item in data]
+            result = await get_controller().create_many(data)
+        else:
+            for update in data:
+                if not ObjectId.is_valid(update.get('id')) or not isinstance(update.get('data'), dict):
+                    abort(400, 'Invalid input data')
+                update['data'] = getSchemaValidator('item').coerce_update(update['data'])
+            result = await get_controller().bulk_update(data)
+        return jsonify(result), 200
+    except (ValueError, TypeError) as e:
+        abort(400, 'Invalid input data')
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+async def prime(items):
+    """Obtain the first item of an asynchronous stream before the response is sent (see item_blueprint.prime).
+
+    returns:
+      items -- asynchronous generator yielding all items of the stream
+    """
+    items = items.__aiter__()
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = streams_end
+    async def remaining():
+        if first is not streams_end:
+            yield first
+            async for item in items:
+                yield item
+    return remaining()
+
+async def stream_ndjson(items):
+    """Serialize items as newline-delimited JSON, one line per item (see item_blueprint.stream_ndjson)."""
+    try:
+        async for item in items:
+            yield json.dumps(item) + '\n'
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        yield json.dumps({'error': 'Unknown server error'}) + '\n'
+
+async def stream_json_array(items):
+    """Serialize items as a JSON array, one chunk per item (see item_blueprint.stream_json_array)."""
+    separator = '['
+    try:
+        async for item in items:
+            yield separator + json.dumps(item)
+            separator = ','
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        return
+    yield '[]' if separator == '[' else ']'
+
+streams = {
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    'json': (stream_json_array, 'application/json')
+}
+
+@async_item_blueprint.route('/all', methods=['GET'])
+async def get_all():
+    """Obtain all pantry items (see item_blueprint.get_all)."""
+    try:
+        stream, batch_size, filter, after, limit = parse_listing_args(request.args)
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+
+    try:
+        if stream is not None:
+            serialize, mimetype = streams[stream]
+            items = await prime(get_controller().iter_all(filter=filter, after=after, limit=limit, batch_size=batch_size))
+            return Response(serialize(items), mimetype=mimetype), 200
+
+        item_controller = get_controller()
+        etag = response_cache.etag('items', (item_controller.dao.cache_name, item_controller.dao.snapshot_version()), request.args.items(multi=True))
+        if response_cache.matches(request.if_none_match, etag):
+            return Response(status=304, headers=response_cache.headers(etag))
+
+        cached = response_cache.get(etag)
+        if cached is None:
+            items = await item_controller.get_all(filter=filter, after=after, limit=limit)
+            cursor = next_cursor(items, limit)
+            cached = response_cache.put(etag, json.dumps(items).encode(), {} if cursor is None else {'X-Next-Cursor': cursor})
+        body, headers = cached
+        return Response(body, mimetype='application/json', headers={**headers, **response_cache.headers(etag)}), 200
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@async_item_blueprint.route('/byid/<id>', methods=['GET', 'PUT', 'DELETE'])
+async def get(id):
+    try:
+        if request.method == 'GET':
+            # obtain an item that fits a specific id
+            task = await get_controller().get(id)
+            return jsonify(task), 200
+        elif request.method == 'PUT':
+            # update an item with a specific id
+            data = (await request.form).to_dict(flat=True)['data']
+            data = json.loads(data.replace("'", "\""))
+            data = getSchemaValidator('item').coerce_update(data)
+
+            task = await get_controller().update(id, data)
+            return jsonify(task), 200
+        elif request.method == 'DELETE':
+            # delete an item with a specific id
+            result = await get_controller().delete(id=id)
+            return jsonify({"success": result}), 200
+    except ValidationError as e:
+        abort(400, f'Invalid input data: {e}')
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
@@ -0,0 +1,124 @@
+from quart import Blueprint, Response, jsonify, abort, request
+import json
+
+from src.controllers.asyncrecipecontroller import AsyncRecipeController
+from src.util.asyncdao import getAsyncDao
+controller = AsyncRecipeController(items_dao=getAsyncDao(collection_name='item'))
+
+from src.static.diets import Diet, from_string
+from src.util.pantry import parse_pantry_id
+from src.util.schema import parse_flag
+from src.util.batch import parse_batch, check_batch_access
+from src.util.httpcache import response_cache
+from src.blueprints.asyncitemblueprint import stream_ndjson, prime
+
+# instantiate the quart blueprint, which offers the same routes as the recipe_blueprint
+async_recipe_blueprint = Blueprint('async_recipe_blueprint', __name__)
+
+@async_recipe_blueprint.route('/', methods=['GET'])
+async def create():
+    """Generate a recipe proposal that makes use of the current pantry items but complies to dietary preferences (see recipe_blueprint.create)."""
+    try:
+        data = (await request.form).to_dict(flat=False)
+
+        # convert all non-array fields back to simple values
+        for key in data:
+            if isinstance(data[key], list):
+                data[key] = data[key][0]
+
+        diet: Diet = from_string(data['diet'])
+        take_best: bool = (data['usage_mode'] == 'optimal')
+        pantry_id: str = parse_pantry_id(request.headers)
+
+        top_recipes = await controller.get_top_recipes(diet=diet, k=1, take_best=take_best, pantry_id=pantry_id)
+        if len(top_recipes) == 0:
+            return jsonify({'recipe': 'No recipe found for this configuration'}), 404
+
+        recipe: dict = controller.get_recipe_by_name(top_recipes[0]['name'])
+        return jsonify({'recipe': recipe, 'substitutes': top_recipes[0]['substitutes']}), 200
+
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@async_recipe_blueprint.route('/top', methods=['GET'])
+async def get_top():
+    """Generate up to k recipe proposals that make use of the current pantry items but comply to dietary preferences (see recipe_blueprint.get_top)."""
+    # an invalid k is not replaced by the default, but rejected
+    k = request.args.get('k', type=int) if 'k' in request.args else 5
+    if k is None or k < 1:
+        abort(400, 'Invalid input data')
+
+    try:
+        diet: Diet = from_string(request.args.get('diet', 'normal'))
+        take_best: bool = (request.args.get('usage_mode', 'optimal') == 'optimal')
+        pantry_id: str = parse_pantry_id(request.headers)
+
+        # only the optimal item usage mode proposes the same recipes for the same content, such that its responses can be cached
+        etag = None
+        if take_best:
+            etag = response_cache.etag('recipes/top', await controller.get_version(pantry_id), request.args.items(multi=True))
+            if response_cache.matches(request.if_none_match, etag):
+                return Response(status=304, headers=response_cache.headers(etag))
+            cached = response_cache.get(etag)
+            if cached is not None:
+                return Response(cached[0], mimetype='application/json', headers=response_cache.headers(etag)), 200
+
+        top_recipes = await controller.get_top_recipes(diet=diet, k=k, take_best=take_best, pantry_id=pantry_id)
+
+        recipes = [{'recipe': controller.get_recipe_by_name(top_recipe['name']), 'readiness': top_recipe['readiness'], 'substitutes': top_recipe['substitutes']}
+            for top_recipe in top_recipes]
+        if etag is None:
+            return jsonify({'recipes': recipes}), 200
+        body, headers = response_cache.put(etag, json.dumps({'recipes': recipes}).encode())
+        return Response(body, mimetype='application/json', headers=response_cache.headers(etag)), 200
+
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+
+@async_recipe_blueprint.route('/batch', methods=['POST'])
+async def batch():
+    """Generate up to k recipe proposals for each of many pantries in one request (see recipe_blueprint.batch)."""
+    try:
+        entries, k, take_best, chunk_size = parse_batch(await request.get_json(silent=True))
+        check_batch_access(entries, request.headers)
+    except PermissionError as e:
+        abort(403, 'Access to other pantries is forbidden')
+    except (ValueError, TypeError, KeyError) as e:
+        abort(400, 'Invalid input data')
+
+    try:
+        recommendations = await prime(controller.recommend_batch(entries, k=k, take_best=take_best, chunk_size=chunk_size))
+        return Response(stream_ndjson(recommendations), mimetype='application/x-ndjson'), 200
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@async_recipe_blueprint.route('/cook', methods=['POST'])
+async def cook():
+    """Consume the ingredients of a cooked recipe from the pantry in one operation (see recipe_blueprint.cook)."""
+    data = await request.get_json(silent=True)
+    try:
+        recipe_name = str(data['recipe'])
+        servings = float(data.get('servings', 1))
+        partial = parse_flag(data.get('partial', False))
+        pantry_id = parse_pantry_id(request.headers)
+        if servings <= 0:
+            raise ValueError('servings must be positive')
+    except (ValueError, TypeError, KeyError) as e:
+        abort(400, 'Invalid input data')
+
+    try:
+        result = await controller.cook(recipe_name, servings=servings, partial=partial, pantry_id=pantry_id)
+        if result is None:
+            return jsonify({'recipe': 'No recipe found for this name'}), 404
+        return jsonify(result), 200 if result['cooked'] else 409
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
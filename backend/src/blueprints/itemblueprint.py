@@ -1,13 +1,30 @@
-from flask import Blueprint, jsonify, abort, request
+from flask import Blueprint, Response, jsonify, abort, request, stream_with_context
 from flask_cors import cross_origin
+from werkzeug.exceptions import HTTPException
 
 from pymongo.errors import WriteError
+from bson.objectid import ObjectId
 import json
+import re
 
 from src.controllers.controller import Controller
-from src.util.dao import getDao
+from src.util.dao import getDao, getSchemaValidator
+from src.util.schema import ValidationError
+from src.util.pantry import parse_pantry_id
+from src.util.httpcache import response_cache
 controller = Controller(dao=getDao(collection_name='item'))
 
+def get_controller() -> Controller:
+    """Obtain the controller of the items of the pantry selected by the request (see parse_pantry_id).
+
+    raises:
+      ValueError -- in case the request selects an invalid pantry
+    """
+    pantry_id = parse_pantry_id(request.headers)
+    if pantry_id is None:
+        return controller
+    return Controller(dao=getDao(collection_name='item', pantry_id=pantry_id))
+
 # instantiate the flask blueprint
 item_blueprint = Blueprint('item_blueprint', __name__)
 
@@ -21,24 +38,175 @@ def create():
         for key in data:
             if isinstance(data[key], list):
                 data[key] = data[key][0]
-        data['quantity'] = float(data['quantity'])
 
-        item = controller.create(data)
+        # convert the fields into the types of the validator (e.g., the quantity into a double)
+        data = getSchemaValidator('item').coerce(data)
+
+        item = get_controller().create(data)
         
         return jsonify(item), 200
-    except WriteError as e:
+    except ValidationError as e:
+        abort(400, f'Invalid input data: {e}')
+    except (WriteError, ValueError) as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@item_blueprint.route('/bulk', methods=['POST', 'PUT'])
+@cross_origin()
+def bulk():
+    """Create or update several pantry items in one request.
+
+    parameters (need to be added to the body of the request as a JSON array):
+      POST -- list of items, each containing a name, quantity, and unit
+      PUT -- list of updates, each containing the id of an item at "id" and the update operation (e.g., {"$set": {"quantity": 5}}) at "data"
+
+    returns:
+      result -- for POST the created items at "created", for PUT the number of "matched" and "modified" items, and in both cases the rejected entries (with their position in the request body) at "errors"
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not all(isinstance(entry, dict) for entry in data):
         abort(400, 'Invalid input data')
+
+    try:
+        if request.method == 'POST':
+            data = [getSchemaValidator('item').coerce(item) for item in data]
+            result = get_controller().create_many(data)
+        else:
+            for update in data:
+                if not ObjectId.is_valid(update.get('id')) or not isinstance(update.get('data'), dict):
+                    abort(400, 'Invalid input data')
+                update['data'] = getSchemaValidator('item').coerce_update(update['data'])
+            result = get_controller().bulk_update(data)
+        return jsonify(result), 200
+    except (ValueError, TypeError) as e:
+        abort(400, 'Invalid input data')
+    except HTTPException:
+        raise
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
         abort(500, 'Unknown server error')
 
+# marks the end of a stream (see prime)
+streams_end = object()
+
+def prime(items):
+    """Obtain the first item of a stream before the response is sent, such that an error in the meantime (e.g., a failing database query) can still be answered with an error status.
+
+    returns:
+      items -- generator yielding all items of the stream
+
+    raises:
+      Exception -- in case obtaining the first item fails
+    """
+    items = iter(items)
+    first = next(items, streams_end)
+    def remaining():
+        if first is not streams_end:
+            yield first
+            yield from items
+    return remaining()
+
+def stream_ndjson(items):
+    """Serialize items as newline-delimited JSON (see https://github.com/ndjson/ndjson-spec), one line per item. If obtaining an item fails after the response has been started, the stream ends with a line containing the error at "error"."""
+    try:
+        for item in items:
+            yield json.dumps(item) + '\n'
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        yield json.dumps({'error': 'Unknown server error'}) + '\n'
+
+def stream_json_array(items):
+    """Serialize items as a JSON array, one chunk per item. If obtaining an item fails after the response has been started, the array is not closed, such that clients cannot mistake the partial array for the complete one."""
+    separator = '['
+    try:
+        for item in items:
+            yield separator + json.dumps(item)
+            separator = ','
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        return
+    yield '[]' if separator == '[' else ']'
+
+streams = {
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    'json': (stream_json_array, 'application/json')
+}
+
+def parse_listing_args(args):
+    """Parse the query parameters of an item listing (see get_all) and translate the filters into a filter which is evaluated by the database.
+
+    returns:
+      stream, batch_size, filter, after, limit -- the parsed parameters
+
+    raises:
+      ValueError -- in case any parameter is invalid
+    """
+    stream = args.get('stream')
+    batch_size = args.get('batch_size', default=100, type=int)
+    limit = args.get('limit', type=int)
+    after = args.get('after')
+    name = args.get('name')
+    min_quantity = args.get('min_quantity', type=float)
+    if (stream is not None and stream not in streams) or batch_size is None or batch_size < 1:
+        raise ValueError('invalid stream parameters')
+    if ('limit' in args and (limit is None or limit < 1)) or (after is not None and not ObjectId.is_valid(after)) or ('min_quantity' in args and min_quantity is None):
+        raise ValueError('invalid filter parameters')
+
+    filter = {}
+    if name:
+        filter['name'] = {'$regex': f'^{re.escape(name)}'}
+    if min_quantity is not None:
+        filter['quantity'] = {'$gte': min_quantity}
+    return stream, batch_size, filter, after, limit
+
+def next_cursor(items: list[dict], limit: int) -> str:
+    """Determine the after parameter for the next page of an item listing, which only exists if the current page is full."""
+    if limit is not None and len(items) == limit:
+        return items[-1]['_id']['$oid']
+    return None
+
 @item_blueprint.route('/all', methods=['GET'])
 @cross_origin()
 def get_all():
+    """Obtain all pantry items.
+
+    parameters (optional query parameters of the request):
+      stream -- stream the items instead of sending them in one response, either "ndjson" (one item per line) or "json" (a chunked JSON array)
+      batch_size -- number of items fetched from the database per round trip when streaming, defaults to 100
+      limit -- maximum number of items to return, ordered by their id
+      after -- id of the last item of the previous page, such that only items after it are returned
+      name -- only return items whose name starts with this prefix
+      min_quantity -- only return items with at least this quantity
+
+    returns:
+      items -- list of all pantry items (complying to the filters). If the number of returned items equals the limit, the X-Next-Cursor header contains the value of the after parameter for the next page. Unless streamed, the response carries an ETag header, and a request whose If-None-Match header contains it obtains a 304 response (see ResponseCache).
+    """
+    try:
+        stream, batch_size, filter, after, limit = parse_listing_args(request.args)
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+
     try:
-        items = controller.get_all()
-        return jsonify(items), 200
-    except WriteError as e:
+        if stream is not None:
+            serialize, mimetype = streams[stream]
+            items = prime(get_controller().iter_all(filter=filter, after=after, limit=limit, batch_size=batch_size))
+            return Response(stream_with_context(serialize(items)), mimetype=mimetype), 200
+
+        item_controller = get_controller()
+        etag = response_cache.etag('items', (item_controller.dao.cache_name, item_controller.dao.snapshot_version()), request.args.items(multi=True))
+        if response_cache.matches(request.if_none_match, etag):
+            return Response(status=304, headers=response_cache.headers(etag))
+
+        cached = response_cache.get(etag)
+        if cached is None:
+            items = item_controller.get_all(filter=filter, after=after, limit=limit)
+            cursor = next_cursor(items, limit)
+            cached = response_cache.put(etag, json.dumps(items).encode(), {} if cursor is None else {'X-Next-Cursor': cursor})
+        body, headers = cached
+        return Response(body, mimetype='application/json', headers={**headers, **response_cache.headers(etag)}), 200
+    except (WriteError, ValueError) as e:
         abort(400, 'Invalid input data')
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
@@ -50,19 +218,24 @@ def get(id):
     try:
         if request.method == 'GET':
             # obtain an item that fits a specific id
-            task = controller.get(id)
+            task = get_controller().get(id)
             return jsonify(task), 200
         elif request.method == 'PUT':
             # update an item with a specific id 
             data = request.form.to_dict(flat=True)['data']
             data = json.loads(data.replace("'", "\""))
+            data = getSchemaValidator('item').coerce_update(data)
 
-            task = controller.update(id, data)
+            task = get_controller().update(id, data)
             return jsonify(task), 200
         elif request.method == 'DELETE':
             # delete an item with a specific id
-            result = controller.delete(id=id)
+            result = get_controller().delete(id=id)
             return jsonify({"success": result}), 200
+    except ValidationError as e:
+        abort(400, f'Invalid input data: {e}')
+    except ValueError as e:
+        abort(400, 'Invalid input data')
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
         abort(500, 'Unknown server error')
\ No newline at end of file
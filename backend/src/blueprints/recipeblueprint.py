@@ -1,11 +1,17 @@
-from flask import Blueprint, jsonify, abort, request
+from flask import Blueprint, Response, jsonify, abort, request, stream_with_context
 from flask_cors import cross_origin
+import json
 
 from src.controllers.recipecontroller import RecipeController
 from src.util.dao import getDao
 controller = RecipeController(items_dao=getDao(collection_name='item'))
 
 from src.static.diets import Diet, from_string
+from src.util.pantry import parse_pantry_id
+from src.util.schema import parse_flag
+from src.util.batch import parse_batch, check_batch_access
+from src.util.httpcache import response_cache
+from src.blueprints.itemblueprint import stream_ndjson, prime
 
 # instantiate the flask blueprint
 recipe_blueprint = Blueprint('recipe_blueprint', __name__)
@@ -19,8 +25,12 @@ def create():
       diet -- dietary restrictions, either "normal", "vegetarian", or "vegan"
       usage_mode -- usage mode of pantry items, either "optimal" or "random"
 
+    headers (optional):
+      X-Pantry-Id -- id of the pantry whose items are used, defaults to the shared pantry containing all items
+
     returns: 
       recipe -- A recipe proposal that complies to the given dietary restrictions and optionally makes best use of the existing pantry items (if usage_mode=="optimal")
+      substitutes -- list of the pantry items which replace missing ingredients of the recipe, each containing the ingredient, the substitute, and the used amount of the substitute in base units
     """
     try:
         data = request.form.to_dict(flat=False)
@@ -32,14 +42,137 @@ def create():
 
         diet: Diet = from_string(data['diet'])
         take_best: bool =  (data['usage_mode'] == 'optimal')
+        pantry_id: str = parse_pantry_id(request.headers)
 
-        recipe_name: str = controller.get_recipe(diet=diet, take_best=take_best)
-        recipe: dict = controller.get_recipe_by_name(name=recipe_name)
-
-        if recipe == None:
+        top_recipes = controller.get_top_recipes(diet=diet, k=1, take_best=take_best, pantry_id=pantry_id)
+        if len(top_recipes) == 0:
             return jsonify({'recipe': 'No recipe found for this configuration'}), 404
-        return jsonify({'recipe': recipe}), 200
+
+        recipe: dict = controller.get_recipe_by_name(recipe_name=top_recipes[0]['name'])
+        return jsonify({'recipe': recipe, 'substitutes': top_recipes[0]['substitutes']}), 200
     
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@recipe_blueprint.route('/top', methods=['GET'])
+@cross_origin()
+def get_top():
+    """Generate up to k recipe proposals that make use of the current pantry items but comply to dietary preferences.
+
+    parameters (need to be added as query parameters of the request):
+      k -- maximum number of recipe proposals, defaults to 5
+      diet -- dietary restrictions, either "normal", "vegetarian", or "vegan", defaults to "normal"
+      usage_mode -- usage mode of pantry items, either "optimal" or "random", defaults to "optimal"
+
+    headers (optional):
+      X-Pantry-Id -- id of the pantry whose items are used, defaults to the shared pantry containing all items
+
+    returns:
+      recipes -- list of recipe proposals, each consisting of the recipe, its readiness, and the used substitutes (see create). In the optimal usage mode, the response carries an ETag header, and a request whose If-None-Match header contains it obtains a 304 response (see ResponseCache).
+    """
+    # an invalid k is not replaced by the default, but rejected
+    k = request.args.get('k', type=int) if 'k' in request.args else 5
+    if k is None or k < 1:
+        abort(400, 'Invalid input data')
+
+    try:
+        diet: Diet = from_string(request.args.get('diet', 'normal'))
+        take_best: bool = (request.args.get('usage_mode', 'optimal') == 'optimal')
+        pantry_id: str = parse_pantry_id(request.headers)
+
+        # only the optimal item usage mode proposes the same recipes for the same content, such that its responses can be cached
+        etag = None
+        if take_best:
+            etag = response_cache.etag('recipes/top', controller.get_version(pantry_id), request.args.items(multi=True))
+            if response_cache.matches(request.if_none_match, etag):
+                return Response(status=304, headers=response_cache.headers(etag))
+            cached = response_cache.get(etag)
+            if cached is not None:
+                return Response(cached[0], mimetype='application/json', headers=response_cache.headers(etag)), 200
+
+        top_recipes = controller.get_top_recipes(diet=diet, k=k, take_best=take_best, pantry_id=pantry_id)
+
+        recipes = [{'recipe': controller.get_recipe_by_name(top_recipe['name']), 'readiness': top_recipe['readiness'], 'substitutes': top_recipe['substitutes']}
+            for top_recipe in top_recipes]
+        if etag is None:
+            return jsonify({'recipes': recipes}), 200
+        body, headers = response_cache.put(etag, json.dumps({'recipes': recipes}).encode())
+        return Response(body, mimetype='application/json', headers=response_cache.headers(etag)), 200
+
+    except ValueError as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@recipe_blueprint.route('/batch', methods=['POST'])
+@cross_origin()
+def batch():
+    """Generate up to k recipe proposals for each of many pantries in one request, e.g., to precompute proposals for all users. The route gives access to the items of every pantry and is therefore intended for internal jobs.
+
+    parameters (need to be added to the body of the request as a JSON object):
+      pantries -- list of pantries, each containing either a pantry id at "pantry_id" or a list of items (each containing a name, quantity, and unit) at "items", and optionally a diet at "diet" (defaults to "normal")
+      k -- maximum number of recipe proposals per pantry, defaults to 5
+      usage_mode -- usage mode of pantry items, either "optimal" or "random", defaults to "optimal"
+      chunk_size -- number of pantries which are scored at once, defaults to the BATCH_CHUNK_SIZE setting
+
+    headers (required if the REQUIRE_PANTRY_ID setting is enabled):
+      X-Pantry-Id -- id of the only pantry which the pantry ids of the batch may refer to, such that separated pantries cannot access each other
+
+    returns:
+      recommendations -- newline-delimited JSON (see https://github.com/ndjson/ndjson-spec) with one line per pantry in the order of the request, containing the position of the pantry at "index", its pantry id at "pantry_id" (if given), its diet at "diet", and the proposed recipe names and their readiness at "recipes"
+    """
+    try:
+        entries, k, take_best, chunk_size = parse_batch(request.get_json(silent=True))
+        check_batch_access(entries, request.headers)
+    except PermissionError as e:
+        abort(403, 'Access to other pantries is forbidden')
+    except (ValueError, TypeError, KeyError) as e:
+        abort(400, 'Invalid input data')
+
+    try:
+        # the first recommendation is obtained before the response is started, such that an early error still leads to an error status (see prime)
+        recommendations = prime(controller.recommend_batch(entries, k=k, take_best=take_best, chunk_size=chunk_size))
+        return Response(stream_with_context(stream_ndjson(recommendations)), mimetype='application/x-ndjson'), 200
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+@recipe_blueprint.route('/cook', methods=['POST'])
+@cross_origin()
+def cook():
+    """Consume the ingredients of a cooked recipe from the pantry in one operation (see RecipeController.cook).
+
+    parameters (need to be added to the body of the request as a JSON object):
+      recipe -- the name of the cooked recipe
+      servings -- multiple of the required amounts that is consumed, defaults to 1
+      partial -- if true, unavailable ingredients are skipped, otherwise nothing is consumed if any ingredient is unavailable, defaults to false
+
+    headers (optional):
+      X-Pantry-Id -- id of the pantry whose items are consumed, defaults to the shared pantry containing all items
+
+    returns:
+      result -- whether the recipe was cooked, the consumed and missing amounts, and the pantry items after the consumption (with status 409 if the recipe was not cooked due to missing ingredients or concurrent changes)
+    """
+    data = request.get_json(silent=True)
+    try:
+        recipe_name = str(data['recipe'])
+        servings = float(data.get('servings', 1))
+        partial = parse_flag(data.get('partial', False))
+        pantry_id = parse_pantry_id(request.headers)
+        if servings <= 0:
+            raise ValueError('servings must be positive')
+    except (ValueError, TypeError, KeyError) as e:
+        abort(400, 'Invalid input data')
+
+    try:
+        result = controller.cook(recipe_name, servings=servings, partial=partial, pantry_id=pantry_id)
+        if result is None:
+            return jsonify({'recipe': 'No recipe found for this name'}), 404
+        return jsonify(result), 200 if result['cooked'] else 409
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
-        abort(500, 'Unknown server error')
\ No newline at end of file
+        abort(500, 'Unknown server error')
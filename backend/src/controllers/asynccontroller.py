@@ -0,0 +1,46 @@
+from src.util.asyncdao import AsyncDAO
+
+class AsyncController:
+    def __init__(self, dao: AsyncDAO):
+        """Instantiate an asynchronous controller, which offers the same operations as the Controller, but every operation is a coroutine.
+
+        parameters:
+            dao -- asynchronous data access object, which has to grant access to the specific collection of the database
+        """
+        self.dao = dao
+
+    async def create(self, data: dict):
+        """Create a new object in the database and return the newly created object (see Controller.create)."""
+        return await self.dao.create(data)
+
+    async def create_many(self, data: list[dict]):
+        """Create several new objects in the database in one operation (see Controller.create_many)."""
+        return await self.dao.create_many(data)
+
+    async def get(self, id: str):
+        """Search for an object by id and return the associated database object (see Controller.get)."""
+        return await self.dao.findOne(id)
+
+    async def get_all(self, filter: dict = None, after: str = None, limit: int = None):
+        """Gathers all object in the respective collection of the database (see Controller.get_all)."""
+        return await self.dao.find(filter=filter, after=after, limit=limit)
+
+    def iter_all(self, filter: dict = None, after: str = None, limit: int = None, batch_size: int = 100):
+        """Iterate asynchronously over all objects in the respective collection of the database (see Controller.iter_all).
+
+        returns:
+            users -- asynchronous generator yielding all objects in the respective collection in the database
+        """
+        return self.dao.iter_find(filter=filter, after=after, limit=limit, batch_size=batch_size)
+
+    async def update(self, id: str, data: dict):
+        """Locates an object in the respective collection of the database and updates it (see Controller.update)."""
+        return await self.dao.update(id=id, update_data=data)
+
+    async def bulk_update(self, updates: list[dict]):
+        """Updates several objects of the respective collection in one operation (see Controller.bulk_update)."""
+        return await self.dao.bulk_update(updates)
+
+    async def delete(self, id: str):
+        """Delete an object from the respective collection of the database (see Controller.delete)."""
+        return await self.dao.delete(id=id)
@@ -0,0 +1,140 @@
+import asyncio
+from collections import deque
+
+from src.controllers.recipecontroller import RecipeController, pantry_projection
+from src.util.asyncdao import AsyncDAO
+from src.util.dao import getSetting
+from src.util.batch import BatchScorer, getWorkerPool, recommend_in_worker
+from src.util.pantry import name_pattern, pantry_items_pipeline
+
+from src.static.diets import Diet
+
+class AsyncRecipeController(RecipeController):
+    def __init__(self, items_dao: AsyncDAO):
+        """Instantiate an asynchronous recipe controller, which offers the same recipe proposals as the RecipeController, but obtains the pantry items without blocking the event loop.
+
+        parameters:
+            items_dao -- asynchronous data access object to the pantry items
+        """
+        super().__init__(items_dao=items_dao)
+
+    async def get_version(self, pantry_id: str = None) -> tuple:
+        """Obtain the versions of the items of a pantry and of the recipe catalog (see RecipeController.get_version)."""
+        return self.get_items_dao(pantry_id).cache_name, await self.get_pantry_version(pantry_id), self.catalog.version
+
+    async def get_pantry_version(self, pantry_id: str = None) -> int:
+        """Obtain the version of the snapshot of the items of a pantry, which is reloaded first if it expired (see RecipeController.get_pantry_version)."""
+        return (await self.get_items_dao(pantry_id).versioned_snapshot(projection=pantry_projection))[1]
+
+    async def get_available_items(self, minimum_quantity: int = -1, pantry_id: str = None) -> dict:
+        """Obtain a dictionary of available items in the pantry (see RecipeController.get_available_items)."""
+        items, version = await self.get_items_dao(pantry_id).versioned_snapshot(projection=pantry_projection)
+        key = (pantry_id, version, minimum_quantity)
+        available_items = self.pantries.get(key)
+        if available_items is None:
+            available_items = self.to_available_items(items, minimum_quantity)
+            self.pantries.put(key, available_items)
+        return available_items
+
+    async def get_available_items_of_pantries(self, pantry_ids: list[str], minimum_quantity: int = -1) -> dict:
+        """Obtain the available items of several pantries with one database query (see RecipeController.get_available_items_of_pantries)."""
+        items = await self.dao.aggregate(pantry_items_pipeline(pantry_ids, minimum_quantity))
+        return self.to_available_items_of_pantries(items, pantry_ids)
+
+    async def get_readiness_of_recipes(self, recipes: list[dict], diet: Diet, pantry_id: str = None) -> dict:
+        """Calculate the readiness of each recipe by the available items in a worker thread, such that the event loop is not blocked (see RecipeController.get_readiness_of_recipes)."""
+        # the version of the pantry is obtained before the available items (see RecipeController.get_readiness_of_recipes)
+        pantry_version = await self.get_pantry_version(pantry_id)
+        catalog = self.get_catalog(recipes)
+        available_items = await self.get_available_items(pantry_id=pantry_id)
+
+        key = (pantry_id, pantry_version, diet, catalog.version)
+        recipe_readiness = self.readiness_cache.get(key)
+        if recipe_readiness is None:
+            # scoring a large catalog takes long enough to delay all other requests, hence it runs in a worker thread
+            recipe_readiness = await asyncio.to_thread(self.score_recipes, catalog, available_items, diet, pantry_id=pantry_id)
+            self.readiness_cache.put(key, recipe_readiness)
+
+        return recipe_readiness
+
+    async def get_readiness_of_pantries(self, pantry_ids: list[str], diet: Diet) -> dict:
+        """Calculate the readiness of each recipe for several pantries at once in a worker thread (see RecipeController.get_readiness_of_pantries)."""
+        available_items = await self.get_available_items_of_pantries(pantry_ids)
+        return await asyncio.to_thread(self.score_pantries, self.catalog, available_items, diet)
+
+    async def recommend_batch(self, entries: list[dict], k: int = 5, take_best: bool = True, chunk_size: int = None, workers: int = None):
+        """Propose up to k suitable recipes for each of many pantries (see RecipeController.recommend_batch). The chunks are scored in a worker thread or in worker processes, such that the event loop is not blocked."""
+        catalog = self.catalog
+        scorer = BatchScorer.of(catalog)
+        chunk_size = chunk_size or int(getSetting('BATCH_CHUNK_SIZE', 256))
+        workers = int(getSetting('BATCH_WORKERS', 0)) if workers is None else workers
+        loop = asyncio.get_running_loop()
+
+        pool = getWorkerPool(catalog, workers) if workers > 0 else None
+        # keep at most two chunks per worker in flight (see RecipeController.recommend_batch)
+        pending = deque()
+        try:
+            for start in range(0, len(entries), chunk_size):
+                chunk = entries[start:start+chunk_size]
+                pantry_ids = [entry['pantry_id'] for entry in chunk if 'pantry_id' in entry]
+                available_items = await self.get_available_items_of_pantries(pantry_ids) if len(pantry_ids) > 0 else {}
+                recommendations, groups = self.prepare_batch(catalog, chunk, start, available_items)
+
+                if pool is None:
+                    results = await asyncio.to_thread(lambda: [scorer.recommend(diet, pantries, k, take_best, self.rng) for diet, positions, pantries in groups])
+                    for recommendation in self.collect_batch(recommendations, groups, results):
+                        yield recommendation
+                    continue
+
+                pending.append((recommendations, groups, [loop.run_in_executor(pool, recommend_in_worker, diet, pantries, k, take_best) for diet, positions, pantries in groups]))
+                if len(pending) >= 2 * workers:
+                    recommendations, groups, futures = pending.popleft()
+                    for recommendation in self.collect_batch(recommendations, groups, await asyncio.gather(*futures)):
+                        yield recommendation
+
+            while len(pending) > 0:
+                recommendations, groups, futures = pending.popleft()
+                for recommendation in self.collect_batch(recommendations, groups, await asyncio.gather(*futures)):
+                    yield recommendation
+        finally:
+            # the pool is shared with other batches, hence only the chunks of this batch are cancelled (see RecipeController.recommend_batch)
+            for recommendations, groups, futures in pending:
+                for future in futures:
+                    future.cancel()
+
+    async def get_recipe(self, diet: Diet, take_best: bool, pantry_id: str = None) -> str:
+        """Propose a suitable recipe depending on the diet and the item usage strategy (see RecipeController.get_recipe)."""
+        top_recipes = await self.get_top_recipes(diet=diet, k=1, take_best=take_best, pantry_id=pantry_id)
+        if len(top_recipes) == 0:
+            return None
+        return top_recipes[0]['name']
+
+    async def get_top_recipes(self, diet: Diet, k: int, take_best: bool = True, pantry_id: str = None) -> list[dict]:
+        """Propose up to k suitable recipes depending on the diet and the item usage strategy (see RecipeController.get_top_recipes)."""
+        recipe_readiness = await self.get_readiness_of_recipes(
+            recipes=self.recipes, diet=diet, pantry_id=pantry_id)
+
+        selected = self.select_recipes(recipe_readiness, k, take_best)
+        if len(selected) == 0:
+            return selected
+        return self.add_substitutes(selected, diet, await self.get_available_items(pantry_id=pantry_id))
+
+    async def cook(self, recipe_name: str, servings: float = 1, partial: bool = False, pantry_id: str = None) -> dict:
+        """Consume the ingredients of a recipe from the pantry (see RecipeController.cook)."""
+        recipe = self.get_recipe_by_name(recipe_name)
+        if recipe is None:
+            return None
+
+        dao = self.get_items_dao(pantry_id)
+        items = await dao.find(filter={'name': {'$in': [name_pattern(name) for name in recipe['ingredients']]}}, projection=['name', 'quantity', 'unit'])
+        updates, consumed, missing = self.plan_consumption(recipe, items, servings)
+
+        result = {'cooked': False, 'consumed': [], 'missing': missing, 'conflict': False}
+        if len(updates) > 0 and (len(missing) == 0 or partial):
+            summary = await dao.bulk_update(updates, atomic=True)
+            result['conflict'] = summary.get('aborted', False) or summary['matched'] < len(updates)
+            result['cooked'] = not result['conflict']
+            result['consumed'] = consumed if result['cooked'] else []
+
+        result['items'] = await dao.find()
+        return result
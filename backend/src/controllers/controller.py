@@ -26,6 +26,24 @@ class Controller:
         except Exception as e:
             raise
 
+    def create_many(self, data: list[dict]):
+        """Create several new objects in the database in one operation. Objects which violate the validator are
+        reported instead of aborting the whole operation.
+
+        parameters:
+            data -- a list of dicts containing all relevant fields of data according to the validator
+
+        returns:
+            result -- a dict containing the newly created objects at 'created' and the rejected objects at 'errors'
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return self.dao.create_many(data)
+        except Exception as e:
+            raise
+
     def get(self, id: str):
         """Search for an object by id and return the associated database object. The database object will contain
         a unique id, which is accessible at ob['_id']['$oid] in the jsonified form.
@@ -45,9 +63,14 @@ class Controller:
         except Exception as e:
             raise
 
-    def get_all(self):
+    def get_all(self, filter: dict = None, after: str = None, limit: int = None):
         """Gathers all object in the respective collection of the database. The database object will contain
         a unique id, which is accessible at ob['_id']['$oid] in the jsonified form.
+
+        parameters:
+            filter -- optional dict containing key value pairs of properties and applicable filters
+            after -- optional id of an object, such that only objects with a greater id are returned
+            limit -- optional maximum number of objects to return, ordered by their id
         
         returns:
             users -- array of all objects in the respective collection in the database
@@ -56,7 +79,28 @@ class Controller:
             Exception -- in case the database operation fails, raise an exception
         """
         try:
-            return self.dao.find()
+            return self.dao.find(filter=filter, after=after, limit=limit)
+        except Exception as e:
+            raise
+
+    def iter_all(self, filter: dict = None, after: str = None, limit: int = None, batch_size: int = 100):
+        """Iterate over all objects in the respective collection of the database without loading the whole collection into memory. The database object will contain
+        a unique id, which is accessible at ob['_id']['$oid] in the jsonified form.
+
+        parameters:
+            filter -- optional dict containing key value pairs of properties and applicable filters
+            after -- optional id of an object, such that only objects with a greater id are returned
+            limit -- optional maximum number of objects to return, ordered by their id
+            batch_size -- number of objects fetched from the database per round trip
+
+        returns:
+            users -- generator yielding all objects in the respective collection in the database
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return self.dao.iter_find(filter=filter, after=after, limit=limit, batch_size=batch_size)
         except Exception as e:
             raise
 
@@ -82,6 +126,25 @@ class Controller:
         except Exception as e:
             raise
 
+    def bulk_update(self, updates: list[dict]):
+        """Locates several objects in the respective collection of the database and updates each of them with the given
+        data values in one operation.
+
+        parameters:
+            updates -- a list of dicts containing the unique identifier of an object at 'id' and the update (in the same
+                format as the data parameter of update) at 'data'
+
+        returns:
+            result -- a dict containing the number of matched and modified objects and the failed updates at 'errors'
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return self.dao.bulk_update(updates)
+        except Exception as e:
+            raise
+
     def delete(self, id: str):
         """Delete an object from the respective collection of the database
 
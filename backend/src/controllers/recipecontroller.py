@@ -1,50 +1,134 @@
-import os
-import json
-import random
+from collections import deque
+
+import numpy as np
 
 from src.controllers.controller import Controller
-from src.util.dao import DAO
+from src.util.dao import DAO, getSetting
 
 from src.static.diets import Diet
 from src.util.calculator import calculate_readiness
+from src.util.catalog import RecipeCatalog, CatalogWatcher, read_recipes
+from src.util.selection import select_top_k, sample_weighted
+from src.util.cache import LRUCache
+from src.util.units import to_base_unit, parse_amount
+from src.util.batch import BatchScorer, getWorkerPool, recommend_in_worker
+from src.util.pantry import PantryView, normalize_name, name_pattern, pantry_items_pipeline
+
+# the properties of the pantry items which the recipe proposals depend on
+pantry_projection = ['name', 'quantity', 'unit']
 
 class RecipeController(Controller):
     def __init__(self, items_dao: DAO):
         super().__init__(dao=items_dao)
 
-        # load existing recipes
-        self.recipes = self.load_recipes()
+        # load the compiled recipe catalog, whose recipes are only decoded once they are accessed
+        self.catalog = RecipeCatalog.open()
+
+        # optionally keep the catalog up to date with the recipe files, where every change replaces the whole catalog at once
+        self.watcher = None
+        if getSetting('RECIPE_WATCH'):
+            self.watcher = CatalogWatcher(self.catalog, on_change=self.set_catalog, interval=float(getSetting('RECIPE_WATCH_INTERVAL', 2)))
+            self.watcher.start()
+
+        # random number generator for the random item usage mode
+        self.rng = np.random.default_rng()
+
+        # cache the readiness of the recipes per pantry, version of the pantry, diet, and version of the catalog
+        self.readiness_cache = LRUCache(int(getSetting('READINESS_CACHE_SIZE', 128)))
+
+        # keep the most recently scored version per pantry and diet, such that the next version only requires rescoring the recipes affected by a change
+        self.scored = LRUCache(int(getSetting('READINESS_CACHE_SIZE', 128)))
+
+        # the available items of the most recent versions of the pantries, which are only converted to base units once per version
+        self.pantries = LRUCache(int(getSetting('PANTRY_CACHE_SIZE', 128)))
+
+    @property
+    def recipes(self):
+        """The recipes of the current catalog."""
+        return self.catalog.recipes
+
+    def set_catalog(self, catalog: RecipeCatalog):
+        """Replace the recipe catalog. Requests which are in progress keep using the previous catalog."""
+        self.catalog = catalog
 
     def load_recipes(self) -> list[dict]:
         """Read all available recipes from the src/static/recipes/ directory and puts them in an array. The items of this array follow the same format as the JSON files in the directory.
 
         returns:
           recipes -- list of recipes in dictionary format"""
-        recipes: list[dict] = []
-        for filename in os.listdir('./src/static/recipes'):
-            with open(f'./src/static/recipes/{filename}') as f:
-                recipe = json.load(f)
-                recipes.append(recipe)
-        return recipes
+        return read_recipes()
+
+    def get_items_dao(self, pantry_id: str = None) -> DAO:
+        """Obtain the data access object to the items of a pantry.
+
+        parameters:
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items"""
+        if pantry_id is None:
+            return self.dao
+        return self.dao.scoped(pantry_id)
+
+    def get_version(self, pantry_id: str = None) -> tuple:
+        """Obtain the versions of the items of a pantry and of the recipe catalog, which identify the content of the recipe proposals for the pantry (see ResponseCache.etag).
+
+        parameters:
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items"""
+        return self.get_items_dao(pantry_id).cache_name, self.get_pantry_version(pantry_id), self.catalog.version
 
-    def get_available_items(self, minimum_quantity: int = -1) -> dict:
+    def get_pantry_version(self, pantry_id: str = None) -> int:
+        """Obtain the version of the snapshot of the items of a pantry. An expired snapshot is reloaded first, such that values cached under the version expire together with the snapshot (see SnapshotCache.get_versioned).
+
+        parameters:
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items"""
+        return self.get_items_dao(pantry_id).versioned_snapshot(projection=pantry_projection)[1]
+
+    def get_available_items(self, minimum_quantity: int = -1, pantry_id: str = None) -> dict:
         """Obtain a dictionary of available items in the pantry.
 
         parameters:
           minimum_quantity -- the minimum quantity that an item needs to have in order to be included in the returned dictionary
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items
 
         returns:
-          available_items: dict -- a dictionary mapping pantry item names to their quantity (only including pantry items which have a quantity of minimum_quantity or higher)
+          available_items: PantryView -- an immutable mapping of the normalized pantry item names to their summed quantity in base units (only including pantry items which have a quantity above minimum_quantity)
           None -- in case the self.get_all() method throws an exception"""
+        # use the snapshot of the pantry, which avoids a database round trip unless the pantry changed, and is obtained before the cached items such that those expire together with it
+        items, version = self.get_items_dao(pantry_id).versioned_snapshot(projection=pantry_projection)
+        key = (pantry_id, version, minimum_quantity)
+        available_items = self.pantries.get(key)
+        if available_items is None:
+            available_items = self.to_available_items(items, minimum_quantity)
+            self.pantries.put(key, available_items)
+        return available_items
 
-        items = self.get_all()
+    def get_available_items_of_pantries(self, pantry_ids: list[str], minimum_quantity: int = -1) -> dict:
+        """Obtain the available items of several pantries with one database query, which sums duplicate items in the database (see get_available_items and pantry_items_pipeline).
+
+        parameters:
+          pantry_ids -- list of pantry ids
+          minimum_quantity -- the minimum quantity that an item needs to have in order to be included
+
+        returns:
+          available_items -- a dictionary mapping every pantry id to the available items of the pantry"""
+        items = self.dao.aggregate(pantry_items_pipeline(pantry_ids, minimum_quantity))
+        return self.to_available_items_of_pantries(items, pantry_ids)
 
-        available_items = {}
+    def to_available_items_of_pantries(self, items: list[dict], pantry_ids: list[str], minimum_quantity: int = -1) -> dict:
+        """Group pantry items by their pantry and map them to their quantity (see to_available_items)."""
+        items_of_pantries = {pantry_id: [] for pantry_id in pantry_ids}
         for item in items:
-            if item["quantity"] > minimum_quantity:
-                available_items[item["name"]] = item["quantity"]
+            items_of_pantries[item['pantry_id']].append(item)
+        return {pantry_id: self.to_available_items(items, minimum_quantity) for pantry_id, items in items_of_pantries.items()}
 
-        return available_items
+    def to_available_items(self, items: list[dict], minimum_quantity: int = -1) -> dict:
+        """Map pantry items to their quantity (see get_available_items).
+
+        parameters:
+          items -- list of pantry items
+          minimum_quantity -- the minimum quantity that an item needs to have in order to be included in the returned dictionary
+
+        returns:
+          available_items: PantryView -- a mapping of the normalized pantry item names to their summed quantity in the base unit of the item (see to_base_unit)"""
+        return PantryView.of(items, minimum_quantity)
 
     def get_recipe_readiness(self, recipe: dict, available_items: dict, diet: Diet) -> float:
         """Calculate the readiness value of a recipe. The readiness determines to what degree the required ingredients are already available in the current pantry.
@@ -68,60 +152,347 @@ class RecipeController(Controller):
             return readiness
         return None
 
-    def get_readiness_of_recipes(self, recipes: list[dict], diet: Diet) -> dict:
+    def get_readiness_of_recipes(self, recipes: list[dict], diet: Diet, pantry_id: str = None) -> dict:
         """Calculate the readiness of each recipe by the available items.
 
         parameters:
           recipes -- list of recipes in the structure as found in src/static/recipes
           available_items -- list of available pantry items
           diet -- dietary preference which a recipe needs to comply to
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items
+
+        returns:
+          readiness -- A dictionary that maps a recipe name (of recipes complying to the dietary restrictions) to a readiness value between 0 and 1 as calculated via calculate_readiness (must not be modified by the caller)"""
+        catalog = self.get_catalog(recipes)
+
+        # the version of the pantry is obtained before the available items, such that a change in between leads to a different version
+        key = (pantry_id, self.get_pantry_version(pantry_id), diet, catalog.version)
+        recipe_readiness = self.readiness_cache.get(key)
+        if recipe_readiness is None:
+            # obtain all available items
+            available_items = self.get_available_items(pantry_id=pantry_id)
+
+            recipe_readiness = self.score_recipes(catalog, available_items, diet, pantry_id=pantry_id)
+            self.readiness_cache.put(key, recipe_readiness)
+
+        return recipe_readiness
+
+    def get_catalog(self, recipes: list[dict]) -> RecipeCatalog:
+        """Obtain the recipe matrix of a list of recipes, which reuses the precompiled recipe matrix unless a different list of recipes is given."""
+        if recipes is self.recipes:
+            return self.catalog
+        return RecipeCatalog(recipes)
+
+    def score_recipes(self, catalog: RecipeCatalog, available_items: dict, diet: Diet, pantry_id: str = None) -> dict:
+        """Calculate the readiness of each recipe of a recipe matrix by the available items (see get_readiness_of_recipes).
+
+        parameters:
+          catalog -- recipe matrix of the recipes to score
+          available_items -- dictionary mapping all available pantry items to their currently available amount
+          diet -- dietary preference which a recipe needs to comply to
+          pantry_id -- the id of the pantry of the available items
+
+        returns:
+          readiness -- A dictionary that maps a recipe name (of recipes complying to the dietary restrictions) to a readiness value between 0 and 1"""
+        partition = catalog.partition(diet)
+        pantry = catalog.pantry_vector(available_items)
+
+        # score all recipes complying to the diet at once, where only the recipes affected by a change of the pantry are rescored if the catalog did not change
+        previous = self.scored.get((pantry_id, diet))
+        if previous is not None and previous[0] is catalog:
+            readiness = partition.rescore(pantry, previous[1], previous[2])
+        else:
+            readiness = partition.score(pantry)
+        self.scored.put((pantry_id, diet), (catalog, pantry, readiness))
+
+        return self.to_recipe_readiness(catalog, partition.rows, readiness)
+
+    def to_recipe_readiness(self, catalog: RecipeCatalog, rows, readiness) -> dict:
+        """Map the names of the recipes to their readiness, only keeping the recipes that have a readiness above 0.1.
+
+        parameters:
+          catalog -- recipe matrix of the scored recipes
+          rows -- array containing the rows of the scored recipes
+          readiness -- array containing the readiness value of every recipe in rows
 
         returns:
-          readiness -- A dictionary that maps a recipe name (of recipes complying to the dietary restrictions) to a readiness value between 0 and 1 as calculated via calculate_readiness"""
-        # obtain all available items
-        available_items = self.get_available_items()
+          readiness -- A dictionary that maps a recipe name to a readiness value between 0 and 1"""
+        selected = readiness > 0.1
 
         recipe_readiness = {}
-        for recipe in recipes:
-            readiness = self.get_recipe_readiness(
-                recipe, available_items, diet)
-            if readiness != None:
-                recipe_readiness[recipe["name"]] = readiness
+        for row, value in zip(rows[selected].tolist(), readiness[selected].tolist()):
+            recipe_readiness[catalog.names[row]] = value
 
         return recipe_readiness
 
-    def get_recipe(self, diet: Diet, take_best: bool) -> str:
+    def get_readiness_of_pantries(self, pantry_ids: list[str], diet: Diet) -> dict:
+        """Calculate the readiness of each recipe for several pantries at once. All pantries are scored against the shared recipe matrix in one operation (see DietPartition.score_many).
+
+        parameters:
+          pantry_ids -- list of pantry ids
+          diet -- dietary preference which a recipe needs to comply to
+
+        returns:
+          readiness -- A dictionary that maps every pantry id to a dictionary mapping a recipe name to its readiness (see get_readiness_of_recipes)"""
+        return self.score_pantries(self.catalog, self.get_available_items_of_pantries(pantry_ids), diet)
+
+    def score_pantries(self, catalog: RecipeCatalog, available_items: dict, diet: Diet) -> dict:
+        """Calculate the readiness of each recipe of a recipe matrix for the available items of several pantries (see get_readiness_of_pantries).
+
+        parameters:
+          catalog -- recipe matrix of the recipes to score
+          available_items -- dictionary mapping every pantry id to the available items of the pantry
+          diet -- dietary preference which a recipe needs to comply to
+
+        returns:
+          readiness -- A dictionary that maps every pantry id to a dictionary mapping a recipe name to its readiness"""
+        if len(available_items) == 0:
+            return {}
+
+        partition = catalog.partition(diet)
+        readiness = partition.score_many(np.stack([catalog.pantry_vector(available_items[pantry_id]) for pantry_id in available_items]))
+
+        return {pantry_id: self.to_recipe_readiness(catalog, partition.rows, readiness[index]) for index, pantry_id in enumerate(available_items)}
+
+    def recommend_batch(self, entries: list[dict], k: int = 5, take_best: bool = True, chunk_size: int = None, workers: int = None):
+        """Propose up to k suitable recipes for each of many pantries (see get_top_recipes). The entries are processed in chunks, where the items of all pantries of a chunk are fetched with one database query and all pantries of a chunk with the same diet are scored against the recipe matrix in one operation (see DietPartition.score_many).
+
+        parameters:
+          entries -- list of dicts, each containing either the id of a pantry at 'pantry_id' or a list of pantry items at 'items', and the diet (a Diet) at 'diet'
+          k -- maximum number of recipes to propose per entry
+          take_best -- Item usage strategy (True = Optimal, False = Random)
+          chunk_size -- number of entries per chunk, defaults to the BATCH_CHUNK_SIZE setting (256)
+          workers -- number of worker processes which score the chunks in parallel, defaults to the BATCH_WORKERS setting (0, i.e., the chunks are scored in this process)
+
+        yields:
+          recommendation -- dict containing the position of the entry at 'index', its pantry id at 'pantry_id' (if given), its diet at 'diet', and the proposed recipes (dicts containing the name and readiness of a recipe) at 'recipes', in the order of the entries
+        """
+        catalog = self.catalog
+        chunk_size = chunk_size or int(getSetting('BATCH_CHUNK_SIZE', 256))
+        workers = int(getSetting('BATCH_WORKERS', 0)) if workers is None else workers
+
+        def prepared_chunks():
+            for start in range(0, len(entries), chunk_size):
+                chunk = entries[start:start+chunk_size]
+                pantry_ids = [entry['pantry_id'] for entry in chunk if 'pantry_id' in entry]
+                available_items = self.get_available_items_of_pantries(pantry_ids) if len(pantry_ids) > 0 else {}
+                yield self.prepare_batch(catalog, chunk, start, available_items)
+
+        if workers <= 0:
+            scorer = BatchScorer.of(catalog)
+            for recommendations, groups in prepared_chunks():
+                results = [scorer.recommend(diet, pantries, k, take_best, self.rng) for diet, positions, pantries in groups]
+                yield from self.collect_batch(recommendations, groups, results)
+            return
+
+        pool = getWorkerPool(catalog, workers)
+        # keep at most two chunks per worker in flight, such that the memory does not depend on the size of the batch
+        pending = deque()
+        try:
+            for recommendations, groups in prepared_chunks():
+                pending.append((recommendations, groups, [pool.submit(recommend_in_worker, diet, pantries, k, take_best) for diet, positions, pantries in groups]))
+                if len(pending) >= 2 * workers:
+                    recommendations, groups, futures = pending.popleft()
+                    yield from self.collect_batch(recommendations, groups, [future.result() for future in futures])
+            while len(pending) > 0:
+                recommendations, groups, futures = pending.popleft()
+                yield from self.collect_batch(recommendations, groups, [future.result() for future in futures])
+        finally:
+            # the pool is shared with other batches, hence only the chunks of this batch are cancelled if it is not consumed completely
+            for recommendations, groups, futures in pending:
+                for future in futures:
+                    future.cancel()
+
+    def prepare_batch(self, catalog: RecipeCatalog, chunk: list[dict], start: int, available_items: dict):
+        """Align the pantries of a chunk of a batch to the recipe matrix and group them by diet (see recommend_batch).
+
+        parameters:
+          catalog -- the recipe matrix
+          chunk -- the entries of the chunk
+          start -- the position of the first entry of the chunk in the batch
+          available_items -- dictionary mapping the pantry ids of the chunk to their available items
+
+        returns:
+          recommendations -- one dict per entry containing its index, pantry id, and diet
+          groups -- list of tuples containing a diet, the positions of the entries of that diet in the chunk, and their pantries (one row per entry)
+        """
+        recommendations = []
+        pantries_of_diets = {}
+        for position, entry in enumerate(chunk):
+            recommendation = {'index': start + position}
+            if 'pantry_id' in entry:
+                recommendation['pantry_id'] = entry['pantry_id']
+                items = available_items[entry['pantry_id']]
+            else:
+                items = self.to_available_items(entry['items'])
+            recommendation['diet'] = entry['diet'].name.lower()
+            recommendations.append(recommendation)
+
+            positions, pantries = pantries_of_diets.setdefault(entry['diet'], ([], []))
+            positions.append(position)
+            pantries.append(catalog.pantry_vector(items))
+
+        groups = [(diet, positions, np.stack(pantries)) for diet, (positions, pantries) in pantries_of_diets.items()]
+        return recommendations, groups
+
+    def collect_batch(self, recommendations: list[dict], groups: list[tuple], results: list[list]) -> list[dict]:
+        """Assign the proposed recipes of every group of a chunk to the entries of the chunk (see prepare_batch)."""
+        for (diet, positions, pantries), recipes in zip(groups, results):
+            for position, proposed in zip(positions, recipes):
+                recommendations[position]['recipes'] = proposed
+        return recommendations
+
+    def get_recipe(self, diet: Diet, take_best: bool, pantry_id: str = None) -> str:
         """Propose a suitable recipe depending on the diet and the item usage strategy.
 
         parameters:
           diet -- A specification of a diet (available from the Diet enumerator) which the returned recipes must comply to.
           take_best -- Item usage strategy (True = Optimal, False = Random)
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items
 
         returns:
           recipe -- A recipe name. If the usage strategy 'Optimal' has been selected (take_best == True) then the recipe with the highest readiness value as calculated in calculate_readiness will be returned - otherwise a random recipe will be returned.
           None -- if none of the the recipes has a readiness value of 0.1 or above or no recipe complying to the diet specification is available
           """
 
+        top_recipes = self.get_top_recipes(diet=diet, k=1, take_best=take_best, pantry_id=pantry_id)
+        if len(top_recipes) == 0:
+            return None
+        return top_recipes[0]['name']
+
+    def get_top_recipes(self, diet: Diet, k: int, take_best: bool = True, pantry_id: str = None) -> list[dict]:
+        """Propose up to k suitable recipes depending on the diet and the item usage strategy.
+
+        parameters:
+          diet -- A specification of a diet (available from the Diet enumerator) which the returned recipes must comply to.
+          k -- maximum number of recipes to propose
+          take_best -- Item usage strategy (True = Optimal, False = Random)
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items
+
+        returns:
+          recipes -- A list of dicts containing the name and readiness of a recipe as well as the substitutes which make up for missing ingredients (see add_substitutes). If the usage strategy 'Optimal' has been selected (take_best == True) then the k recipes with the highest readiness values are returned in descending order - otherwise k recipes are drawn at random without replacement, where recipes with a higher readiness are more likely to be drawn.
+          [] -- if none of the the recipes has a readiness value of 0.1 or above or no recipe complying to the diet specification is available
+          """
+
         # obtain a list of recipes associated to a readiness value
         recipe_readiness = self.get_readiness_of_recipes(
-            recipes=self.recipes, diet=diet)
-        if len(recipe_readiness.keys()) == 0: 
-            return None
+            recipes=self.recipes, diet=diet, pantry_id=pantry_id)
+
+        selected = self.select_recipes(recipe_readiness, k, take_best)
+        if len(selected) == 0:
+            return selected
+        return self.add_substitutes(selected, diet, self.get_available_items(pantry_id=pantry_id))
+
+    def select_recipes(self, recipe_readiness: dict, k: int, take_best: bool) -> list[dict]:
+        """Select up to k recipes by their readiness according to the item usage strategy (see get_top_recipes).
+
+        parameters:
+          recipe_readiness -- A dictionary that maps a recipe name to its readiness value
+          k -- maximum number of recipes to select
+          take_best -- Item usage strategy (True = Optimal, False = Random)
 
-        # order the recipes in descending order according to the readiness values, i.e., the first recipe in the list is the one with the highest readiness value
-        sorted_recipes = [k for k, v in sorted(
-            recipe_readiness.items(), key=lambda item: item[0])]
+        returns:
+          recipes -- A list of dicts containing the name and readiness of a recipe"""
+        names = list(recipe_readiness.keys())
+        scores = np.fromiter(recipe_readiness.values(), dtype=np.float64, count=len(names))
 
-        # determine which recipe to return according to the item usage mode
-        selected_recipe_index = 0
+        # determine which recipes to return according to the item usage mode
         if take_best:
-            selected_recipe_index = random.randint(0, len(sorted_recipes)-1)
+            selected = select_top_k(scores, k)
+        else:
+            selected = sample_weighted(scores, k, self.rng)
+
+        return [{'name': names[index], 'readiness': float(scores[index])} for index in selected]
+
+    def add_substitutes(self, recipes: list[dict], diet: Diet, available_items: dict) -> list[dict]:
+        """Add the substitutes which make up for missing ingredients of the proposed recipes (see RecipeCatalog.used_substitutes).
+
+        parameters:
+          recipes -- A list of dicts containing the name and readiness of a recipe (see select_recipes)
+          diet -- dietary preference which the substitutes need to comply to
+          available_items -- dictionary mapping all available pantry items to their currently available amount
 
-        # determine the recipe name and retrieve the recipe from the list of recipes to return it
-        selected_recipe_name: str = sorted_recipes[selected_recipe_index]
-        return selected_recipe_name
-        
+        returns:
+          recipes -- the same dicts, each containing the list of used substitutes at 'substitutes'"""
+        catalog = self.catalog
+        pantry = catalog.pantry_vector(available_items)
+        for recipe in recipes:
+            recipe['substitutes'] = catalog.used_substitutes(recipe['name'], pantry, diet)
+        return recipes
 
     def get_recipe_by_name(self, recipe_name: str) -> dict:
-      selected_recipe = [recipe for recipe in self.recipes if recipe['name'] == recipe_name][0]
-      return selected_recipe
\ No newline at end of file
+        """Obtain a recipe by its name.
+
+        parameters:
+          recipe_name -- the name of the recipe
+
+        returns:
+          recipe -- the recipe in the structure as found in src/static/recipes
+          None -- if no recipe of this name exists"""
+        return self.catalog.recipe(recipe_name)
+
+    def cook(self, recipe_name: str, servings: float = 1, partial: bool = False, pantry_id: str = None) -> dict:
+        """Consume the ingredients of a recipe from the pantry. All required pantry items are decremented in one bulk write, where every decrement is guarded by the available quantity, such that concurrent changes can never make a quantity negative. The decrements are applied atomically, i.e., either all or none of them, where they are reverted if the database does not support transactions (see DAO.bulk_update).
+
+        parameters:
+          recipe_name -- the name of the cooked recipe
+          servings -- multiple of the required amounts that is consumed
+          partial -- if True, unavailable amounts are skipped, otherwise nothing is consumed if any amount is unavailable. Either way, nothing is consumed if no amount is available.
+          pantry_id -- the id of the pantry, or None for the shared pantry containing all items
+
+        returns:
+          result -- dict containing whether the recipe was cooked at 'cooked', the consumed amounts at 'consumed', the unavailable amounts at 'missing', whether concurrent changes prevented the consumption at 'conflict', and the items of the pantry after the consumption at 'items'
+          None -- if no recipe of this name exists"""
+        recipe = self.get_recipe_by_name(recipe_name)
+        if recipe is None:
+            return None
+
+        dao = self.get_items_dao(pantry_id)
+        items = dao.find(filter={'name': {'$in': [name_pattern(name) for name in recipe['ingredients']]}}, projection=['name', 'quantity', 'unit'])
+        updates, consumed, missing = self.plan_consumption(recipe, items, servings)
+
+        result = {'cooked': False, 'consumed': [], 'missing': missing, 'conflict': False}
+        # a recipe of which no ingredient is available is not cooked, even partially
+        if len(updates) > 0 and (len(missing) == 0 or partial):
+            summary = dao.bulk_update(updates, atomic=True)
+            # without transactions, a missed guard reverts the other decrements (see DAO.bulk_update_compensated), so nothing was consumed either way
+            result['conflict'] = summary.get('aborted', False) or summary['matched'] < len(updates)
+            result['cooked'] = not result['conflict']
+            result['consumed'] = consumed if result['cooked'] else []
+
+        result['items'] = dao.find()
+        return result
+
+    @staticmethod
+    def plan_consumption(recipe: dict, items: list[dict], servings: float = 1):
+        """Plan the decrements of the pantry items which are required to cook a recipe (see cook). The required amounts are converted to the unit of every item, and items of the same name (see normalize_name) are consumed in order.
+
+        parameters:
+          recipe -- the cooked recipe
+          items -- the pantry items of the ingredients of the recipe
+          servings -- multiple of the required amounts that is consumed
+
+        returns:
+          updates -- guarded update operations (see DAO.bulk_update)
+          consumed -- list of dicts containing the name of an item, its id, and the consumed quantity in the unit of the item
+          missing -- list of dicts containing the name of an ingredient and its unavailable amount in base units"""
+        items_of_names = {}
+        for item in items:
+            items_of_names.setdefault(normalize_name(item['name']), []).append(item)
+
+        updates, consumed, missing = [], [], []
+        for ingredient, amount in recipe['ingredients'].items():
+            remaining = parse_amount(amount) * servings
+            for item in items_of_names.get(normalize_name(ingredient), []):
+                if remaining <= 0 or item['quantity'] <= 0:
+                    continue
+                factor = to_base_unit(1, item.get('unit'))[0]
+                # consume the whole item if it does not exceed the remaining amount, which avoids rounding errors in the guard
+                decrement = item['quantity'] if item['quantity'] * factor <= remaining else remaining / factor
+                remaining -= decrement * factor
+                updates.append({'id': item['_id']['$oid'], 'data': {'$inc': {'quantity': -decrement}}, 'filter': {'quantity': {'$gte': decrement}}})
+                consumed.append({'name': ingredient, 'id': item['_id']['$oid'], 'quantity': decrement, 'unit': item.get('unit')})
+            if remaining > 1e-9:
+                missing.append({'name': ingredient, 'amount': remaining})
+
+        return updates, consumed, missing
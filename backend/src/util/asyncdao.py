@@ -0,0 +1,350 @@
+# coding=utf-8
+import os
+import time
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+from bson.objectid import ObjectId
+
+from src.util.dao import getSetting, usesMemoryStorage, getValidator, getIndexes, pool_monitor, snapshot_cache, bson_to_json, prepare_cursor, rebuild_created, scope_filter, check_scoped_update, is_transactional, TransactionAborted, BulkUpdate, getSchemaValidator, check_entries, merge_errors
+
+# manage one asynchronous client per database URL, which is shared by all asynchronous data access objects of the process
+async_clients = {}
+def getAsyncClient():
+    """Obtain the asynchronous client of the MongoDB database as specified in the environment variables (see getClient). The client is bound to the event loop in which it is first used.
+
+    returns:
+        client -- AsyncIOMotorClient shared within the current process
+    """
+    MONGO_URL = getSetting('MONGO_URL')
+    if MONGO_URL not in async_clients:
+        async_clients[MONGO_URL] = AsyncIOMotorClient(
+            MONGO_URL,
+            maxPoolSize=int(getSetting('MONGO_MAX_POOL_SIZE', 100)),
+            minPoolSize=int(getSetting('MONGO_MIN_POOL_SIZE', 0)),
+            connectTimeoutMS=int(getSetting('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+            serverSelectionTimeoutMS=int(getSetting('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+            event_listeners=[pool_monitor])
+    return async_clients[MONGO_URL]
+
+# whether the database of a URL supports multi-document transactions (see supportsTransactions)
+async_transactions = {}
+async def supportsAsyncTransactions() -> bool:
+    """Determine whether the MongoDB database supports multi-document transactions (see supportsTransactions)."""
+    if usesMemoryStorage():
+        return False
+    MONGO_URL = getSetting('MONGO_URL')
+    if MONGO_URL not in async_transactions:
+        async_transactions[MONGO_URL] = is_transactional(await getAsyncClient().admin.command('hello'))
+    return async_transactions[MONGO_URL]
+
+# manage a collection of asynchronous data access objects, such that every collection only requires one object
+async_daos = {}
+
+def resetAsyncClients():
+    """Discard all asynchronous clients and the collections of all asynchronous data access objects, which is called in every child process after a fork (see resetClients)."""
+    async_clients.clear()
+    async_transactions.clear()
+    for dao in async_daos.values():
+        dao.reset()
+
+os.register_at_fork(after_in_child=resetAsyncClients)
+
+def getAsyncDao(collection_name: str, pantry_id: str = None):
+    """Obtain an asynchronous data access object of a collection, where data access objects scoped to a pantry are created on every call (see getDao).
+
+    parameters:
+        collection_name -- the name of the collection
+        pantry_id -- optional id of a pantry, such that the data access object only accesses the objects of this pantry
+
+    returns:
+        dao -- AsyncDAO to the given collection
+    """
+    if pantry_id is not None:
+        return AsyncDAO(collection_name=collection_name, pantry_id=pantry_id)
+    if collection_name not in async_daos:
+        async_daos[collection_name] = AsyncDAO(collection_name=collection_name)
+    return async_daos[collection_name]
+
+class AsyncDAO:
+
+    def __init__(self, collection_name: str, pantry_id: str = None):
+        """Establish an asynchronous data access object to a collection of the given name. It offers the same operations as the DAO, but every operation is a coroutine which does not block the event loop while waiting for the database.
+
+        parameters:
+            collection_name -- the name of the collection (a collection validator of the same name must be available)
+            pantry_id -- optional id of the pantry to which the data access object is scoped (see DAO)
+        """
+        self.collection_name = collection_name
+        self.pantry_id = pantry_id
+        self.cache_name = collection_name if pantry_id is None else f'{collection_name}/{pantry_id}'
+        self._collection = None
+        self.lock = None
+
+    async def get_collection(self):
+        """Obtain the MongoDB collection of this data access object, which is set up on first use (see DAO.setup).
+
+        returns:
+            collection -- the motor collection
+        """
+        if self.pantry_id is not None:
+            # all pantries share the collection of the unscoped data access object
+            return await getAsyncDao(self.collection_name).get_collection()
+        if self._collection is None:
+            if self.lock is None:
+                self.lock = asyncio.Lock()
+            async with self.lock:
+                if self._collection is None:
+                    self._collection = await self.setup()
+        return self._collection
+
+    def scoped(self, pantry_id: str) -> 'AsyncDAO':
+        """Obtain the asynchronous data access object of the same collection scoped to a pantry (see getAsyncDao)."""
+        return getAsyncDao(self.collection_name, pantry_id=pantry_id)
+
+    def reset(self):
+        """Forget the collection and its lock, such that it is set up again via a new client on next use (see DAO.reset)."""
+        self._collection = None
+        self.lock = None
+
+    async def setup(self):
+        """Connect to the collection via the shared asynchronous client and create the collection with its validator and indexes if necessary. If the memory storage backend is selected, the in-memory collection shared with the DAO is used instead (see usesMemoryStorage).
+
+        returns:
+            collection -- the motor collection
+        """
+        if usesMemoryStorage():
+            from src.util.memorydb import getMemoryCollection, AsyncMemoryCollection
+            return AsyncMemoryCollection(getMemoryCollection(self.collection_name))
+
+        database = getAsyncClient().tinychef
+
+        # create the collection if it does not yet exist
+        if self.collection_name not in await database.list_collection_names():
+            validator = getValidator(self.collection_name)
+            await database.create_collection(self.collection_name, validator=validator)
+
+        collection = database[self.collection_name]
+
+        # create the indexes of the collection (which has no effect if they already exist)
+        for index in getIndexes(self.collection_name):
+            options = {key: value for key, value in index.items() if key not in ['keys', 'description']}
+            await collection.create_index([tuple(key) for key in index['keys']], **options)
+
+        return collection
+
+    async def create(self, data: dict):
+        """Create a new document in the collection (see DAO.create).
+
+        parameters:
+            data -- a dict containing key-value pairs compliant to the validator
+
+        returns:
+            object -- the newly created MongoDB document (parsed to a JSON object) containing the input data and an _id attribute
+
+        raises:
+            ValidationError - in case at least one of the validator criteria is violated (see getSchemaValidator)
+            WriteError - in case the database rejects the object
+        """
+        localdata = dict(data)
+        if self.pantry_id is not None:
+            localdata['pantry_id'] = self.pantry_id
+        getSchemaValidator(self.collection_name).validate(localdata)
+
+        collection = await self.get_collection()
+        await collection.insert_one(localdata)
+        snapshot_cache.invalidate(self.cache_name)
+        return self.to_json(rebuild_created(localdata))
+
+    async def create_many(self, data: list[dict]):
+        """Create several new documents in the collection in one round trip (see DAO.create_many).
+
+        parameters:
+            data -- a list of dicts containing key-value pairs compliant to the validator
+
+        returns:
+            result -- a dict containing the newly created documents at 'created' and the rejected documents at 'errors'
+        """
+        localdata = [dict(document) for document in data]
+        if len(localdata) == 0:
+            return {'created': [], 'errors': []}
+        if self.pantry_id is not None:
+            for document in localdata:
+                document['pantry_id'] = self.pantry_id
+
+        accepted, rejected = check_entries(localdata, getSchemaValidator(self.collection_name).errors)
+
+        errors = []
+        if len(accepted) > 0:
+            collection = await self.get_collection()
+            try:
+                await collection.insert_many([localdata[index] for index in accepted], ordered=False)
+            except BulkWriteError as e:
+                errors = [{'index': error['index'], 'message': error['errmsg']} for error in e.details['writeErrors']]
+            finally:
+                snapshot_cache.invalidate(self.cache_name)
+        errors = merge_errors(errors, accepted, rejected)
+
+        failed = set(error['index'] for error in errors)
+        created = [self.to_json(rebuild_created(document)) for index, document in enumerate(localdata) if index not in failed]
+        return {'created': created, 'errors': errors}
+
+    async def findOne(self, id: str):
+        """Find one specific object in the collection with the _id property equal to the given id.
+
+        parameters:
+            id -- id value of the requested object
+
+        returns:
+            object -- MongoDB document (parsed to json object)
+        """
+        collection = await self.get_collection()
+        obj = await collection.find_one(scope_filter({'_id': ObjectId(id)}, self.pantry_id))
+        return self.to_json(obj)
+
+    async def find(self, filter=None, toid: list = None, projection: list = None, after: str = None, limit: int = None):
+        """Find all objects contained in the collection which comply to the given filter (see DAO.find).
+
+        returns:
+            [object] -- list of objects compliant to the given filter
+        """
+        return [obj async for obj in self.iter_find(filter=filter, toid=toid, projection=projection, after=after, limit=limit)]
+
+    async def iter_find(self, filter=None, toid: list = None, projection: list = None, after: str = None, limit: int = None, batch_size: int = 100):
+        """Iterate asynchronously over all objects contained in the collection which comply to the given filter (see DAO.iter_find).
+
+        yields:
+            object -- object compliant to the given filter
+        """
+        collection = await self.get_collection()
+        cursor = prepare_cursor(collection, filter=scope_filter(filter, self.pantry_id), toid=toid, projection=projection, after=after, limit=limit, batch_size=batch_size)
+        async for obj in cursor:
+            yield self.to_json(obj)
+
+    async def aggregate(self, pipeline: list[dict]):
+        """Run an aggregation pipeline on the collection (see DAO.aggregate).
+
+        returns:
+            [object] -- list of results of the pipeline
+        """
+        if self.pantry_id is not None:
+            pipeline = [{'$match': {'pantry_id': self.pantry_id}}] + list(pipeline)
+        collection = await self.get_collection()
+        return [self.to_json(obj) async for obj in collection.aggregate(pipeline)]
+
+    async def versioned_snapshot(self, projection: list = None):
+        """Obtain all objects contained in the collection from the snapshot cache, which is shared with the DAO of the same collection, together with the version of the snapshot (see DAO.versioned_snapshot).
+
+        returns:
+            [object], version -- list of all objects in the collection (must not be modified by the caller) and its version
+        """
+        variant = tuple(projection) if projection else None
+        found, snapshot, version, generation = snapshot_cache.lookup(self.cache_name, variant)
+        if found:
+            return snapshot, version
+
+        loaded_at = time.monotonic()
+        snapshot = await self.find(projection=projection)
+        return snapshot, snapshot_cache.store(self.cache_name, variant, generation, loaded_at, snapshot) or version
+
+    def snapshot_version(self) -> int:
+        """Obtain the version of the content of the collection (see SnapshotCache.version)."""
+        return snapshot_cache.version(self.cache_name)
+
+    async def update(self, id: str, update_data: dict):
+        """Update one specific object in the collection (see DAO.update).
+
+        returns:
+            True -- if the update was successful
+            False -- otherwise
+        """
+        if self.pantry_id is not None:
+            check_scoped_update(update_data)
+        getSchemaValidator(self.collection_name).validate_update(update_data)
+        collection = await self.get_collection()
+        update_result = await collection.update_one(scope_filter({'_id': ObjectId(id)}, self.pantry_id), update_data)
+        snapshot_cache.invalidate(self.cache_name)
+        return update_result.acknowledged
+
+    async def bulk_update(self, updates: list[dict], atomic: bool = False):
+        """Update several objects of the collection in one round trip (see DAO.bulk_update).
+
+        returns:
+            result -- a dict containing the number of matched and modified objects and the failed updates at 'errors'
+        """
+        bulk = BulkUpdate(updates, self.collection_name, self.pantry_id, atomic)
+        skipped = bulk.skipped()
+        if skipped is not None:
+            return skipped
+
+        collection = await self.get_collection()
+        if atomic and await supportsAsyncTransactions():
+            return await self.bulk_update_in_transaction(collection, bulk.operations)
+        if bulk.compensable():
+            return await self.apply_compensated(collection, bulk.compensate())
+
+        try:
+            result = (await collection.bulk_write(bulk.operations, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+        finally:
+            snapshot_cache.invalidate(self.cache_name)
+        return bulk.summarize(result)
+
+    async def apply_compensated(self, collection, steps):
+        """Send the update operations of a compensated bulk update to the database one after another (see DAO.apply_compensated)."""
+        try:
+            operation = next(steps)
+            while True:
+                try:
+                    result = await collection.update_one(*operation)
+                except Exception as e:
+                    operation = steps.throw(e)
+                else:
+                    operation = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            snapshot_cache.invalidate(self.cache_name)
+
+    async def bulk_update_in_transaction(self, collection, operations: list):
+        """Apply update operations in one transaction, which is rolled back unless every operation matched its object (see DAO.bulk_update_in_transaction)."""
+        try:
+            async with await getAsyncClient().start_session() as session:
+                async with session.start_transaction():
+                    result = (await collection.bulk_write(operations, ordered=True, session=session)).bulk_api_result
+                    if result['nMatched'] < len(operations):
+                        raise TransactionAborted(result)
+            return BulkUpdate.summarize_transaction(result, aborted=False)
+        except TransactionAborted as e:
+            return BulkUpdate.summarize_transaction(e.result, aborted=True)
+        except BulkWriteError as e:
+            return BulkUpdate.summarize_transaction(e.details, aborted=True)
+        finally:
+            snapshot_cache.invalidate(self.cache_name)
+
+    async def delete(self, id: str):
+        """Remove one specific object from the collection (see DAO.delete).
+
+        returns:
+            True -- if the deletion was successful
+            False -- otherwise
+        """
+        collection = await self.get_collection()
+        result = await collection.delete_one(scope_filter({'_id': ObjectId(id)}, self.pantry_id))
+        snapshot_cache.invalidate(self.cache_name)
+        return result.acknowledged
+
+    async def drop(self):
+        """Remove the entire collection, or all objects of the pantry if the data access object is scoped to a pantry"""
+        collection = await self.get_collection()
+        if self.pantry_id is not None:
+            await collection.delete_many({'pantry_id': self.pantry_id})
+        else:
+            await collection.drop()
+        snapshot_cache.invalidate(self.cache_name)
+
+    def to_json(self, data):
+        """Transform a MongoDB document into a json object (see bson_to_json)."""
+        return bson_to_json(data)
@@ -0,0 +1,141 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.static.diets import Diet, from_string
+from src.util.pantry import PANTRY_ID_PATTERN, parse_pantry_id, requires_pantry_id
+from src.util.selection import select_top_k, sample_weighted
+
+# maximum number of matrix entries (pantries times ingredients of all recipes) that are scored at once, which bounds the memory of a batch to a few hundred megabytes
+MAX_BATCH_ENTRIES = 2 ** 24
+
+def parse_batch(data) -> tuple:
+    """Parse the body of a batch recommendation request (see recipe_blueprint.batch).
+
+    returns:
+      entries, k, take_best, chunk_size -- the parsed parameters (see RecipeController.recommend_batch)
+
+    raises:
+      ValueError -- in case any parameter is invalid
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('pantries'), list):
+        raise ValueError('the body must contain a list of pantries')
+    k = data.get('k', 5)
+    chunk_size = data.get('chunk_size')
+    if not isinstance(k, int) or k < 1 or (chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size < 1)):
+        raise ValueError('invalid batch parameters')
+
+    entries = []
+    for pantry in data['pantries']:
+        if not isinstance(pantry, dict):
+            raise ValueError('every pantry must be an object')
+        entry = {'diet': from_string(str(pantry.get('diet', 'normal')))}
+        if isinstance(pantry.get('pantry_id'), str) and PANTRY_ID_PATTERN.fullmatch(pantry['pantry_id']):
+            entry['pantry_id'] = pantry['pantry_id']
+        elif isinstance(pantry.get('items'), list):
+            entry['items'] = [{'name': str(item['name']), 'quantity': float(item['quantity']), 'unit': None if item.get('unit') is None else str(item['unit'])} for item in pantry['items']]
+        else:
+            raise ValueError('every pantry must contain a valid pantry_id or a list of items')
+        entries.append(entry)
+
+    return entries, k, data.get('usage_mode', 'optimal') == 'optimal', chunk_size
+
+def check_batch_access(entries: list[dict], headers):
+    """Ensure that a batch only accesses the pantry selected by the request if the pantries are separated (see requires_pantry_id), as the batch would otherwise give access to the items of every pantry. Entries containing their items do not access any pantry.
+
+    parameters:
+      entries -- the parsed entries of the batch (see parse_batch)
+      headers -- the headers of the request
+
+    raises:
+      ValueError -- in case the pantry id of the request is missing or invalid (see parse_pantry_id)
+      PermissionError -- in case an entry refers to another pantry than the one of the request
+    """
+    if not requires_pantry_id():
+        return
+    pantry_id = parse_pantry_id(headers)
+    if any(entry.get('pantry_id', pantry_id) != pantry_id for entry in entries):
+        raise PermissionError('a batch may only refer to the pantry of the request')
+
+class BatchScorer:
+    def __init__(self, partitions: dict, names: list[str]):
+        """Score many pantries against the recipe matrix and select recipes for each of them. The scorer only contains the arrays of the recipe matrix, such that it can be sent to worker processes.
+
+        parameters:
+          partitions -- dictionary mapping every diet to the partition of the recipe matrix complying to the diet (see RecipeCatalog.partition)
+          names -- the names of the recipes in the order of the rows of the recipe matrix
+        """
+        self.partitions = partitions
+        self.names = names
+
+    @classmethod
+    def of(cls, catalog) -> 'BatchScorer':
+        """Create a scorer of all diets of a recipe catalog."""
+        return cls({diet: catalog.partition(diet) for diet in Diet}, list(catalog.names))
+
+    def recommend(self, diet: Diet, pantries: np.ndarray, k: int, take_best: bool, rng: np.random.Generator) -> list[list[dict]]:
+        """Select up to k recipes for every pantry (see RecipeController.select_recipes).
+
+        parameters:
+          diet -- dietary preference which the recipes need to comply to
+          pantries -- two-dimensional array containing one pantry (see RecipeCatalog.pantry_vector) per row
+          k -- maximum number of recipes per pantry
+          take_best -- Item usage strategy (True = Optimal, False = Random)
+          rng -- random number generator for the random item usage strategy
+
+        returns:
+          recipes -- one list per pantry, containing dicts with the name and readiness of a recipe
+        """
+        partition = self.partitions[diet]
+        block = max(1, MAX_BATCH_ENTRIES // max(1, len(partition.indices)))
+
+        recommendations = []
+        for start in range(0, len(pantries), block):
+            for readiness in partition.score_many(pantries[start:start+block]):
+                # only recipes that have a readiness above 0.1 are proposed
+                candidates = (readiness > 0.1).nonzero()[0]
+                scores = readiness[candidates]
+                selected = select_top_k(scores, k) if take_best else sample_weighted(scores, k, rng)
+                recommendations.append([{'name': self.names[partition.rows[candidates[index]]], 'readiness': float(scores[index])} for index in selected])
+        return recommendations
+
+# the scorer of a worker process, which is sent once when the worker is started
+worker_scorer = None
+
+def init_worker(scorer: BatchScorer):
+    global worker_scorer
+    worker_scorer = scorer
+
+# the worker processes of this process together with the version of the catalog and the number of workers they were started with
+worker_pool = None
+worker_pool_lock = threading.Lock()
+
+def getWorkerPool(catalog, workers: int) -> ProcessPoolExecutor:
+    """Obtain the worker processes which score batches of a catalog (see recommend_in_worker). The workers are started once per process and only replaced when the catalog changes, as every worker receives the scorer of the catalog on start. A replaced pool is shut down as soon as the batches which still use it are done and release it.
+
+    parameters:
+      catalog -- the recipe catalog (see RecipeCatalog)
+      workers -- the number of worker processes
+
+    returns:
+      pool -- the ProcessPoolExecutor shared by all batches of this process
+    """
+    global worker_pool
+    with worker_pool_lock:
+        if worker_pool is None or worker_pool[0] != (catalog.version, workers):
+            worker_pool = ((catalog.version, workers), ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(BatchScorer.of(catalog),)))
+        return worker_pool[1]
+
+def resetWorkerPool():
+    """Forget the worker processes of the parent, which is called in every child process after a fork (see resetClients)."""
+    global worker_pool, worker_pool_lock
+    worker_pool = None
+    worker_pool_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=resetWorkerPool)
+
+def recommend_in_worker(diet: Diet, pantries: np.ndarray, k: int, take_best: bool) -> list[list[dict]]:
+    """Select recipes for every pantry in a worker process (see BatchScorer.recommend)."""
+    return worker_scorer.recommend(diet, pantries, k, take_best, np.random.default_rng())
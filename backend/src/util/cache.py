@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, size: int, weigh=None):
+        """Cache a bounded number of values, where the least recently used value is evicted once the cache is full.
+
+        parameters:
+            size -- maximum number of cached values (0 disables the cache), or their maximum total weight if weigh is given
+            weigh -- optional function that returns the weight of a value (e.g., its length in bytes), defaults to a weight of 1 per value
+        """
+        self.size = size
+        self.weigh = weigh if weigh is not None else (lambda value: 1)
+        self.weight = 0
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Obtain a cached value.
+
+        parameters:
+            key -- hashable key of the value
+
+        returns:
+            value -- the cached value
+            None -- if no value is cached for the key
+        """
+        with self.lock:
+            if key not in self.values:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.values.move_to_end(key)
+            return self.values[key]
+
+    def put(self, key, value):
+        """Cache a value and evict the least recently used values if the cache is full.
+
+        parameters:
+            key -- hashable key of the value
+            value -- the value to cache
+        """
+        weight = self.weigh(value)
+        if weight > self.size:
+            return
+        with self.lock:
+            if key in self.values:
+                self.weight -= self.weigh(self.values[key])
+            self.values[key] = value
+            self.values.move_to_end(key)
+            self.weight += weight
+            while self.weight > self.size:
+                self.weight -= self.weigh(self.values.popitem(last=False)[1])
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+            self.weight = 0
+
+    def stats(self) -> dict:
+        """Report the usage of the cache.
+
+        returns:
+            stats -- dict containing the number of hits, misses, and cached values as well as their total weight
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.values), 'weight': self.weight, 'max_size': self.size}
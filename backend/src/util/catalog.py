@@ -0,0 +1,779 @@
+import os
+import json
+import mmap
+import itertools
+import threading
+from collections.abc import Sequence
+
+import numpy as np
+
+from src.static.diets import Diet
+from src.util.units import parse_amount
+from src.util.pantry import normalize_name
+
+# location of the recipe files, independent of the current working directory
+RECIPE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'recipes')
+
+# location of the ingredient substitution graph (see read_substitutes)
+SUBSTITUTE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'substitutes.json')
+
+# identification of the binary snapshot format (see RecipeCatalog.write)
+SNAPSHOT_MAGIC = b'TCHEFCAT'
+SNAPSHOT_VERSION = 5
+SNAPSHOT_ALIGNMENT = 8
+
+# arrays of a diet partition which are stored in the binary snapshot (see DietPartition.arrays)
+PARTITION_ARRAYS = ['rows', 'ingredient_counts', 'indices', 'amounts', 'local_rows', 'indptr', 'substitute_targets', 'substitute_sources', 'substitute_factors', 'ingredient_indptr', 'ingredient_rows']
+
+# every catalog obtains a unique version, which identifies it in caches
+catalog_versions = itertools.count(1)
+
+def read_recipes(directory: str = RECIPE_DIRECTORY) -> list[dict]:
+    """Read all recipes of a directory, which contains one JSON file per recipe.
+
+    parameters:
+      directory -- the directory containing the recipe files
+
+    returns:
+      recipes -- list of recipes in dictionary format"""
+    return list(read_recipe_files(directory).values())
+
+def read_recipe_files(directory: str = RECIPE_DIRECTORY, filenames: list[str] = None) -> dict:
+    """Read recipe files of a directory.
+
+    parameters:
+      directory -- the directory containing the recipe files
+      filenames -- the names of the files to read, defaults to all files of the directory
+
+    returns:
+      recipes -- dictionary mapping the name of every file to the recipe it contains"""
+    recipes: dict = {}
+    for filename in sorted(os.listdir(directory) if filenames is None else filenames):
+        with open(os.path.join(directory, filename)) as f:
+            recipes[filename] = json.load(f)
+    return recipes
+
+def read_substitutes(path: str = SUBSTITUTE_FILE) -> list[dict]:
+    """Read the ingredient substitution graph, which is a JSON list of edges. Every edge contains the name of an ingredient at "ingredient", the name of a pantry item which can replace it at "substitute", the amount of the ingredient which one unit of the substitute replaces (both in base units, see to_base_unit) at "factor", and the diets the substitute complies to at "diets".
+
+    parameters:
+      path -- the file containing the substitution graph
+
+    returns:
+      substitutes -- list of edges in dictionary format
+
+    raises:
+      ValueError -- in case any edge is invalid
+    """
+    with open(path) as f:
+        substitutes = json.load(f)
+    for substitute in substitutes:
+        if not isinstance(substitute.get('factor'), (int, float)) or substitute['factor'] <= 0 or substitute.get('ingredient') == substitute.get('substitute'):
+            raise ValueError(f'invalid substitute {substitute}')
+    return substitutes
+
+def diet_flag(diet: Diet) -> int:
+    """Obtain the bit which represents a diet in the diet bitmask of a recipe."""
+    return 1 << (diet.value - 1)
+
+class LazyRecipes(Sequence):
+    """Read-only list of the recipes of a snapshot, which decodes the body of a recipe only when it is accessed."""
+    def __init__(self, bodies: memoryview, offsets: np.ndarray):
+        self.bodies = bodies
+        self.offsets = offsets
+        self.decoded = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index not in self.decoded:
+            start, end = int(self.offsets[index]), int(self.offsets[index+1])
+            self.decoded[index] = json.loads(bytes(self.bodies[start:end]))
+        return self.decoded[index]
+
+class MergedRecipes(Sequence):
+    """Read-only list of recipes, which consists of selected recipes of another list followed by further recipes. The recipes of the other list are only accessed when needed (see LazyRecipes)."""
+    def __init__(self, base: Sequence, selected: np.ndarray, appended: list[dict]):
+        self.base = base
+        self.selected = selected
+        self.appended = appended
+
+    @staticmethod
+    def of(base: Sequence, selected: np.ndarray, appended: list[dict]) -> 'MergedRecipes':
+        """Create a list of the selected recipes of another list followed by further recipes (see MergedRecipes), which refers to the original list instead of the given one if that is itself merged, such that repeated merges do not chain the lists.
+
+        parameters:
+          base -- the other list of recipes
+          selected -- ascending array of the positions of the selected recipes in the other list
+          appended -- list of the further recipes
+        """
+        if not isinstance(base, MergedRecipes):
+            return MergedRecipes(base, selected, appended)
+        # as the positions are ascending, the recipes selected from the original list precede those appended to it
+        split = int(np.searchsorted(selected, len(base.selected)))
+        return MergedRecipes(base.base, base.selected[selected[:split]],
+            [base.appended[int(index) - len(base.selected)] for index in selected[split:]] + list(appended))
+
+    def __len__(self) -> int:
+        return len(self.selected) + len(self.appended)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < len(self.selected):
+            return self.base[int(self.selected[index])]
+        return self.appended[index - len(self.selected)]
+
+def compile_rows(recipes: list[dict], ingredients: dict):
+    """Compile recipes into rows of the recipe matrix.
+
+    parameters:
+      recipes -- list of recipes in the structure as found in src/static/recipes
+      ingredients -- dictionary mapping every known ingredient to its column, which is extended by unknown ingredients
+
+    returns:
+      counts -- array containing the number of ingredients of every recipe
+      indices -- array containing the columns of the ingredients of all recipes
+      amounts -- array containing the required amounts of the ingredients of all recipes in base units
+      diet_bits -- array containing the diet bitmask of every recipe"""
+    counts: list[int] = []
+    indices: list[int] = []
+    amounts: list[float] = []
+    for recipe in recipes:
+        for ingredient, amount in recipe['ingredients'].items():
+            column = ingredients.setdefault(ingredient, len(ingredients))
+            indices.append(column)
+            amounts.append(parse_amount(amount))
+        counts.append(len(recipe['ingredients']))
+
+    # every diet a recipe complies to is represented by one bit
+    diet_bits = [sum(diet_flag(diet) for diet in Diet if diet.name.lower() in recipe['diets']) for recipe in recipes]
+
+    return (np.array(counts, dtype=np.int64), np.array(indices, dtype=np.int32),
+        np.array(amounts, dtype=np.float64), np.array(diet_bits, dtype=np.uint8))
+
+def compile_substitutes(substitutes: list[dict], ingredients: dict):
+    """Compile the edges of the substitution graph (see read_substitutes), sorted by the column of the ingredient they replace.
+
+    parameters:
+      substitutes -- list of edges in dictionary format
+      ingredients -- dictionary mapping every known ingredient to its column, which is extended by substitutes that no recipe requires
+
+    returns:
+      targets -- array containing the column of the replaced ingredient of every edge
+      sources -- array containing the column of the substitute of every edge
+      factors -- array containing the amount of the ingredient which one unit of the substitute replaces
+      diet_bits -- array containing the diet bitmask of every substitute"""
+    targets = [ingredients.setdefault(substitute['ingredient'], len(ingredients)) for substitute in substitutes]
+    sources = [ingredients.setdefault(substitute['substitute'], len(ingredients)) for substitute in substitutes]
+    factors = [float(substitute['factor']) for substitute in substitutes]
+    diet_bits = [sum(diet_flag(diet) for diet in Diet if diet.name.lower() in substitute['diets']) for substitute in substitutes]
+
+    order = np.argsort(np.array(targets, dtype=np.int32), kind='stable')
+    return (np.array(targets, dtype=np.int32)[order], np.array(sources, dtype=np.int32)[order],
+        np.array(factors, dtype=np.float64)[order], np.array(diet_bits, dtype=np.uint8)[order])
+
+class RecipeCatalog:
+    def __init__(self, recipes: list[dict], files: list[str] = None, substitutes: list[dict] = None):
+        """Compile a list of recipes into a recipe matrix, which allows to calculate the readiness of all recipes in one batched operation. Every ingredient is assigned to a column and every recipe to a row. Since a recipe only requires a few of all known ingredients, the matrix is stored in compressed sparse row format (see https://en.wikipedia.org/wiki/Sparse_matrix#Compressed_sparse_row_(CSR,_CRS_or_Yale_format)).
+        The substitution graph is compiled into the same columns, such that the partition of every diet can add the amounts of the substitutes complying to the diet to the ingredients they replace before scoring (see DietPartition.resolve).
+
+        parameters:
+          recipes -- list of recipes in the structure as found in src/static/recipes
+          files -- optional list containing the name of the file of every recipe
+          substitutes -- optional substitution graph (see read_substitutes)
+        """
+        # map every ingredient name to its column in the recipe matrix
+        ingredients: dict[str, int] = {}
+
+        # the ingredients of recipe i are stored in indices[indptr[i]:indptr[i+1]] with the required amounts in amounts[indptr[i]:indptr[i+1]]
+        counts, indices, amounts, diet_bits = compile_rows(recipes, ingredients)
+        substitute_targets, substitute_sources, substitute_factors, substitute_diet_bits = compile_substitutes(substitutes or [], ingredients)
+
+        self.setup(
+            recipes=recipes,
+            names=[recipe['name'] for recipe in recipes],
+            files=files or [None] * len(recipes),
+            ingredients=list(ingredients.keys()),
+            indptr=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            indices=indices,
+            amounts=amounts,
+            diet_bits=diet_bits,
+            substitute_targets=substitute_targets,
+            substitute_sources=substitute_sources,
+            substitute_factors=substitute_factors,
+            substitute_diet_bits=substitute_diet_bits)
+
+    def setup(self, recipes: Sequence, names: list[str], files: list[str], ingredients: list[str], indptr: np.ndarray, indices: np.ndarray, amounts: np.ndarray, diet_bits: np.ndarray,
+            substitute_targets: np.ndarray, substitute_sources: np.ndarray, substitute_factors: np.ndarray, substitute_diet_bits: np.ndarray):
+        """Derive the lookup structures of the recipe matrix from its arrays."""
+        self.version = next(catalog_versions)
+        self.recipes = recipes
+        self.names: list[str] = names
+        self.files: list[str] = files
+
+        # map every recipe name to its row
+        self.positions: dict[str, int] = {name: row for row, name in enumerate(names)}
+
+        self.ingredients: dict[str, int] = {ingredient: column for column, ingredient in enumerate(ingredients)}
+        self.ingredient_names: list[str] = list(ingredients)
+
+        # map every normalized ingredient name to its columns, such that pantry items match ingredients regardless of case and whitespace
+        self.ingredient_keys: dict[str, list[int]] = {}
+        for column, ingredient in enumerate(ingredients):
+            self.ingredient_keys.setdefault(normalize_name(ingredient), []).append(column)
+        self.indptr = indptr
+        self.indices = indices
+        self.amounts = amounts
+        self.diet_bits = diet_bits
+
+        # the edges of the substitution graph, sorted by the column of the ingredient they replace (see compile_substitutes)
+        self.substitute_targets = substitute_targets
+        self.substitute_sources = substitute_sources
+        self.substitute_factors = substitute_factors
+        self.substitute_diet_bits = substitute_diet_bits
+
+        # row index of every stored ingredient and number of ingredients per recipe
+        self.ingredient_counts = np.diff(self.indptr)
+        self.rows = np.repeat(np.arange(len(names)), self.ingredient_counts)
+
+        # precompute for every diet which rows comply to it
+        self.diet_masks: dict[Diet, np.ndarray] = {
+            diet: (self.diet_bits & diet_flag(diet)) != 0
+            for diet in Diet
+        }
+        # precompute for every diet which substitutes comply to it
+        self.substitute_masks: dict[Diet, np.ndarray] = {
+            diet: (self.substitute_diet_bits & diet_flag(diet)) != 0
+            for diet in Diet
+        }
+        self.partitions: dict[Diet, DietPartition] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def recipe(self, name: str) -> dict:
+        """Obtain a recipe by its name.
+
+        parameters:
+          name -- the name of the recipe
+
+        returns:
+          recipe -- the recipe in the structure as found in src/static/recipes
+          None -- if the catalog contains no recipe of this name
+        """
+        row = self.positions.get(name)
+        if row is None:
+            return None
+        return self.recipes[row]
+
+    def partition(self, diet: Diet) -> 'DietPartition':
+        """Obtain the partition of the recipe matrix containing only the recipes which comply to a diet. Partitions are created on first use."""
+        if diet not in self.partitions:
+            self.partitions[diet] = DietPartition(self, self.diet_masks[diet], self.substitute_masks[diet])
+        return self.partitions[diet]
+
+    def prepare(self):
+        """Create the partitions of all diets and their indexes at once instead of on first use, e.g., before forking the worker processes of a server, which then share them copy-on-write."""
+        for diet in Diet:
+            self.partition(diet).index()
+
+    def write(self, path: str):
+        """Write the catalog into a binary snapshot. The snapshot starts with a magic string and the length of a JSON header, which contains the recipe and ingredient names as well as the position of every array. All arrays, including the partitions of all diets and their indexes, are aligned, such that they can be used directly from a memory-mapped snapshot. The recipe bodies are stored as concatenated JSON documents.
+
+        parameters:
+          path -- the file to write the snapshot to (replaced atomically)
+        """
+        bodies = [json.dumps(recipe).encode('utf-8') for recipe in self.recipes]
+        arrays = {
+            'indptr': self.indptr,
+            'indices': self.indices,
+            'amounts': self.amounts,
+            'diet_bits': self.diet_bits,
+            'substitute_targets': self.substitute_targets,
+            'substitute_sources': self.substitute_sources,
+            'substitute_factors': self.substitute_factors,
+            'substitute_diet_bits': self.substitute_diet_bits,
+            **{f'{diet.name.lower()}.{name}': array for diet in Diet for name, array in self.partition(diet).arrays().items()},
+            'body_offsets': np.cumsum([0] + [len(body) for body in bodies], dtype=np.int64),
+            'bodies': np.frombuffer(b''.join(bodies), dtype=np.uint8)
+        }
+
+        # determine the position of every array relative to the end of the header
+        layout = {}
+        position = 0
+        for name, array in arrays.items():
+            layout[name] = [position, array.dtype.str, len(array)]
+            position += -(-array.nbytes // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+        header = json.dumps({
+            'version': SNAPSHOT_VERSION,
+            'names': self.names,
+            'files': self.files,
+            'ingredients': list(self.ingredients.keys()),
+            'arrays': layout
+        }).encode('utf-8')
+        header += b' ' * (-(len(SNAPSHOT_MAGIC) + 8 + len(header)) % SNAPSHOT_ALIGNMENT)
+
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            for name, array in arrays.items():
+                data = array.tobytes()
+                f.write(data)
+                f.write(b'\0' * (-len(data) % SNAPSHOT_ALIGNMENT))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RecipeCatalog':
+        """Load a catalog from a binary snapshot (see write). The snapshot is memory-mapped, such that all processes loading the same snapshot share its pages, including the partitions of all diets, and recipe bodies are only decoded once they are accessed.
+
+        parameters:
+          path -- the file containing the snapshot
+
+        returns:
+          catalog -- the recipe catalog
+
+        raises:
+          ValueError -- in case the file is not a snapshot of the current version
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f'{path} is not a recipe catalog snapshot')
+        header_length = int.from_bytes(buffer[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC)+8], 'little')
+        start = len(SNAPSHOT_MAGIC) + 8 + header_length
+        header = json.loads(bytes(buffer[len(SNAPSHOT_MAGIC)+8:start]))
+        if header['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f'{path} has the unsupported snapshot version {header["version"]}')
+
+        arrays = {}
+        for name, (offset, dtype, length) in header['arrays'].items():
+            arrays[name] = np.frombuffer(buffer, dtype=np.dtype(dtype), count=length, offset=start+offset)
+
+        catalog = cls.__new__(cls)
+        catalog.setup(
+            recipes=LazyRecipes(memoryview(arrays['bodies']), arrays['body_offsets']),
+            names=header['names'],
+            files=header['files'],
+            ingredients=header['ingredients'],
+            indptr=arrays['indptr'],
+            indices=arrays['indices'],
+            amounts=arrays['amounts'],
+            diet_bits=arrays['diet_bits'],
+            substitute_targets=arrays['substitute_targets'],
+            substitute_sources=arrays['substitute_sources'],
+            substitute_factors=arrays['substitute_factors'],
+            substitute_diet_bits=arrays['substitute_diet_bits'])
+        catalog.partitions = {
+            diet: DietPartition.of_arrays({name: arrays[f'{diet.name.lower()}.{name}'] for name in PARTITION_ARRAYS}, len(catalog.ingredients))
+            for diet in Diet
+        }
+        return catalog
+
+    @classmethod
+    def open(cls, directory: str = RECIPE_DIRECTORY, path: str = None, substitutes: str = SUBSTITUTE_FILE) -> 'RecipeCatalog':
+        """Obtain the catalog of a recipe directory via its binary snapshot. The snapshot is compiled if it does not exist or if any recipe file or the substitution graph has been changed since it was compiled. If the snapshot cannot be written, the catalog is compiled in memory instead.
+
+        parameters:
+          directory -- the directory containing the recipe files
+          path -- the file containing the snapshot, defaults to the directory name with the extension .catalog
+          substitutes -- the file containing the substitution graph (see read_substitutes), or None to compile the catalog without substitutes
+
+        returns:
+          catalog -- the recipe catalog
+        """
+        path = path or f'{directory.rstrip(os.sep)}.catalog'
+
+        filenames = [os.path.join(directory, filename) for filename in os.listdir(directory)] + ([substitutes] if substitutes else [])
+        last_change = max([os.path.getmtime(directory)] + [os.path.getmtime(filename) for filename in filenames])
+
+        if not os.path.exists(path) or os.path.getmtime(path) < last_change:
+            catalog = cls.compile(directory, substitutes)
+            try:
+                catalog.write(path)
+            except OSError as e:
+                print(f'Recipe catalog snapshot {path} could not be written ({e.__class__.__name__}: {e})')
+                return catalog
+
+        try:
+            return cls.load(path)
+        except ValueError as e:
+            print(f'{e.__class__.__name__}: {e}')
+            catalog = cls.compile(directory, substitutes)
+            try:
+                catalog.write(path)
+            except OSError as e:
+                print(f'Recipe catalog snapshot {path} could not be written ({e.__class__.__name__}: {e})')
+                return catalog
+            return cls.load(path)
+
+    @classmethod
+    def compile(cls, directory: str = RECIPE_DIRECTORY, substitutes: str = SUBSTITUTE_FILE) -> 'RecipeCatalog':
+        """Compile the catalog of all recipe files of a directory and the substitution graph (unless None) in memory."""
+        recipe_files = read_recipe_files(directory)
+        return cls(list(recipe_files.values()), files=list(recipe_files.keys()), substitutes=read_substitutes(substitutes) if substitutes else None)
+
+    def replace(self, recipes: list[dict], files: list[str], removed: set[str]) -> 'RecipeCatalog':
+        """Create a new catalog in which recipes are removed and added without recompiling the unchanged recipes. The existing ingredients keep their columns and unknown ingredients are appended, such that the substitution graph is kept as is. The catalog itself remains unchanged, such that it can still be used while the new catalog is created.
+
+        parameters:
+          recipes -- list of recipes to add, which replace existing recipes of the same name
+          files -- list containing the name of the file of every added recipe
+          removed -- set of names of recipes to remove
+
+        returns:
+          catalog -- the new recipe catalog
+        """
+        replaced = set(removed) | set(recipe['name'] for recipe in recipes)
+        keep = np.array([name not in replaced for name in self.names], dtype=bool)
+        kept_rows = keep.nonzero()[0]
+
+        ingredients = dict(self.ingredients)
+        counts, indices, amounts, diet_bits = compile_rows(recipes, ingredients)
+
+        # select the matrix entries of all kept rows at once
+        kept_entries = np.repeat(keep, self.ingredient_counts)
+
+        catalog = RecipeCatalog.__new__(RecipeCatalog)
+        catalog.setup(
+            recipes=MergedRecipes.of(self.recipes, kept_rows, recipes),
+            names=[self.names[row] for row in kept_rows] + [recipe['name'] for recipe in recipes],
+            files=[self.files[row] for row in kept_rows] + list(files),
+            ingredients=list(ingredients.keys()),
+            indptr=np.concatenate(([0], np.cumsum(np.concatenate((self.ingredient_counts[kept_rows], counts))))).astype(np.int64),
+            indices=np.concatenate((self.indices[kept_entries], indices)),
+            amounts=np.concatenate((self.amounts[kept_entries], amounts)),
+            diet_bits=np.concatenate((self.diet_bits[kept_rows], diet_bits)),
+            substitute_targets=self.substitute_targets,
+            substitute_sources=self.substitute_sources,
+            substitute_factors=self.substitute_factors,
+            substitute_diet_bits=self.substitute_diet_bits)
+        return catalog
+
+    def pantry_vector(self, available_items: dict) -> np.ndarray:
+        """Align the available pantry items to the columns of the recipe matrix.
+
+        parameters:
+          available_items -- dictionary mapping all available pantry items to their currently available amount (see PantryView)
+
+        returns:
+          vector -- array containing the available amount of every known ingredient (0 if it is not available)
+        """
+        vector = np.zeros(len(self.ingredients), dtype=np.float64)
+        for name, amount in available_items.items():
+            for column in self.ingredient_keys.get(normalize_name(name), ()):
+                vector[column] += amount
+        return vector
+
+    def readiness(self, available_items: dict) -> np.ndarray:
+        """Calculate the readiness of all recipes of the catalog at once. The result is identical to applying calculate_readiness to every recipe individually, i.e., substitutes are not considered, since they depend on the diet (see DietPartition.score).
+
+        parameters:
+          available_items -- dictionary mapping all available pantry items to their currently available amount
+
+        returns:
+          readiness -- array containing the readiness value (between 0 and 1) of every recipe in the order of self.recipes
+        """
+        return score_rows(self.pantry_vector(available_items), self.indices, self.amounts, self.rows, self.ingredient_counts)
+
+    def used_substitutes(self, name: str, pantry: np.ndarray, diet: Diet) -> list[dict]:
+        """Determine which substitutes make up for the missing amounts of the ingredients of a recipe (see DietPartition.resolve). The substitutes of an ingredient are used in the order of the substitution graph until the required amount is reached.
+
+        parameters:
+          name -- the name of the recipe
+          pantry -- array containing the available amount of every known ingredient (see pantry_vector)
+          diet -- dietary preference which the substitutes need to comply to
+
+        returns:
+          substitutes -- list of dicts containing the name of the replaced ingredient at "ingredient", the name of the substitute at "substitute", and the used amount of the substitute in base units at "amount"
+        """
+        partition = self.partition(diet)
+        row = self.positions.get(name)
+        used = []
+        if row is None or len(partition.substitute_targets) == 0:
+            return used
+
+        start, end = self.indptr[row], self.indptr[row + 1]
+        for column, amount in zip(self.indices[start:end].tolist(), self.amounts[start:end].tolist()):
+            missing = amount - float(pantry[column])
+            first, last = np.searchsorted(partition.substitute_targets, [column, column + 1])
+            for source, factor in zip(partition.substitute_sources[first:last].tolist(), partition.substitute_factors[first:last].tolist()):
+                if missing <= 0:
+                    break
+                if pantry[source] <= 0:
+                    continue
+                replaced = min(float(pantry[source]) * factor, missing)
+                used.append({'ingredient': self.ingredient_names[column], 'substitute': self.ingredient_names[source], 'amount': replaced / factor})
+                missing -= replaced
+        return used
+
+def gather_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenate the ranges [starts[i], starts[i]+counts[i]) into one array without a Python loop."""
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+def score_rows(pantry: np.ndarray, indices: np.ndarray, amounts: np.ndarray, rows: np.ndarray, ingredient_counts: np.ndarray) -> np.ndarray:
+    """Calculate the readiness of the rows of a recipe matrix (see RecipeCatalog.readiness).
+
+    parameters:
+      pantry -- array containing the available amount of every known ingredient
+      indices, amounts -- columns and required amounts of all matrix entries
+      rows -- row of every matrix entry
+      ingredient_counts -- number of matrix entries of every row
+
+    returns:
+      readiness -- array containing the readiness value of every row"""
+    available = pantry[indices]
+
+    # an ingredient with a required amount of 0 has a readiness of 0 (see calculate_ingredient_readiness)
+    ratios = np.zeros_like(amounts)
+    np.divide(available, amounts, out=ratios, where=amounts != 0)
+    np.minimum(ratios, 1, out=ratios)
+
+    totals = np.bincount(rows, weights=ratios, minlength=len(ingredient_counts))
+    readiness = np.zeros(len(ingredient_counts), dtype=np.float64)
+    np.divide(totals, ingredient_counts, out=readiness, where=ingredient_counts != 0)
+    return readiness
+
+def resolve_substitutes(pantries: np.ndarray, targets: np.ndarray, sources: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """Add the amounts which the available substitutes replace to the available amounts of the ingredients. A substitute only replaces the ingredients of its edges with its own available amount, i.e., substitutes of substitutes are not considered.
+
+    parameters:
+      pantries -- array containing the available amount of every known ingredient, or two-dimensional array containing one such array per row
+      targets, sources, factors -- edges of the substitution graph (see compile_substitutes)
+
+    returns:
+      pantries -- array of the same shape containing the resolved amounts"""
+    if len(targets) == 0:
+        return pantries
+
+    # sum the replaced amounts of all pantries at once by assigning every pantry its own range of columns
+    resolved = np.atleast_2d(pantries)
+    count, width = resolved.shape
+    bins = (np.arange(count) * width)[:, np.newaxis] + targets
+    replaced = np.bincount(bins.ravel(), weights=(resolved[:, sources] * factors).ravel(), minlength=count * width).reshape(count, width)
+    return (resolved + replaced).reshape(pantries.shape)
+
+class DietPartition:
+    def __init__(self, catalog: RecipeCatalog, mask: np.ndarray, substitute_mask: np.ndarray = None):
+        """Extract the rows of a recipe matrix selected by a mask into a separate recipe matrix, such that scoring them does not touch the other rows.
+
+        parameters:
+          catalog -- the recipe catalog
+          mask -- boolean array selecting the rows of the catalog
+          substitute_mask -- optional boolean array selecting the edges of the substitution graph which are resolved before scoring
+        """
+        self.rows = mask.nonzero()[0]
+        self.ingredient_counts = catalog.ingredient_counts[self.rows]
+
+        entries = np.repeat(mask, catalog.ingredient_counts)
+        self.indices = catalog.indices[entries]
+        self.amounts = catalog.amounts[entries]
+        self.local_rows = np.repeat(np.arange(len(self.rows)), self.ingredient_counts)
+        self.indptr = np.concatenate(([0], np.cumsum(self.ingredient_counts))).astype(np.int64)
+        self.ingredient_count = len(catalog.ingredients)
+
+        substitute_mask = np.zeros(len(catalog.substitute_targets), dtype=bool) if substitute_mask is None else substitute_mask
+        self.substitute_targets = catalog.substitute_targets[substitute_mask]
+        self.substitute_sources = catalog.substitute_sources[substitute_mask]
+        self.substitute_factors = catalog.substitute_factors[substitute_mask]
+
+        # index mapping every ingredient to the rows requiring it, which is created on first use
+        self.ingredient_indptr = None
+        self.ingredient_rows = None
+
+    @classmethod
+    def of_arrays(cls, arrays: dict, ingredient_count: int) -> 'DietPartition':
+        """Restore a partition from its arrays (see arrays) without copying them, e.g., from a memory-mapped snapshot (see RecipeCatalog.load).
+
+        parameters:
+          arrays -- dictionary mapping the name of every array in PARTITION_ARRAYS to the array
+          ingredient_count -- number of columns of the recipe matrix
+        """
+        partition = cls.__new__(cls)
+        for name in PARTITION_ARRAYS:
+            setattr(partition, name, arrays[name])
+        partition.ingredient_count = ingredient_count
+        return partition
+
+    def arrays(self) -> dict:
+        """Obtain all arrays of the partition including its index, which is created first (see of_arrays)."""
+        self.index()
+        return {name: getattr(self, name) for name in PARTITION_ARRAYS}
+
+    def resolve(self, pantries: np.ndarray) -> np.ndarray:
+        """Add the amounts which the available substitutes of the partition replace to the available amounts of the ingredients (see resolve_substitutes)."""
+        return resolve_substitutes(pantries, self.substitute_targets, self.substitute_sources, self.substitute_factors)
+
+    def score(self, pantry: np.ndarray) -> np.ndarray:
+        """Calculate the readiness of all rows of the partition (see RecipeCatalog.readiness), where the substitutes of the partition are resolved first.
+
+        parameters:
+          pantry -- array containing the available amount of every known ingredient (see RecipeCatalog.pantry_vector)
+
+        returns:
+          readiness -- array containing the readiness value of every row of the partition
+        """
+        return score_rows(self.resolve(pantry), self.indices, self.amounts, self.local_rows, self.ingredient_counts)
+
+    def score_many(self, pantries: np.ndarray) -> np.ndarray:
+        """Calculate the readiness of all rows of the partition for several pantries at once. The result is identical to applying score to every pantry individually.
+
+        parameters:
+          pantries -- two-dimensional array containing one pantry (see RecipeCatalog.pantry_vector) per row
+
+        returns:
+          readiness -- two-dimensional array containing the readiness value of every row of the partition (columns) for every pantry (rows)
+        """
+        available = self.resolve(pantries)[:, self.indices]
+        ratios = np.zeros_like(available)
+        np.divide(available, self.amounts, out=ratios, where=self.amounts != 0)
+        np.minimum(ratios, 1, out=ratios)
+
+        # sum the ratios of all pantries at once by assigning every pantry its own range of rows
+        count = len(self.rows)
+        bins = (np.arange(len(pantries)) * count)[:, np.newaxis] + self.local_rows
+        totals = np.bincount(bins.ravel(), weights=ratios.ravel(), minlength=len(pantries) * count).reshape(len(pantries), count)
+
+        readiness = np.zeros((len(pantries), count), dtype=np.float64)
+        np.divide(totals, self.ingredient_counts, out=readiness, where=self.ingredient_counts != 0)
+        return readiness
+
+    def index(self):
+        """Create the index mapping every ingredient to the rows requiring it, unless it already exists."""
+        if self.ingredient_indptr is None:
+            order = np.argsort(self.indices, kind='stable')
+            self.ingredient_rows = self.local_rows[order]
+            self.ingredient_indptr = np.concatenate(([0], np.cumsum(np.bincount(self.indices, minlength=self.ingredient_count)))).astype(np.int64)
+
+    def rows_requiring(self, columns: np.ndarray) -> np.ndarray:
+        """Determine the rows of the partition which require at least one of the given ingredients.
+
+        parameters:
+          columns -- array containing the columns of ingredients
+
+        returns:
+          rows -- sorted array of rows of the partition
+        """
+        self.index()
+        starts = self.ingredient_indptr[columns]
+        counts = self.ingredient_indptr[columns + 1] - starts
+        return np.unique(self.ingredient_rows[gather_ranges(starts, counts)])
+
+    def rescore(self, pantry: np.ndarray, previous_pantry: np.ndarray, previous_readiness: np.ndarray) -> np.ndarray:
+        """Calculate the readiness of all rows of the partition by only recalculating the rows which require an ingredient whose available amount changed. The result is identical to score(pantry).
+
+        parameters:
+          pantry -- array containing the available amount of every known ingredient
+          previous_pantry -- the pantry for which previous_readiness was calculated
+          previous_readiness -- the readiness of all rows of the partition for previous_pantry
+
+        returns:
+          readiness -- array containing the readiness value of every row of the partition
+        """
+        pantry, previous_pantry = self.resolve(pantry), self.resolve(previous_pantry)
+        changed = (pantry != previous_pantry).nonzero()[0]
+        rows = self.rows_requiring(changed)
+
+        # recalculating most of the rows individually is slower than scoring the whole partition at once
+        if 2 * len(rows) > len(self.rows):
+            return score_rows(pantry, self.indices, self.amounts, self.local_rows, self.ingredient_counts)
+
+        counts = self.ingredient_counts[rows]
+        entries = gather_ranges(self.indptr[rows], counts)
+
+        readiness = previous_readiness.copy()
+        readiness[rows] = score_rows(pantry, self.indices[entries], self.amounts[entries], np.repeat(np.arange(len(rows)), counts), counts)
+        return readiness
+
+class CatalogWatcher:
+    def __init__(self, catalog: RecipeCatalog, on_change, directory: str = RECIPE_DIRECTORY, interval: float = 2.0):
+        """Watch a recipe directory and keep a catalog up to date. The directory is polled for changed modification times, only changed files are parsed again, and the catalog is updated incrementally (see RecipeCatalog.replace). Every update creates a new catalog, which is passed to on_change, such that readers never observe a partially updated catalog.
+
+        parameters:
+          catalog -- the catalog of the current content of the directory
+          on_change -- function receiving the new catalog after every change
+          directory -- the directory containing the recipe files
+          interval -- seconds between two polls
+        """
+        self.catalog = catalog
+        self.on_change = on_change
+        self.directory = directory
+        self.interval = interval
+        self.modification_times = self.scan()
+        self.stopped = threading.Event()
+
+    def scan(self) -> dict:
+        """Obtain the modification time of every file in the directory."""
+        return {filename: os.path.getmtime(os.path.join(self.directory, filename)) for filename in os.listdir(self.directory)}
+
+    def poll(self) -> RecipeCatalog:
+        """Check the directory for changes once and update the catalog accordingly.
+
+        returns:
+          catalog -- the new catalog if any file changed
+          None -- otherwise
+        """
+        modification_times = self.scan()
+        changed = [filename for filename, mtime in modification_times.items() if self.modification_times.get(filename) != mtime]
+        deleted = [filename for filename in self.modification_times if filename not in modification_times]
+        if len(changed) == 0 and len(deleted) == 0:
+            return None
+
+        try:
+            recipe_files = read_recipe_files(self.directory, changed)
+        except (OSError, ValueError) as e:
+            # a file may be read while it is still being written, hence retry in the next poll
+            print(f'Recipe catalog not updated ({e.__class__.__name__}: {e})')
+            return None
+
+        # remove the previous recipes of all changed and deleted files
+        outdated = set(changed) | set(deleted)
+        removed = set(name for name, file in zip(self.catalog.names, self.catalog.files) if file in outdated)
+
+        self.catalog = self.catalog.replace(list(recipe_files.values()), list(recipe_files.keys()), removed)
+        self.modification_times = modification_times
+        self.on_change(self.catalog)
+        return self.catalog
+
+    def start(self):
+        """Poll the directory in a background thread until stop is called. If watchers are deferred (see defer_watchers), the thread is only started by start_deferred_watchers."""
+        if deferred_watchers is not None:
+            deferred_watchers.append(self)
+            return
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def watch(self):
+        """Poll the directory until stop is called (see start)."""
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def stop(self):
+        self.stopped.set()
+
+# watchers whose start is deferred, or None if watchers are started immediately (see defer_watchers)
+deferred_watchers = None
+
+def defer_watchers():
+    """Defer the start of all catalog watchers until start_deferred_watchers is called. A pre-forking server which creates the application in its master process calls this before loading the application and starts the watchers in every worker (see post_fork in gunicorn.conf.py), since forked processes do not inherit threads and the master does not serve requests."""
+    global deferred_watchers
+    if deferred_watchers is None:
+        deferred_watchers = []
+
+def start_deferred_watchers():
+    """Start all deferred catalog watchers in the current process, where watchers created afterwards are started immediately."""
+    global deferred_watchers
+    watchers, deferred_watchers = deferred_watchers or [], None
+    for watcher in watchers:
+        watcher.start()
@@ -1,13 +1,37 @@
 # coding=utf-8
 import os
+import math
+import time
+import threading
+from collections import OrderedDict
 
 import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, WriteError
+from pymongo.monitoring import ConnectionPoolListener
 from dotenv import dotenv_values
 
 import json
 from bson import json_util
 from bson.objectid import ObjectId
 
+from src.util.schema import SchemaValidator, ValidationError
+
+settings = {}
+def getSetting(name: str, default=None):
+    """Obtain a configuration value. Values from the environment (which can be overridden by the docker-compose file) take precedence over the values in the local .env file, which is only read once.
+
+    parameters:
+        name -- the name of the setting
+        default -- the value to return if the setting is neither specified in the environment nor in the .env file
+
+    returns:
+        value -- the value of the setting
+    """
+    if '.env' not in settings:
+        settings['.env'] = dotenv_values('.env')
+    return os.environ.get(name, settings['.env'].get(name, default))
+
 validators = {}
 def getValidator(collection_name: str):
     """Obtain a validator object of a collection which is stored as a json file with the same name. The validator must comply to a schema validation format (see https://www.mongodb.com/docs/manual/core/schema-validation/)
@@ -23,48 +47,697 @@ def getValidator(collection_name: str):
             validators[collection_name] = json.load(f)
     return validators[collection_name]
 
+schema_validators = {}
+def getSchemaValidator(collection_name: str) -> SchemaValidator:
+    """Obtain the validator of a collection (see getValidator) compiled into a SchemaValidator, which checks documents and updates in the application before they are sent to the database. The validator is compiled once per process.
+
+    parameters:
+        collection_name -- the name of the collection
+
+    returns:
+        validator -- SchemaValidator of the collection
+    """
+    if collection_name not in schema_validators:
+        schema_validators[collection_name] = SchemaValidator(getValidator(collection_name))
+    return schema_validators[collection_name]
+
+indexes = {}
+def getIndexes(collection_name: str):
+    """Obtain the index specifications of a collection which are stored as a json file with the same name. Every index specification contains the list of keys, i.e., pairs of a property name and a direction (see https://www.mongodb.com/docs/manual/indexes/), and optionally further index options.
+
+    parameters:
+        collection_name -- the name of the collection, which should also be the filename
+
+    returns:
+        indexes -- list of index specifications (empty if no index file exists for the collection)
+    """
+    if collection_name not in indexes:
+        filename = f'./src/util/indexes/{collection_name}.json'
+        indexes[collection_name] = []
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                indexes[collection_name] = json.load(f)
+    return indexes[collection_name]
+
+class PoolMonitor(ConnectionPoolListener):
+    """Count the connections of all connection pools of the shared clients (see https://pymongo.readthedocs.io/en/stable/api/pymongo/monitoring.html)."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Zero all counters. The lock is recreated instead of acquired, as it may have been held by another thread of the parent when the process was forked (see resetClients)."""
+        self.lock = threading.Lock()
+        with self.lock:
+            self.open = 0
+            self.checked_out = 0
+            self.created = 0
+            self.failed_checkouts = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'open': self.open,
+                'checked_out': self.checked_out,
+                'created': self.created,
+                'failed_checkouts': self.failed_checkouts
+            }
+
+    def connection_created(self, event):
+        with self.lock:
+            self.open += 1
+            self.created += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.open -= 1
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.failed_checkouts += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+pool_monitor = PoolMonitor()
+
+def usesMemoryStorage() -> bool:
+    """Determine whether the collections are kept in process memory instead of a MongoDB database, which is selected by setting STORAGE_BACKEND to "memory" (see MemoryCollection)."""
+    return getSetting('STORAGE_BACKEND', 'mongodb').lower() == 'memory'
+
+# manage one client per database URL, which is shared by all data access objects of the process
+clients = {}
+clients_lock = threading.Lock()
+def getClient():
+    """Obtain the client of the MongoDB database as specified in the environment variables. The client maintains a connection pool and does not connect before the first database operation.
+
+    returns:
+        client -- MongoClient shared within the current process
+    """
+    # load the mongo URL (something like mongodb://localhost:27017)
+    MONGO_URL = getSetting('MONGO_URL')
+    with clients_lock:
+        if MONGO_URL not in clients:
+            clients[MONGO_URL] = pymongo.MongoClient(
+                MONGO_URL,
+                connect=False,
+                maxPoolSize=int(getSetting('MONGO_MAX_POOL_SIZE', 100)),
+                minPoolSize=int(getSetting('MONGO_MIN_POOL_SIZE', 0)),
+                connectTimeoutMS=int(getSetting('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+                serverSelectionTimeoutMS=int(getSetting('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+                event_listeners=[pool_monitor])
+        return clients[MONGO_URL]
+
+# whether the database of a URL supports multi-document transactions, which is determined on first use
+transactions = {}
+def supportsTransactions() -> bool:
+    """Determine whether the MongoDB database supports multi-document transactions, which are only available on replica sets and sharded clusters (see https://www.mongodb.com/docs/manual/core/transactions/).
+
+    returns:
+        True -- if transactions are supported
+        False -- otherwise
+    """
+    if usesMemoryStorage():
+        return False
+    MONGO_URL = getSetting('MONGO_URL')
+    if MONGO_URL not in transactions:
+        transactions[MONGO_URL] = is_transactional(getClient().admin.command('hello'))
+    return transactions[MONGO_URL]
+
+def is_transactional(hello: dict) -> bool:
+    """Determine from the response to the hello command whether the server is a member of a replica set or a router of a sharded cluster."""
+    return 'setName' in hello or hello.get('msg') == 'isdbgrid'
+
+def resetClients():
+    """Discard all clients and the collections of all data access objects. Clients must not be shared across forked processes (see https://pymongo.readthedocs.io/en/stable/faq.html#is-pymongo-fork-safe), hence this is called in every child process after a fork.
+    Only the forking thread continues in the child, so every lock that another thread of the parent held at the time of the fork would never be released. Therefore, the locks are recreated instead of acquired.
+    """
+    global clients_lock
+    clients_lock = threading.Lock()
+    snapshot_cache.lock = threading.Lock()
+    clients.clear()
+    transactions.clear()
+    pool_monitor.reset()
+    for dao in daos.values():
+        dao.reset()
+
+os.register_at_fork(after_in_child=resetClients)
+
+def getHealth() -> dict:
+    """Check whether the database is reachable.
+
+    returns:
+        health -- dict containing whether the database responded to a ping at 'database', the round trip time in milliseconds at 'latency_ms', and the connection statistics of the shared clients at 'pool'
+    """
+    start = time.perf_counter()
+    try:
+        if not usesMemoryStorage():
+            getClient().admin.command('ping')
+        reachable = True
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        reachable = False
+    return {
+        'database': reachable,
+        'latency_ms': round((time.perf_counter() - start) * 1000, 3),
+        'pool': {
+            'max_size': int(getSetting('MONGO_MAX_POOL_SIZE', 100)),
+            **pool_monitor.stats()
+        }
+    }
+
 # manage a collection of data access objects, such that every collection only requires one DAO object
 daos = {}
-def getDao(collection_name: str):
+def getDao(collection_name: str, pantry_id: str = None):
     """Obtain a data access object of a collection. The purpose of the realization using the singleton pattern is
-    to avoid multiple data access objects for the same collection
+    to avoid multiple data access objects for the same collection. Data access objects scoped to a pantry share the collection of the unscoped one and hold no state of their own, hence they are created on every call instead of kept, such that the number of pantries does not grow the memory of the process.
 
     parameters:
         collection_name -- the name of the collection
+        pantry_id -- optional id of a pantry, such that the data access object only accesses the objects of this pantry
 
     returns:
         validator -- DAO to the given collection
     """
+    if pantry_id is not None:
+        return DAO(collection_name=collection_name, pantry_id=pantry_id)
     if collection_name not in daos:
         daos[collection_name] = DAO(collection_name=collection_name)
     return daos[collection_name]
 
+def bson_to_json(value):
+    """Convert a BSON value into a JSON-compatible value in one pass. The result is identical to json.loads(json_util.dumps(value)), i.e., MongoDB Relaxed Extended JSON (see https://www.mongodb.com/docs/manual/reference/mongodb-extended-json/), but avoids serializing the value to a string and parsing it again.
+
+    parameters:
+        value -- the BSON value (e.g., a MongoDB document)
+
+    returns:
+        value -- the converted value consisting only of dicts, lists, strings, numbers, booleans, and None
+    """
+    value_type = type(value)
+    if value_type is str or value_type is int or value_type is bool or value is None:
+        return value
+    if value_type is float and math.isfinite(value):
+        return value
+    if value_type is ObjectId:
+        return {'$oid': str(value)}
+    if hasattr(value, 'items'):
+        return {key: bson_to_json(item) for key, item in value.items()}
+    if hasattr(value, '__iter__') and not isinstance(value, (str, bytes)):
+        return [bson_to_json(item) for item in value]
+
+    # all remaining BSON types (e.g., datetimes) are converted to their extended JSON representation
+    try:
+        converted = json_util.default(value, json_util.DEFAULT_JSON_OPTIONS)
+    except TypeError:
+        # subclasses of primitive types (e.g., Int64) are represented by the primitive type in JSON
+        for primitive_type in (bool, int, float, str):
+            if isinstance(value, primitive_type):
+                return primitive_type(value)
+        return value
+    return bson_to_json(converted)
+
+def prepare_cursor(collection, filter=None, toid: list = None, projection: list = None, after: str = None, limit: int = None, batch_size: int = 100):
+    """Create a cursor over all objects of a collection which comply to the given filter (see DAO.iter_find for the parameters). The cursor can be a pymongo or a motor cursor, depending on the collection."""
+
+    # if the filter contains attributes that are IDs, then they need to be converted
+    if toid and len(toid) > 0:
+        for i in toid:
+            converted = []
+            for element in filter[i]:
+                conv = ObjectId(element['$oid'])
+                converted.append(conv)
+            filter[i] = {'$in': converted}
+
+    # continue after the given id instead of skipping objects, which allows the database to seek in the _id index
+    if after is not None:
+        filter = dict(filter or {})
+        filter['_id'] = {'$gt': ObjectId(after)}
+
+    cursor = collection.find(filter, projection, batch_size=batch_size)
+    if after is not None or limit is not None:
+        cursor = cursor.sort('_id', pymongo.ASCENDING)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return cursor
+
+def rebuild_created(document: dict) -> dict:
+    """Rebuild a document as the database stores it after it was inserted, i.e., with the _id (assigned during the insertion) as the first property."""
+    return {'_id': document['_id'], **{key: value for key, value in document.items() if key != '_id'}}
+
+def summarize_bulk_update(result: dict) -> dict:
+    """Summarize the result of a bulk write of update operations (see DAO.bulk_update)."""
+    return {
+        'matched': result['nMatched'],
+        'modified': result['nModified'],
+        'errors': [{'index': error['index'], 'message': error['errmsg']} for error in result['writeErrors']]
+    }
+
+def prepare_updates(updates: list[dict], pantry_id: str = None) -> list[UpdateOne]:
+    """Create the update operations of a bulk update (see DAO.bulk_update), where the optional conditions of an update are combined with its id and the pantry."""
+    return [UpdateOne(update_filter(update, pantry_id), update['data']) for update in updates]
+
+def update_filter(update: dict, pantry_id: str = None) -> dict:
+    """Create the filter of an update of a bulk update, which combines the optional conditions of the update with its id and the pantry (see prepare_updates)."""
+    return scope_filter({**update.get('filter', {}), '_id': ObjectId(update['id'])}, pantry_id)
+
+def compensation_of(update: dict) -> dict:
+    """Obtain the update operation which reverts an update of a bulk update, which is only possible if the update solely increments numbers (see BulkUpdate.compensate).
+
+    returns:
+        data -- the update operation incrementing the same properties by the negated amounts
+        None -- if the update cannot be reverted
+    """
+    increments = update['data'].get('$inc')
+    if len(update['data']) != 1 or not isinstance(increments, dict):
+        return None
+    if not all(isinstance(amount, (int, float)) and not isinstance(amount, bool) for amount in increments.values()):
+        return None
+    return {'$inc': {field: -amount for field, amount in increments.items()}}
+
+def check_entries(entries: list, errors_of) -> tuple:
+    """Check the documents or updates of a bulk operation against the validator of the collection before they are sent to the database (see DAO.create_many and DAO.bulk_update).
+
+    parameters:
+        entries -- list of documents or updates
+        errors_of -- function which returns the validation messages of an entry (see SchemaValidator)
+
+    returns:
+        accepted -- list of the positions of the valid entries
+        errors -- list of errors of the invalid entries, each containing the position of the entry at 'index' and the reason at 'message'
+    """
+    accepted, errors = [], []
+    for index, entry in enumerate(entries):
+        messages = errors_of(entry)
+        if len(messages) > 0:
+            errors.append({'index': index, 'message': '; '.join(messages)})
+        else:
+            accepted.append(index)
+    return accepted, errors
+
+def merge_errors(errors: list[dict], accepted: list[int], rejected: list[dict]) -> list[dict]:
+    """Combine the errors of the database, whose positions refer to the accepted entries only, with the errors of the rejected entries (see check_entries)."""
+    return sorted(rejected + [{**error, 'index': accepted[error['index']]} for error in errors], key=lambda error: error['index'])
+
+class BulkUpdate:
+    def __init__(self, updates: list[dict], collection_name: str, pantry_id: str = None, atomic: bool = False):
+        """Prepare a bulk update (see DAO.bulk_update) without any round trip, such that the synchronous and the asynchronous data access objects only differ in how they send the operations to the database.
+
+        parameters:
+            updates -- list of updates (see DAO.bulk_update)
+            collection_name -- name of the updated collection, whose validator the updates are checked against
+            pantry_id -- the id of the pantry which the updates are restricted to, or None
+            atomic -- whether the updates are applied either all or none
+
+        raises:
+            ValueError -- in case an update of a pantry changes the pantry_id property (see check_scoped_update)
+        """
+        self.updates = updates
+        self.pantry_id = pantry_id
+        self.atomic = atomic
+        if pantry_id is not None:
+            for update in updates:
+                check_scoped_update(update['data'])
+
+        # updates violating the validator are rejected before the round trip, where atomic updates are not applied at all
+        validator = getSchemaValidator(collection_name)
+        self.accepted, self.rejected = check_entries(updates, lambda update: validator.update_errors(update['data']))
+        self.operations = prepare_updates([updates[index] for index in self.accepted], pantry_id)
+
+    def skipped(self) -> dict:
+        """Obtain the result of a bulk update which does not send any operation to the database.
+
+        returns:
+            result -- the result (see DAO.bulk_update) if there is no update to apply
+            None -- otherwise
+        """
+        if len(self.updates) == 0:
+            return {'matched': 0, 'modified': 0, 'errors': []}
+        if self.atomic and len(self.rejected) > 0:
+            return {'matched': 0, 'modified': 0, 'errors': self.rejected, 'atomic': False, 'aborted': True}
+        if len(self.accepted) == 0:
+            return {'matched': 0, 'modified': 0, 'errors': self.rejected}
+        return None
+
+    def compensable(self) -> bool:
+        """Check whether an atomic bulk update can be applied by compensate if the database does not support transactions."""
+        return self.atomic and all(compensation_of(update) is not None for update in self.updates)
+
+    def summarize(self, result: dict) -> dict:
+        """Summarize the result of a bulk write of the operations without a transaction (see summarize_bulk_update)."""
+        summary = summarize_bulk_update(result)
+        summary['errors'] = merge_errors(summary['errors'], self.accepted, self.rejected)
+        if self.atomic:
+            return {**summary, 'atomic': False, 'aborted': False}
+        return summary
+
+    @staticmethod
+    def summarize_transaction(result: dict, aborted: bool) -> dict:
+        """Summarize the result of a bulk write of the operations in a transaction, which modified nothing if it was rolled back."""
+        summary = summarize_bulk_update(result)
+        return {**summary, 'modified': 0 if aborted else summary['modified'], 'atomic': True, 'aborted': aborted}
+
+    def compensate(self):
+        """Apply increments one after another and revert the applied ones as soon as an increment does not match its object or fails for any reason, which emulates an atomic bulk update if the database does not support transactions. Unlike in a transaction, other requests may observe the increments before they are reverted.
+        This is a generator which yields the filter and the update operation of every update_one call, receives its result (or its exception), and returns the result of the bulk update (see DAO.apply_compensated).
+
+        raises:
+            Exception -- in case an increment fails for another reason than a rejected update, after the applied increments have been reverted
+        """
+        applied, errors, modified = [], [], 0
+        try:
+            for index, update in enumerate(self.updates):
+                try:
+                    result = yield update_filter(update, self.pantry_id), update['data']
+                except WriteError as e:
+                    errors.append({'index': index, 'message': str(e)})
+                    break
+                if result.matched_count == 0:
+                    break
+                applied.append(update)
+                modified += result.modified_count
+            else:
+                return {'matched': len(applied), 'modified': modified, 'errors': [], 'atomic': False, 'aborted': False}
+        except Exception:
+            # e.g., a network error or an OperationFailure after some increments were applied
+            yield from self.revert(applied)
+            raise
+
+        yield from self.revert(applied)
+        return {'matched': len(applied), 'modified': 0, 'errors': errors, 'atomic': False, 'aborted': True}
+
+    def revert(self, applied: list[dict]):
+        """Yield the update operations which revert the applied increments in reverse order (see compensate). The reverting increments are not guarded, as they only restore the previous amounts, and every one of them is attempted even if another fails.
+
+        raises:
+            Exception -- the first failure of a reverting increment, once all of them have been attempted
+        """
+        failure = None
+        for update in reversed(applied):
+            try:
+                yield scope_filter({'_id': ObjectId(update['id'])}, self.pantry_id), compensation_of(update)
+            except Exception as e:
+                failure = failure or e
+        if failure is not None:
+            raise failure
+
+class TransactionAborted(Exception):
+    """Signal that a transaction has to be rolled back, carrying the result of the operations executed within it."""
+    def __init__(self, result: dict):
+        super().__init__('transaction aborted')
+        self.result = result
+
+def scope_filter(filter: dict, pantry_id: str) -> dict:
+    """Restrict a filter to the objects of a pantry (see DAO).
+
+    parameters:
+        filter -- dict containing key value pairs of properties and applicable filters (or None)
+        pantry_id -- the id of the pantry, or None if the filter should not be restricted
+
+    returns:
+        filter -- a new filter that additionally requires the pantry_id property (or the given filter if pantry_id is None)
+    """
+    if pantry_id is None:
+        return filter
+    return {**(filter or {}), 'pantry_id': pantry_id}
+
+def check_scoped_update(update_data: dict):
+    """Ensure that an update operation of a pantry-scoped data access object does not move the object into another pantry.
+
+    raises:
+        ValueError -- in case the update operation changes the pantry_id property
+    """
+    for operator, fields in update_data.items():
+        if isinstance(fields, dict) and any(field == 'pantry_id' or field.startswith('pantry_id.') for field in fields):
+            raise ValueError(f'the pantry of an object cannot be changed ({operator})')
+
+class SnapshotCache:
+    def __init__(self, ttl: float, max_parts: int = 1024):
+        """Cache the full content of collections in memory, such that repeated reads of the same collection do not require a database round trip. A snapshot of a collection is discarded once it is older than the time to live or when the collection is changed via its data access object.
+        Parts of a collection (e.g., the items of one pantry) are cached under the name "<collection>/<part>". Invalidating a part discards its snapshots and the snapshots of the entire collection (which contain the part), whereas invalidating the collection discards the snapshots of all its parts. Only the least recently used parts up to the maximum are kept, such that the number of pantries does not grow the memory of the process without bound.
+
+        parameters:
+            ttl -- time to live of a snapshot in seconds
+            max_parts -- maximum number of parts of collections whose snapshots and counters are kept
+        """
+        self.ttl = ttl
+        self.max_parts = max_parts
+        self.snapshots = {}
+        # all counters take their values from one increasing sequence, such that no counter takes a value twice, even if its part is forgotten and used again
+        self.sequence = 0
+        # the value of all counters which are not tracked, which is raised whenever a part is forgotten
+        self.floor = 0
+        # the most recent invalidation per collection, which prevents storing snapshots that were loaded before an invalidation
+        self.generations = {}
+        # the most recent change of the content of the snapshots per collection, which identifies the content in caches
+        self.versions = {}
+        # the most recent invalidation of any part per collection, which changes the entire collection but not its other parts
+        self.part_changes = {}
+        # the tracked parts of collections from the least to the most recently used
+        self.parts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, collection_name: str, load, variant=None):
+        """Obtain the snapshot of a collection and load a new one if there is no valid snapshot.
+
+        parameters:
+            collection_name -- the name of the collection
+            load -- function without parameters that returns the current content of the collection
+            variant -- hashable value distinguishing different snapshots of the same collection (e.g., with different projections)
+
+        returns:
+            snapshot -- the content of the collection (must not be modified by the caller)
+        """
+        return self.get_versioned(collection_name, load, variant)[0]
+
+    def get_versioned(self, collection_name: str, load, variant=None):
+        """Obtain the snapshot of a collection together with its version (see get). Values derived from the snapshot can be cached with this version as part of the key. As an expired snapshot is reloaded first, which changes the version, such values expire together with the snapshot.
+
+        returns:
+            snapshot -- the content of the collection (must not be modified by the caller)
+            version -- the version of the content (see version)
+        """
+        found, snapshot, version, generation = self.lookup(collection_name, variant)
+        if found:
+            return snapshot, version
+
+        loaded_at = time.monotonic()
+        snapshot = load()
+        # if the collection was changed during the load, the snapshot is not stored and keeps the version obtained before the load
+        return snapshot, self.store(collection_name, variant, generation, loaded_at, snapshot) or version
+
+    def lookup(self, collection_name: str, variant=None):
+        """Look up a valid snapshot of a collection without loading it (see get_versioned).
+
+        returns:
+            found -- whether a valid snapshot exists
+            snapshot -- the snapshot if it exists, None otherwise
+            version -- the version of the snapshot if it exists, the current version of the collection otherwise
+            generation -- the current generation of the collection, which needs to be passed to store
+        """
+        with self.lock:
+            self.track(collection_name)
+            entry = self.snapshots.get(collection_name, {}).get(variant)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return True, entry[1], entry[2], None
+            self.misses += 1
+            return False, None, self.current_version(collection_name), self.generation(collection_name)
+
+    def store(self, collection_name: str, variant, generation: tuple, loaded_at: float, snapshot):
+        """Store a snapshot of a collection unless the collection has been invalidated since the snapshot was looked up (see get_versioned).
+
+        returns:
+            version -- the version of the stored snapshot
+            None -- if the snapshot was not stored
+        """
+        with self.lock:
+            if self.generation(collection_name) != generation:
+                return None
+            self.track(collection_name)
+            # the loaded content may differ from the previous snapshot (e.g., due to changes by other processes)
+            self.versions[collection_name] = self.next_value()
+            version = self.current_version(collection_name)
+            self.snapshots.setdefault(collection_name, {})[variant] = (loaded_at, snapshot, version)
+            return version
+
+    def invalidate(self, collection_name: str):
+        """Discard the snapshot of a collection.
+
+        parameters:
+            collection_name -- the name of the collection
+        """
+        with self.lock:
+            self.track(collection_name)
+            value = self.next_value()
+            self.generations[collection_name] = value
+            self.versions[collection_name] = value
+            collection = collection_name.split('/')[0]
+            if collection != collection_name:
+                self.part_changes[collection] = value
+            for name in [name for name in self.snapshots if name in [collection_name, collection] or name.startswith(collection_name + '/')]:
+                del self.snapshots[name]
+
+    def next_value(self) -> int:
+        """Draw the next value of the sequence of all counters (must be called while holding the lock)."""
+        self.sequence += 1
+        return self.sequence
+
+    def counter(self, counters: dict, collection_name: str) -> int:
+        """Obtain the value of a counter of a collection or a part of it, which is the floor if it is not tracked (must be called while holding the lock)."""
+        return counters.get(collection_name, self.floor)
+
+    def track(self, collection_name: str):
+        """Mark a part of a collection as recently used and forget the snapshots and counters of the least recently used parts beyond the maximum (must be called while holding the lock)."""
+        if '/' not in collection_name:
+            return
+        self.parts[collection_name] = None
+        self.parts.move_to_end(collection_name)
+        while len(self.parts) > self.max_parts:
+            name = self.parts.popitem(last=False)[0]
+            self.snapshots.pop(name, None)
+            self.generations.pop(name, None)
+            self.versions.pop(name, None)
+            # the counters of the forgotten part continue above all values they took before
+            self.floor = self.next_value()
+
+    def generation(self, collection_name: str) -> tuple:
+        """Obtain the most recent invalidation of a collection or a part of it, which includes the invalidations of the entire collection and, for the entire collection, the invalidations of its parts (must be called while holding the lock)."""
+        collection = collection_name.split('/')[0]
+        return self.counter(self.generations, collection_name), self.counter(self.generations, collection), self.counter(self.part_changes, collection_name)
+
+    def version(self, collection_name: str) -> int:
+        """Obtain the version of the content of a collection, which changes whenever the collection is changed via a data access object or a snapshot of it is loaded. Note that an expired snapshot does not change the version before it is reloaded, hence values derived from a snapshot are best cached with the version obtained together with the snapshot (see get_versioned).
+
+        parameters:
+            collection_name -- the name of the collection
+
+        returns:
+            version -- the current version
+        """
+        with self.lock:
+            return self.current_version(collection_name)
+
+    def current_version(self, collection_name: str) -> int:
+        """Obtain the version of the content of a collection (see version, must be called while holding the lock)."""
+        version = self.counter(self.versions, collection_name)
+        # a part of a collection also changes whenever the entire collection is changed, and the entire collection whenever any part is changed
+        collection = collection_name.split('/')[0]
+        if collection != collection_name:
+            return max(version, self.counter(self.versions, collection))
+        return max(version, self.counter(self.part_changes, collection))
+
+    def stats(self) -> dict:
+        """Report the usage of the cache.
+
+        returns:
+            stats -- dict containing the number of hits and misses and the names of the currently cached collections
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'collections': list(self.snapshots.keys())
+            }
+
+snapshot_cache = SnapshotCache(ttl=float(getSetting('SNAPSHOT_TTL', 30)), max_parts=int(getSetting('SNAPSHOT_MAX_PARTS', 1024)))
+
 class DAO:
 
-    def __init__(self, collection_name: str):
-        """Establish a data access object to a collection of the given name in the MongoDB database as specified in the environment variables. When the collection is first creted, it will be associated to a validator (see https://www.mongodb.com/docs/manual/core/schema-validation/) to ensure some basic data compliance.
+    def __init__(self, collection_name: str, pantry_id: str = None):
+        """Establish a data access object to a collection of the given name in the MongoDB database as specified in the environment variables. The connection to the database is only established once the collection is first used (see setup), such that creating a data access object never blocks.
+        If a pantry id is given, the data access object is scoped to that pantry: it only reads, updates, and deletes objects whose pantry_id property equals the pantry id, and it assigns the pantry id to all created objects. Otherwise, it accesses all objects of the collection.
 
         parameters:
             collection_name -- the name of the collection (a collection validator of the same name must be available)
+            pantry_id -- optional id of the pantry to which the data access object is scoped
         """
+        self.collection_name = collection_name
+        self.pantry_id = pantry_id
+        # the snapshots of every pantry are cached separately (see SnapshotCache)
+        self.cache_name = collection_name if pantry_id is None else f'{collection_name}/{pantry_id}'
+        self._collection = None
+        self.lock = threading.RLock()
 
-        # load the local mongo URL (something like mongodb://localhost:27017)
-        LOCAL_MONGO_URL = dotenv_values('.env').get('MONGO_URL')
-        # check out of the environment (which can be overridden by the docker-compose file) also specifies an URL, and use that instead if it exists
-        MONGO_URL = os.environ.get('MONGO_URL', LOCAL_MONGO_URL)
+    @property
+    def collection(self):
+        """The MongoDB collection of this data access object, which is set up on first use."""
+        if self.pantry_id is not None:
+            # all pantries share the collection of the unscoped data access object
+            return getDao(self.collection_name).collection
+        if self._collection is None:
+            with self.lock:
+                if self._collection is None:
+                    self._collection = self.setup()
+        return self._collection
 
-        # connect to the MongoDB and select the appropriate database
-        print(
-            f'Connecting to collection {collection_name} on MongoDB at url {MONGO_URL}')
-        client = pymongo.MongoClient(MONGO_URL)
-        database = client.tinychef
+    def setup(self):
+        """Connect to the collection via the shared client, or obtain the in-memory collection if the memory storage backend is selected (see usesMemoryStorage). When the collection is first created, it will be associated to a validator (see https://www.mongodb.com/docs/manual/core/schema-validation/) to ensure some basic data compliance.
+
+        returns:
+            collection -- the MongoDB collection
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if usesMemoryStorage():
+            from src.util.memorydb import getMemoryCollection
+            print(f'Using collection {self.collection_name} in memory')
+            return getMemoryCollection(self.collection_name)
+
+        print(f'Connecting to collection {self.collection_name} on MongoDB at url {getSetting("MONGO_URL")}')
+        database = getClient().tinychef
 
         # create the collection if it does not yet exist
-        if collection_name not in database.list_collection_names():
-            validator = getValidator(collection_name)
-            database.create_collection(collection_name, validator=validator)
+        if self.collection_name not in database.list_collection_names():
+            validator = getValidator(self.collection_name)
+            database.create_collection(self.collection_name, validator=validator)
+
+        collection = database[self.collection_name]
+
+        # create the indexes of the collection (which has no effect if they already exist)
+        for index in getIndexes(self.collection_name):
+            options = {key: value for key, value in index.items() if key not in ['keys', 'description']}
+            collection.create_index([tuple(key) for key in index['keys']], **options)
+
+        # optionally invalidate snapshots also on changes that were not made via this data access object
+        if getSetting('SNAPSHOT_WATCH'):
+            self.watch_changes(collection)
+
+        return collection
+
+    def scoped(self, pantry_id: str) -> 'DAO':
+        """Obtain the data access object of the same collection scoped to a pantry (see getDao)."""
+        return getDao(self.collection_name, pantry_id=pantry_id)
 
-        self.collection = database[collection_name]
+    def reset(self):
+        """Forget the collection and recreate the lock, such that the collection is set up again via a new client on next use (e.g., after forking the process, see resetClients)."""
+        self.lock = threading.RLock()
+        self._collection = None
 
     def create(self, data: dict):
         """Creates a new document in the collection associated to this data access object. The creation of a new document must comply to the corresponding validator, which defines the data structure of the collection. In particular, the validator has to make sure that: (1) the data for the new object contains all required properties, (2) every property complies to the bson data type constraint (see https://www.mongodb.com/docs/manual/reference/bson-types/, though we currently only consider Strings and Booleans), (3) and the values of a property flagged with 'uniqueItems' are unique among all documents of the collection.
@@ -76,20 +749,62 @@ class DAO:
             object -- the newly created MongoDB document (parsed to a JSON object) containing the input data and an _id attribute
 
         raises:
-            WriteError - in case at least one of the validator criteria is violated
+            ValidationError - in case at least one of the validator criteria is violated (see getSchemaValidator)
+            WriteError - in case the database rejects the object
         """
         localdata = dict(data)
+        if self.pantry_id is not None:
+            localdata['pantry_id'] = self.pantry_id
+        getSchemaValidator(self.collection_name).validate(localdata)
 
         try:
             # insert the object into the database
             inserted_id = self.collection.insert_one(localdata).inserted_id
+            snapshot_cache.invalidate(self.cache_name)
 
-            # fetch and return the created object
-            obj = self.collection.find_one({'_id': inserted_id})
-            return self.to_json(obj)
+            # rebuild the created object locally instead of fetching it again
+            return self.to_json(rebuild_created(localdata))
         except Exception as e:
             raise
 
+    def create_many(self, data: list[dict]):
+        """Creates several new documents in the collection associated to this data access object in one round trip. Every document must comply to the corresponding validator (see create). Documents which violate the validator are reported, but do not prevent the creation of the other documents.
+
+        parameters:
+            data -- a list of dicts containing key-value pairs compliant to the validator
+
+        returns:
+            result -- a dict containing the list of newly created MongoDB documents (parsed to JSON objects) at 'created' and a list of errors at 'errors', where every error contains the position of the rejected document in the data list at 'index' and the reason at 'message'
+
+        raises:
+            Exception -- in case any database operation fails for another reason than a rejected document
+        """
+        localdata = [dict(document) for document in data]
+        if len(localdata) == 0:
+            return {'created': [], 'errors': []}
+        if self.pantry_id is not None:
+            for document in localdata:
+                document['pantry_id'] = self.pantry_id
+
+        # documents violating the validator are rejected before the round trip
+        accepted, rejected = check_entries(localdata, getSchemaValidator(self.collection_name).errors)
+
+        errors = []
+        if len(accepted) > 0:
+            try:
+                # insert all valid objects at once and continue after objects rejected by the database
+                self.collection.insert_many([localdata[index] for index in accepted], ordered=False)
+            except BulkWriteError as e:
+                errors = [{'index': error['index'], 'message': error['errmsg']} for error in e.details['writeErrors']]
+            finally:
+                snapshot_cache.invalidate(self.cache_name)
+        errors = merge_errors(errors, accepted, rejected)
+
+        # rebuild the created objects locally, as insert_many assigned an _id to every object
+        failed = set(error['index'] for error in errors)
+        created = [self.to_json(rebuild_created(document)) for index, document in enumerate(localdata) if index not in failed]
+        return {'created': created, 'errors': errors}
+
     def findOne(self, id: str):
         """Find one specific object in the collection with the _id property equal to the given id.
 
@@ -103,18 +818,21 @@ class DAO:
             Exception -- in case any database operation fails
         """
         try:
-            obj = self.collection.find_one({'_id': ObjectId(id)})
+            obj = self.collection.find_one(scope_filter({'_id': ObjectId(id)}, self.pantry_id))
             return self.to_json(obj)
         except Exception as e:
             raise
 
     # find all objects that comply to the optional filter
-    def find(self, filter=None, toid: list = None):
+    def find(self, filter=None, toid: list = None, projection: list = None, after: str = None, limit: int = None):
         """Find all objects contained in the collection which comply to the given filter. 
 
         parameters: 
             filter -- dict containing key value pairs of properties and applicable filters
             toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional list of properties which the objects should contain (the _id property is always contained), such that unused properties are not transferred from the database
+            after -- optional id of an object, such that only objects with a greater id are returned (keyset pagination)
+            limit -- optional maximum number of objects to return, ordered by their id
 
         returns:
             [object] -- list of objects compliant to the given filter
@@ -123,26 +841,90 @@ class DAO:
             Exception -- in case any database operation fails
         """
 
-        # if the filter contains attributes that are IDs, then they need to be converted
-        if toid and len(toid) > 0:
-            for i in toid:
-                converted = []
-                for element in filter[i]:
-                    conv = ObjectId(element['$oid'])
-                    converted.append(conv)
-                filter[i] = {'$in': converted}
+        try:
+            return list(self.iter_find(filter=filter, toid=toid, projection=projection, after=after, limit=limit))
+        except Exception as e:
+            raise
 
-        objs = []
+    def iter_find(self, filter=None, toid: list = None, projection: list = None, after: str = None, limit: int = None, batch_size: int = 100):
+        """Iterate over all objects contained in the collection which comply to the given filter. In contrast to find, the objects are fetched from the database in batches and converted only when they are consumed, such that the memory consumption does not depend on the size of the collection.
+
+        parameters: 
+            filter -- dict containing key value pairs of properties and applicable filters
+            toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional list of properties which the objects should contain (the _id property is always contained)
+            after -- optional id of an object, such that only objects with a greater id are returned (keyset pagination)
+            limit -- optional maximum number of objects to return, ordered by their id
+            batch_size -- number of objects fetched from the database per round trip
+
+        yields:
+            object -- object compliant to the given filter
+
+        raises:
+            Exception -- in case any database operation fails
+        """
         try:
-            dbobjs = self.collection.find(filter)
+            dbobjs = prepare_cursor(self.collection, filter=scope_filter(filter, self.pantry_id), toid=toid, projection=projection, after=after, limit=limit, batch_size=batch_size)
 
             for obj in dbobjs:
-                objs.append(self.to_json(obj))
+                yield self.to_json(obj)
+        except Exception as e:
+            raise
+
+    def aggregate(self, pipeline: list[dict]):
+        """Run an aggregation pipeline on the collection, such that objects are grouped or reduced by the database instead of being transferred (see https://www.mongodb.com/docs/manual/core/aggregation-pipeline/).
+
+        parameters:
+            pipeline -- list of aggregation stages (a data access object scoped to a pantry first restricts the pipeline to the objects of the pantry)
 
-            return objs
+        returns:
+            [object] -- list of results of the pipeline
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            if self.pantry_id is not None:
+                pipeline = [{'$match': {'pantry_id': self.pantry_id}}] + list(pipeline)
+            return [self.to_json(obj) for obj in self.collection.aggregate(pipeline)]
         except Exception as e:
             raise
 
+    def versioned_snapshot(self, projection: list = None):
+        """Obtain all objects contained in the collection from the snapshot cache together with the version of the snapshot (see SnapshotCache.get_versioned). The snapshot is loaded from the database only if it expired or the collection has been changed since it was loaded.
+
+        parameters:
+            projection -- optional list of properties which the objects should contain (the _id property is always contained)
+
+        returns:
+            [object], version -- list of all objects in the collection (must not be modified by the caller) and its version
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        variant = tuple(projection) if projection else None
+        return snapshot_cache.get_versioned(self.cache_name, lambda: self.find(projection=projection), variant=variant)
+
+    def snapshot_version(self) -> int:
+        """Obtain the version of the content of the collection (see SnapshotCache.version)."""
+        return snapshot_cache.version(self.cache_name)
+
+    def watch_changes(self, collection):
+        """Listen to the change stream of the collection in a background thread and invalidate the snapshot of the collection on every change. Change streams are only available on replica sets (see https://www.mongodb.com/docs/manual/changeStreams/), otherwise snapshots only expire after their time to live.
+
+        parameters:
+            collection -- the MongoDB collection to watch
+        """
+        def watch():
+            try:
+                with collection.watch() as stream:
+                    for change in stream:
+                        snapshot_cache.invalidate(self.collection_name)
+            except Exception as e:
+                print(f'Change stream of collection {self.collection_name} unavailable, snapshots expire after {snapshot_cache.ttl} seconds ({e.__class__.__name__}: {e})')
+
+        threading.Thread(target=watch, daemon=True).start()
+
     def update(self, id: str, update_data: dict):
         """Find one specific object in the collection with the _id property equal to the given id and update its data according to the update_data.
 
@@ -155,17 +937,85 @@ class DAO:
             False -- otherwise
 
         raises:
+            ValidationError -- in case the update violates the validator (see SchemaValidator.update_errors)
             Exception -- in case any database operation fails
         """
         try:
+            if self.pantry_id is not None:
+                check_scoped_update(update_data)
+            getSchemaValidator(self.collection_name).validate_update(update_data)
             update_result = self.collection.update_one(
-                {'_id': ObjectId(id)},
+                scope_filter({'_id': ObjectId(id)}, self.pantry_id),
                 update_data
             )
+            snapshot_cache.invalidate(self.cache_name)
             return update_result.acknowledged
         except Exception as e:
             raise
 
+    def bulk_update(self, updates: list[dict], atomic: bool = False):
+        """Update several objects of the collection in one round trip. Updates which fail (including updates violating the validator, which are not sent to the database) are reported, but do not prevent the other updates.
+
+        parameters:
+            updates -- list of dicts, each containing the id value of the object to update at 'id', the update operation at 'data' (top-level key values must be valid MongoDB update operators, see update), and optionally further conditions which the object must fulfill at 'filter' (e.g., {"quantity": {"$gte": 2}})
+            atomic -- if True, the updates are applied in a transaction, which is rolled back unless every update matched its object (see supportsTransactions). Without transactions, updates which solely increment numbers are applied one after another and reverted as soon as one does not match its object (see BulkUpdate.compensate), whereas other updates are applied like non-atomic ones.
+
+        returns:
+            result -- a dict containing the number of matched objects at 'matched', the number of modified objects at 'modified', and a list of errors at 'errors', where every error contains the position of the failed update in the updates list at 'index' and the reason at 'message'. For atomic updates, it additionally contains whether a transaction was used at 'atomic' and whether the updates were rolled back or reverted at 'aborted'.
+
+        raises:
+            Exception -- in case any database operation fails for another reason than a rejected update
+        """
+        bulk = BulkUpdate(updates, self.collection_name, self.pantry_id, atomic)
+        skipped = bulk.skipped()
+        if skipped is not None:
+            return skipped
+
+        if atomic and supportsTransactions():
+            return self.bulk_update_in_transaction(bulk.operations)
+        if bulk.compensable():
+            return self.apply_compensated(bulk.compensate())
+
+        try:
+            result = self.collection.bulk_write(bulk.operations, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+        finally:
+            snapshot_cache.invalidate(self.cache_name)
+        return bulk.summarize(result)
+
+    def apply_compensated(self, steps):
+        """Send the update operations of a compensated bulk update to the database one after another (see BulkUpdate.compensate)."""
+        try:
+            operation = next(steps)
+            while True:
+                try:
+                    result = self.collection.update_one(*operation)
+                except Exception as e:
+                    operation = steps.throw(e)
+                else:
+                    operation = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            snapshot_cache.invalidate(self.cache_name)
+
+    def bulk_update_in_transaction(self, operations: list[UpdateOne]):
+        """Apply update operations in one transaction, which is rolled back unless every operation matched its object (see bulk_update)."""
+        try:
+            with getClient().start_session() as session:
+                with session.start_transaction():
+                    result = self.collection.bulk_write(operations, ordered=True, session=session).bulk_api_result
+                    if result['nMatched'] < len(operations):
+                        raise TransactionAborted(result)
+            return BulkUpdate.summarize_transaction(result, aborted=False)
+        except TransactionAborted as e:
+            return BulkUpdate.summarize_transaction(e.result, aborted=True)
+        except BulkWriteError as e:
+            return BulkUpdate.summarize_transaction(e.details, aborted=True)
+        finally:
+            snapshot_cache.invalidate(self.cache_name)
+
     def delete(self, id: str):
         """Find one specific object in the collection with the _id property equal to the given id and remove it from the collection
 
@@ -181,20 +1031,25 @@ class DAO:
         """
         try:
             result = self.collection.delete_one(
-                {'_id': ObjectId(id)}
+                scope_filter({'_id': ObjectId(id)}, self.pantry_id)
             )
+            snapshot_cache.invalidate(self.cache_name)
             return result.acknowledged
         except Exception as e:
             raise
 
     def drop(self):
-        """Remove the entire collection
+        """Remove the entire collection, or all objects of the pantry if the data access object is scoped to a pantry
 
         raises:
             Exception -- in case any database operation fails
         """
         try:
-            self.collection.drop()
+            if self.pantry_id is not None:
+                self.collection.delete_many({'pantry_id': self.pantry_id})
+            else:
+                self.collection.drop()
+            snapshot_cache.invalidate(self.cache_name)
         except Exception as e:
             raise
 
@@ -207,4 +1062,4 @@ class DAO:
         returns:
             dict -- the document converted to JSON
         """
-        return json.loads(json_util.dumps(data))
+        return bson_to_json(data)
@@ -0,0 +1,84 @@
+import os
+import time
+import hashlib
+
+from src.util.cache import LRUCache
+from src.util.dao import getSetting, snapshot_cache
+
+class ResponseCache:
+    def __init__(self, max_bytes: int, ttl: float, cache_control: str):
+        """Cache serialized response bodies under strong entity tags (see https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/ETag), such that a client which repeats a request with the If-None-Match header obtains a 304 response without a database round trip, and other clients obtain the cached body as long as the content did not change.
+        An entity tag is derived from the versions of the content which a response is based on (see SnapshotCache.version and RecipeCatalog.version). These versions change on every change via a data access object of this process, whereas changes by other processes are only noticed once a snapshot expires. Therefore, every entity tag also contains a random token of the process and expires after the time to live.
+
+        parameters:
+            max_bytes -- maximum total size of the cached bodies in bytes (0 disables the cache of bodies, but not the entity tags)
+            ttl -- time to live of an entity tag in seconds
+            cache_control -- value of the Cache-Control header of all cached responses (e.g., "no-cache" to let clients revalidate on every request)
+        """
+        self.bodies = LRUCache(max_bytes, weigh=lambda entry: len(entry[0]))
+        self.ttl = ttl
+        self.cache_control = cache_control
+        self.token = os.urandom(8).hex()
+
+    def etag(self, route: str, versions: tuple, args) -> str:
+        """Derive the entity tag of a response.
+
+        parameters:
+            route -- name of the route that creates the response
+            versions -- the versions of the content which the response is based on, which need to be obtained before the content
+            args -- iterable of the (key, value) pairs of the parameters of the request
+
+        returns:
+            etag -- the entity tag without quotes
+        """
+        period = int(time.time() // self.ttl) if self.ttl > 0 else time.time_ns()
+        key = repr((self.token, period, route, versions, sorted(args)))
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def matches(self, if_none_match, etag: str) -> bool:
+        """Check whether the client already has the response of an entity tag, such that a 304 response can be sent.
+
+        parameters:
+            if_none_match -- the parsed If-None-Match header of the request (see werkzeug.datastructures.ETags)
+            etag -- the entity tag of the response
+        """
+        return if_none_match.contains(etag)
+
+    def headers(self, etag: str) -> dict:
+        """Obtain the caching headers of a response with the given entity tag."""
+        return {'ETag': f'"{etag}"', 'Cache-Control': self.cache_control}
+
+    def get(self, etag: str):
+        """Obtain a cached response.
+
+        returns:
+            body, headers -- the serialized body and the additional headers of the response
+            None -- if the response is not cached
+        """
+        return self.bodies.get(etag)
+
+    def put(self, etag: str, body: bytes, headers: dict = None) -> tuple:
+        """Cache a response, where the least recently used responses are evicted once the total size exceeds the maximum.
+
+        returns:
+            body, headers -- the cached entry
+        """
+        entry = (body, headers or {})
+        self.bodies.put(etag, entry)
+        return entry
+
+    def reset(self):
+        """Forget all responses and draw a new token (e.g., after forking the process), such that no two processes create the same entity tag. The cache of bodies is replaced instead of cleared, as its lock may have been held by another thread of the parent (see resetClients)."""
+        self.bodies = LRUCache(self.bodies.size, weigh=self.bodies.weigh)
+        self.token = os.urandom(8).hex()
+
+    def stats(self) -> dict:
+        """Report the usage of the cache (see LRUCache.stats)."""
+        return self.bodies.stats()
+
+response_cache = ResponseCache(
+    max_bytes=int(getSetting('RESPONSE_CACHE_BYTES', 16 * 1024 * 1024)),
+    ttl=float(getSetting('RESPONSE_CACHE_TTL', snapshot_cache.ttl)),
+    cache_control=getSetting('CACHE_CONTROL', 'no-cache'))
+
+os.register_at_fork(after_in_child=response_cache.reset)
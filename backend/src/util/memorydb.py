@@ -0,0 +1,666 @@
+# coding=utf-8
+import os
+import re
+import copy
+import functools
+import itertools
+import threading
+
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import WriteError, BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import InsertOneResult, InsertManyResult, UpdateResult, DeleteResult, BulkWriteResult
+from bson import json_util
+from bson.objectid import ObjectId
+
+from src.util.dao import getSetting, getSchemaValidator, getIndexes, rebuild_created
+from src.util.schema import SchemaValidator
+
+# placeholder of a property which a document does not contain
+MISSING = object()
+
+def lookup(document: dict, path: str):
+    """Obtain the value of a (dotted) property of a document, or MISSING if the document does not contain it."""
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+def freeze(value):
+    """Convert a value into a hashable value, such that it can be used as key of an index."""
+    if isinstance(value, dict):
+        return tuple((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return None if value is MISSING else value
+
+@functools.lru_cache(maxsize=1024)
+def compile_regex(pattern: str, options: str = '') -> re.Pattern:
+    """Compile a $regex condition including its $options, which is cached since filters often repeat."""
+    flags = 0
+    for option, flag in {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}.items():
+        if option in options:
+            flags |= flag
+    return re.compile(pattern, flags)
+
+def equals(value, expected) -> bool:
+    """Compare a property to a value like MongoDB does, i.e., a missing property equals None and an array equals each of its elements."""
+    if value is MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+def compare(value, bound, operator) -> bool:
+    """Compare a property to a bound, where missing properties and values of incomparable types never match."""
+    if value is MISSING or value is None:
+        return False
+    try:
+        return operator(value, bound)
+    except TypeError:
+        return False
+
+def matches_regex(value, pattern: re.Pattern) -> bool:
+    return isinstance(value, str) and pattern.search(value) is not None
+
+def matches_element(value, element) -> bool:
+    """Check a property against an element of an $in condition, which is either a value or a regular expression."""
+    if isinstance(element, re.Pattern):
+        return matches_regex(value, element)
+    return equals(value, element)
+
+def matches_condition(value, condition) -> bool:
+    """Check a property against the condition of a filter, which is a value, a regular expression, or a dict of query operators."""
+    if isinstance(condition, dict) and len(condition) > 0 and all(key.startswith('$') for key in condition):
+        for operator, argument in condition.items():
+            if operator == '$eq':
+                matched = equals(value, argument)
+            elif operator == '$ne':
+                matched = not equals(value, argument)
+            elif operator == '$gt':
+                matched = compare(value, argument, lambda a, b: a > b)
+            elif operator == '$gte':
+                matched = compare(value, argument, lambda a, b: a >= b)
+            elif operator == '$lt':
+                matched = compare(value, argument, lambda a, b: a < b)
+            elif operator == '$lte':
+                matched = compare(value, argument, lambda a, b: a <= b)
+            elif operator == '$in':
+                matched = any(matches_element(value, element) for element in argument)
+            elif operator == '$nin':
+                matched = not any(matches_element(value, element) for element in argument)
+            elif operator == '$exists':
+                matched = (value is not MISSING) == bool(argument)
+            elif operator == '$regex':
+                pattern = argument if isinstance(argument, re.Pattern) else compile_regex(argument, condition.get('$options', ''))
+                matched = matches_regex(value, pattern)
+            elif operator == '$options':
+                matched = True
+            elif operator == '$not':
+                matched = not matches_condition(value, argument)
+            else:
+                raise OperationFailure(f'unknown operator: {operator}')
+            if not matched:
+                return False
+        return True
+    if isinstance(condition, re.Pattern):
+        return matches_regex(value, condition)
+    return equals(value, condition)
+
+def matches(document: dict, filter: dict) -> bool:
+    """Check whether a document complies to a filter (see https://www.mongodb.com/docs/manual/reference/operator/query/ for the supported subset of query operators)."""
+    for key, condition in filter.items():
+        if key == '$and':
+            matched = all(matches(document, subfilter) for subfilter in condition)
+        elif key == '$or':
+            matched = any(matches(document, subfilter) for subfilter in condition)
+        elif key == '$nor':
+            matched = not any(matches(document, subfilter) for subfilter in condition)
+        else:
+            matched = matches_condition(lookup(document, key), condition)
+        if not matched:
+            return False
+    return True
+
+def equality_values(condition) -> list:
+    """Obtain the values which a property has to equal to comply to a condition, or None if the condition is not an equality (or $in) condition and can hence not be answered by an index."""
+    if isinstance(condition, dict):
+        if len(condition) == 1 and '$eq' in condition:
+            condition = condition['$eq']
+        elif len(condition) == 1 and '$in' in condition and not any(isinstance(element, (re.Pattern, dict, list)) for element in condition['$in']):
+            return list(condition['$in'])
+        else:
+            return None
+    if isinstance(condition, (re.Pattern, dict, list)) or condition is None:
+        return None
+    return [condition]
+
+def project(document: dict, projection) -> dict:
+    """Restrict a document to the properties of a projection, which is a list of property names or a dict of inclusions, where the _id property is always contained."""
+    if projection is None:
+        return document
+    fields = projection if isinstance(projection, (list, tuple)) else [field for field, included in projection.items() if included and field != '_id']
+    projected = {'_id': document['_id']}
+    for field in fields:
+        if field in document:
+            projected[field] = document[field]
+    return projected
+
+def set_path(document: dict, path: str, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+def unset_path(document: dict, path: str):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+def apply_update(document: dict, update: dict) -> dict:
+    """Apply the update operators $set, $unset, $inc, $mul, $min, and $max to a copy of a document (see https://www.mongodb.com/docs/manual/reference/operator/update/).
+
+    returns:
+        document -- the updated copy of the document
+
+    raises:
+        ValueError -- in case the update is not an update operation
+        WriteError -- in case the update cannot be applied to the document
+    """
+    if len(update) == 0 or not all(operator.startswith('$') for operator in update):
+        raise ValueError('update only works with $ operators')
+
+    updated = copy.deepcopy(document)
+    for operator, fields in update.items():
+        for path, argument in fields.items():
+            if path == '_id' or path.startswith('_id.'):
+                message = "Performing an update on the path '_id' would modify the immutable field '_id'"
+                raise WriteError(message, 66, {'errmsg': message})
+            current = lookup(updated, path)
+            if operator == '$set':
+                set_path(updated, path, copy.deepcopy(argument))
+            elif operator == '$unset':
+                unset_path(updated, path)
+            elif operator in ['$inc', '$mul']:
+                if current is not MISSING and (not isinstance(current, (int, float)) or isinstance(current, bool)):
+                    message = f'Cannot apply {operator} to a value of non-numeric type ({path})'
+                    raise WriteError(message, 14, {'errmsg': message})
+                if operator == '$inc':
+                    set_path(updated, path, argument if current is MISSING else current + argument)
+                else:
+                    set_path(updated, path, 0 if current is MISSING else current * argument)
+            elif operator in ['$min', '$max']:
+                if current is MISSING or compare(argument, current, (lambda a, b: a < b) if operator == '$min' else (lambda a, b: a > b)):
+                    set_path(updated, path, copy.deepcopy(argument))
+            else:
+                message = f'Unknown modifier: {operator}'
+                raise WriteError(message, 9, {'errmsg': message})
+    return updated
+
+def evaluate(expression, document: dict):
+    """Evaluate an aggregation expression, i.e., a property path (e.g., "$name"), a literal, or one of the operators $toLower, $toUpper, $trim, and $concat, on a document."""
+    if isinstance(expression, str) and expression.startswith('$'):
+        value = lookup(document, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, dict):
+        if len(expression) == 1 and next(iter(expression)).startswith('$'):
+            operator, argument = next(iter(expression.items()))
+            if operator == '$toLower':
+                value = evaluate(argument, document)
+                return '' if value is None else str(value).lower()
+            if operator == '$toUpper':
+                value = evaluate(argument, document)
+                return '' if value is None else str(value).upper()
+            if operator == '$trim':
+                value = evaluate(argument['input'], document)
+                return None if value is None else value.strip(argument.get('chars'))
+            if operator == '$concat':
+                values = [evaluate(item, document) for item in argument]
+                return None if any(value is None for value in values) else ''.join(values)
+            raise OperationFailure(f'unsupported expression operator: {operator}')
+        return {key: evaluate(value, document) for key, value in expression.items()}
+    if isinstance(expression, list):
+        return [evaluate(item, document) for item in expression]
+    return expression
+
+def group(documents: list[dict], specification: dict) -> list[dict]:
+    """Execute a $group stage with the accumulators $sum, $avg, $min, $max, $first, and $push."""
+    groups = {}
+    for document in documents:
+        key = evaluate(specification['_id'], document)
+        result = groups.get(freeze(key))
+        if result is None:
+            result = groups[freeze(key)] = {'_id': key}
+        for field, accumulator in specification.items():
+            if field == '_id':
+                continue
+            operator, expression = next(iter(accumulator.items()))
+            value = evaluate(expression, document)
+            if operator in ['$sum', '$avg']:
+                number = value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+                total, count = result.get(field, (0, 0))
+                result[field] = (total + number, count + 1)
+            elif operator == '$min':
+                if value is not None and (field not in result or compare(value, result[field], lambda a, b: a < b)):
+                    result[field] = value
+            elif operator == '$max':
+                if value is not None and (field not in result or compare(value, result[field], lambda a, b: a > b)):
+                    result[field] = value
+            elif operator == '$first':
+                result.setdefault(field, value)
+            elif operator == '$push':
+                result.setdefault(field, []).append(value)
+            else:
+                raise OperationFailure(f'unsupported accumulator: {operator}')
+
+    # the sums and averages are tracked as pairs of the total and the count until all documents are accumulated
+    for result in groups.values():
+        for field, accumulator in specification.items():
+            if field != '_id' and next(iter(accumulator)) in ['$sum', '$avg']:
+                total, count = result.get(field, (0, 0))
+                result[field] = total if next(iter(accumulator)) == '$sum' else (total / count if count > 0 else None)
+    return list(groups.values())
+
+def project_stage(document: dict, specification: dict) -> dict:
+    """Execute a $project stage on a document, which either excludes properties or includes properties and computed values."""
+    excluded = lambda value: value is False or (type(value) is int and value == 0)
+    if all(excluded(value) for value in specification.values()):
+        return {field: value for field, value in document.items() if field not in specification}
+
+    projected = {} if excluded(specification.get('_id', 1)) or '_id' not in document else {'_id': document['_id']}
+    for field, value in specification.items():
+        if field == '_id' and excluded(value):
+            continue
+        if value is True or (type(value) is int and value == 1):
+            if lookup(document, field) is not MISSING:
+                set_path(projected, field, lookup(document, field))
+        else:
+            set_path(projected, field, evaluate(value, document))
+    return projected
+
+def sort_documents(documents: list[dict], keys: list[tuple]) -> list[dict]:
+    """Sort documents by a list of pairs of a property and a direction, where missing properties are ordered first."""
+    for field, direction in reversed(keys):
+        documents = sorted(documents, key=lambda document: (lookup(document, field) not in [MISSING, None], freeze(lookup(document, field))), reverse=direction < 0)
+    return documents
+
+class MemoryCursor:
+    def __init__(self, documents: list[dict], projection=None):
+        """Iterate over the results of a query or an aggregation, which can be sorted and limited like a pymongo cursor and iterated asynchronously like a motor cursor."""
+        self.documents = documents
+        self.projection = projection
+        self.sort_keys = None
+        self.maximum = None
+
+    def sort(self, key, direction: int = 1) -> 'MemoryCursor':
+        self.sort_keys = [(key, direction)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, limit: int) -> 'MemoryCursor':
+        # a limit of 0 is equivalent to no limit
+        self.maximum = limit or None
+        return self
+
+    def results(self) -> list[dict]:
+        documents = self.documents
+        if self.sort_keys is not None:
+            documents = sort_documents(documents, self.sort_keys)
+        if self.maximum is not None:
+            documents = documents[:self.maximum]
+        return [project(document, self.projection) for document in documents]
+
+    def __iter__(self):
+        return iter(self.results())
+
+    async def __aiter__(self):
+        for document in self.results():
+            yield document
+
+class MemoryCollection:
+
+    def __init__(self, name: str, validator: SchemaValidator = None, indexes: list[dict] = (), log_path: str = None):
+        """Keep the documents of a collection in process memory, offering the subset of the pymongo collection API which the DAO uses, such that the application runs without a MongoDB server (e.g., in tests, benchmarks, or small embedded deployments).
+        The documents are stored in a hash map by their _id, and every index of the collection is maintained as a hash map from the indexed values to the ids of the documents (including every prefix of compound indexes), such that equality and $in conditions on indexed properties do not scan the collection. The validator of the collection is enforced on every write.
+        If a log file is given, every write is appended to it, and the collection is restored by replaying the log on startup. Since the log is flushed but not synced to disk, it survives crashes of the process, but not necessarily of the machine. The collection is only shared within one process.
+
+        parameters:
+            name -- the name of the collection
+            validator -- the compiled collection validator (see getSchemaValidator)
+            indexes -- index specifications of the collection (see getIndexes)
+            log_path -- optional path of the append-only log file
+        """
+        self.name = name
+        self.validator = validator
+        self.documents: dict = {}
+        self.indexes: dict[tuple, dict] = {}
+        self.unique: list[tuple] = []
+        for index in indexes:
+            fields = tuple(key for key, direction in index['keys'])
+            for length in range(1, len(fields) + 1):
+                self.indexes.setdefault(fields[:length], {})
+            if index.get('unique'):
+                self.unique.append(fields)
+        self.lock = threading.RLock()
+
+        self.log = None
+        if log_path is not None:
+            self.replay(log_path)
+            self.log = open(log_path, 'a', encoding='utf-8')
+
+    def replay(self, log_path: str):
+        """Restore the documents from the log file, which is compacted afterwards if it contains more entries than documents.
+        A process crash while appending may leave a torn last line, whose entries were never acknowledged. Such a line is skipped and removed by compacting the log, as the next append would otherwise continue it.
+
+        raises:
+            ValueError -- in case any other line than the last one is malformed
+        """
+        if not os.path.exists(log_path):
+            return
+        entries, torn, complete = 0, None, True
+        with open(log_path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if torn is not None:
+                    raise ValueError(f'{log_path} contains a malformed entry before its last line')
+                try:
+                    entry = json_util.loads(line)
+                except ValueError:
+                    torn = line
+                    continue
+                complete = line.endswith(b'\n')
+                entries += 1
+                if entry['op'] == 'put':
+                    self.store(entry['document'])
+                elif entry['op'] == 'delete':
+                    self.remove(entry['_id'])
+                elif entry['op'] == 'drop':
+                    self.clear()
+
+        if torn is not None:
+            print(f'Skipped the torn last line of {log_path} ({len(torn)} bytes)')
+        if torn is not None or not complete or entries > len(self.documents):
+            temporary_path = f'{log_path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'w', encoding='utf-8') as f:
+                for document in self.documents.values():
+                    f.write(json_util.dumps({'op': 'put', 'document': document}) + '\n')
+            os.replace(temporary_path, log_path)
+
+    def append(self, entries: list[dict]):
+        """Append entries to the log file (if any) and flush them."""
+        if self.log is not None and len(entries) > 0:
+            self.log.write(''.join(json_util.dumps(entry) + '\n' for entry in entries))
+            self.log.flush()
+
+    def index_key(self, document: dict, fields: tuple) -> tuple:
+        return tuple(freeze(lookup(document, field)) for field in fields)
+
+    def store(self, document: dict):
+        """Insert or replace a document, maintaining all indexes. A replaced document keeps its position in the natural order. Stored documents are never modified in place, such that they can be handed out without copying."""
+        replaced = self.documents.get(document['_id'])
+        if replaced is not None:
+            self.unindex(replaced)
+        self.documents[document['_id']] = document
+        for fields, index in self.indexes.items():
+            index.setdefault(self.index_key(document, fields), set()).add(document['_id'])
+
+    def unindex(self, document: dict):
+        for fields, index in self.indexes.items():
+            key = self.index_key(document, fields)
+            ids = index[key]
+            ids.discard(document['_id'])
+            if len(ids) == 0:
+                del index[key]
+
+    def remove(self, id) -> dict:
+        document = self.documents.pop(id, None)
+        if document is not None:
+            self.unindex(document)
+        return document
+
+    def clear(self):
+        self.documents.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+    def check(self, document: dict, id=None):
+        """Ensure that a document complies to the validator and the unique indexes, where id is the _id of the document it replaces.
+
+        raises:
+            WriteError -- in case the document violates the validator (with code 121 like MongoDB, see https://www.mongodb.com/docs/manual/core/schema-validation/handle-invalid-documents/)
+            DuplicateKeyError -- in case the document violates a unique index
+        """
+        if self.validator is not None:
+            errors = self.validator.errors(document)
+            if len(errors) > 0:
+                message = f'Document failed validation: {"; ".join(errors)}'
+                raise WriteError(message, 121, {'errmsg': message, 'errInfo': {'details': errors}})
+        for fields in self.unique:
+            if any(other != id for other in self.indexes[fields].get(self.index_key(document, fields), ())):
+                message = f'E11000 duplicate key error collection: {self.name} index: {"_".join(fields)}'
+                raise DuplicateKeyError(message, 11000, {'errmsg': message})
+
+    def candidates(self, filter: dict) -> list:
+        """Determine the documents which may comply to a filter. Equality conditions on the _id or on the properties of an index are answered by a lookup, otherwise all documents are candidates."""
+        if '_id' in filter:
+            ids = equality_values(filter['_id'])
+            if ids is not None:
+                return [self.documents[id] for id in dict.fromkeys(ids) if id in self.documents]
+
+        best = None
+        for fields in self.indexes:
+            values = [equality_values(filter[field]) if field in filter else None for field in fields]
+            if all(value is not None for value in values) and (best is None or len(fields) > len(best[0])):
+                best = (fields, values)
+        if best is None:
+            return list(self.documents.values())
+
+        fields, values = best
+        ids = set()
+        for key in itertools.product(*values):
+            ids |= self.indexes[fields].get(tuple(freeze(value) for value in key), set())
+        # documents are returned in the order of their creation, as ObjectIds ascend over time
+        return [self.documents[id] for id in sorted(ids, key=str)]
+
+    def select(self, filter: dict) -> list[dict]:
+        with self.lock:
+            candidates = self.candidates(filter or {})
+        return [document for document in candidates if matches(document, filter or {})]
+
+    def find(self, filter: dict = None, projection=None, batch_size: int = None, session=None) -> MemoryCursor:
+        return MemoryCursor(self.select(filter), projection)
+
+    def find_one(self, filter: dict = None, projection=None, session=None) -> dict:
+        for document in self.find(filter, projection):
+            return document
+        return None
+
+    def count_documents(self, filter: dict, session=None) -> int:
+        return len(self.select(filter))
+
+    def insert(self, document: dict) -> dict:
+        """Validate and store a new document, assigning an _id to the given document like pymongo does."""
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+        if document['_id'] in self.documents:
+            message = f'E11000 duplicate key error collection: {self.name} index: _id_'
+            raise DuplicateKeyError(message, 11000, {'errmsg': message})
+        self.check(document)
+        # the database stores the _id as the first property (see rebuild_created)
+        stored = copy.deepcopy(rebuild_created(document))
+        self.store(stored)
+        return {'op': 'put', 'document': stored}
+
+    def insert_one(self, document: dict, session=None) -> InsertOneResult:
+        with self.lock:
+            self.append([self.insert(document)])
+        return InsertOneResult(document['_id'], True)
+
+    def insert_many(self, documents: list[dict], ordered: bool = True, session=None) -> InsertManyResult:
+        entries, errors = [], []
+        with self.lock:
+            for index, document in enumerate(documents):
+                try:
+                    entries.append(self.insert(document))
+                except WriteError as e:
+                    errors.append({'index': index, 'code': e.code, 'errmsg': e.details['errmsg'], 'op': document})
+                    if ordered:
+                        break
+            self.append(entries)
+        if len(errors) > 0:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': [], 'nInserted': len(entries), 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []})
+        return InsertManyResult([entry['document']['_id'] for entry in entries], True)
+
+    def update(self, filter: dict, update: dict) -> tuple:
+        """Apply an update operation to the first document complying to the filter.
+
+        returns:
+            matched -- number of documents complying to the filter (0 or 1)
+            modified -- number of modified documents (0 or 1)
+            entry -- the log entry of the modification, or None
+        """
+        for document in self.candidates(filter):
+            if matches(document, filter):
+                updated = apply_update(document, update)
+                if updated == document:
+                    return 1, 0, None
+                self.check(updated, document['_id'])
+                self.store(updated)
+                return 1, 1, {'op': 'put', 'document': updated}
+        return 0, 0, None
+
+    def update_one(self, filter: dict, update: dict, session=None) -> UpdateResult:
+        with self.lock:
+            matched, modified, entry = self.update(filter, update)
+            self.append([entry] if entry is not None else [])
+        return UpdateResult({'n': matched, 'nModified': modified, 'updatedExisting': matched > 0}, True)
+
+    def delete(self, filter: dict, many: bool) -> list[dict]:
+        entries = []
+        for document in self.candidates(filter):
+            if matches(document, filter):
+                self.remove(document['_id'])
+                entries.append({'op': 'delete', '_id': document['_id']})
+                if not many:
+                    break
+        return entries
+
+    def delete_one(self, filter: dict, session=None) -> DeleteResult:
+        with self.lock:
+            entries = self.delete(filter, many=False)
+            self.append(entries)
+        return DeleteResult({'n': len(entries)}, True)
+
+    def delete_many(self, filter: dict, session=None) -> DeleteResult:
+        with self.lock:
+            entries = self.delete(filter, many=True)
+            self.append(entries)
+        return DeleteResult({'n': len(entries)}, True)
+
+    def bulk_write(self, operations: list, ordered: bool = True, session=None) -> BulkWriteResult:
+        """Apply InsertOne, UpdateOne, and DeleteOne operations at once. Failed operations are reported in a BulkWriteError like pymongo does, where ordered operations stop at the first failure."""
+        result = {'writeErrors': [], 'writeConcernErrors': [], 'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []}
+        entries = []
+        with self.lock:
+            for index, operation in enumerate(operations):
+                # pymongo does not expose the filter and document of an operation publicly
+                try:
+                    if isinstance(operation, InsertOne):
+                        entries.append(self.insert(operation._doc))
+                        result['nInserted'] += 1
+                    elif isinstance(operation, UpdateOne):
+                        if operation._upsert:
+                            raise OperationFailure('upserts are not supported by the in-memory storage backend')
+                        matched, modified, entry = self.update(operation._filter, operation._doc)
+                        result['nMatched'] += matched
+                        result['nModified'] += modified
+                        entries += [entry] if entry is not None else []
+                    elif isinstance(operation, DeleteOne):
+                        removed = self.delete(operation._filter, many=False)
+                        result['nRemoved'] += len(removed)
+                        entries += removed
+                    else:
+                        raise OperationFailure(f'unsupported bulk write operation: {operation.__class__.__name__}')
+                except WriteError as e:
+                    result['writeErrors'].append({'index': index, 'code': e.code, 'errmsg': e.details['errmsg'], 'op': operation})
+                    if ordered:
+                        break
+            self.append(entries)
+        if len(result['writeErrors']) > 0:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def aggregate(self, pipeline: list[dict], session=None) -> MemoryCursor:
+        """Run an aggregation pipeline consisting of the stages $match, $group, $project, $sort, $skip, and $limit (see https://www.mongodb.com/docs/manual/reference/operator/aggregation-pipeline/). A leading $match stage uses the indexes like find."""
+        documents = None
+        for stage in pipeline:
+            name, specification = next(iter(stage.items()))
+            if name == '$match':
+                documents = self.select(specification) if documents is None else [document for document in documents if matches(document, specification)]
+                continue
+            if documents is None:
+                documents = self.select({})
+            if name == '$group':
+                documents = group(documents, specification)
+            elif name == '$project':
+                documents = [project_stage(document, specification) for document in documents]
+            elif name == '$sort':
+                documents = sort_documents(documents, list(specification.items()))
+            elif name == '$skip':
+                documents = documents[specification:]
+            elif name == '$limit':
+                documents = documents[:specification]
+            else:
+                raise OperationFailure(f'unsupported aggregation stage: {name}')
+        return MemoryCursor(self.select({}) if documents is None else documents)
+
+    def drop(self, session=None):
+        with self.lock:
+            self.clear()
+            self.append([{'op': 'drop'}])
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure('change streams are not supported by the in-memory storage backend')
+
+class AsyncMemoryCollection:
+    def __init__(self, collection: MemoryCollection):
+        """Offer the operations of an in-memory collection with the API of a motor collection (see AsyncDAO). Since the operations never wait for I/O, the coroutines complete immediately."""
+        self.collection = collection
+
+    def find(self, *args, **kwargs) -> MemoryCursor:
+        return self.collection.find(*args, **kwargs)
+
+    def aggregate(self, *args, **kwargs) -> MemoryCursor:
+        return self.collection.aggregate(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        method = getattr(self.collection, name)
+        async def operation(*args, **kwargs):
+            return method(*args, **kwargs)
+        return operation
+
+# manage the in-memory collections of the process, which are shared by the data access objects of the same collection
+memory_collections = {}
+memory_collections_lock = threading.Lock()
+def getMemoryCollection(collection_name: str) -> MemoryCollection:
+    """Obtain the in-memory collection of the given name, which is created with the validator and the indexes of the collection. If the MEMORY_LOG_DIRECTORY setting is given, the collection is persisted in the log file <collection name>.jsonl in that directory.
+
+    parameters:
+        collection_name -- the name of the collection
+
+    returns:
+        collection -- MemoryCollection shared within the current process
+    """
+    with memory_collections_lock:
+        if collection_name not in memory_collections:
+            directory = getSetting('MEMORY_LOG_DIRECTORY')
+            log_path = None
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+                log_path = os.path.join(directory, f'{collection_name}.jsonl')
+            memory_collections[collection_name] = MemoryCollection(collection_name, getSchemaValidator(collection_name), getIndexes(collection_name), log_path)
+        return memory_collections[collection_name]
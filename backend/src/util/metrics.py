@@ -0,0 +1,245 @@
+import os
+import time
+import bisect
+import cProfile
+import inspect
+import functools
+import threading
+
+from src.util.dao import getSetting
+
+# upper bounds (in seconds) of the buckets of all latency histograms
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# methods of the synchronous and asynchronous data access objects which are instrumented (see instrument_dao)
+DAO_METHODS = ['findOne', 'find', 'iter_find', 'aggregate', 'versioned_snapshot', 'create', 'create_many', 'update', 'bulk_update', 'delete']
+
+def escape(value) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names: list[str], values: tuple, extra: str = None) -> str:
+    """Format the labels of a sample in the Prometheus text format, e.g., {route="/recipes/",method="GET"}."""
+    labels = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+class Counter:
+    def __init__(self, name: str, description: str, labels: list[str]):
+        """Count events per combination of label values.
+
+        parameters:
+            name -- name of the metric
+            description -- description of the metric, which is exported as its help text
+            labels -- names of the labels of the metric
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float, *label_values):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        """Export the metric in the Prometheus text format (see https://prometheus.io/docs/instrumenting/exposition_formats/)."""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{format_labels(self.labels, label_values)} {value}')
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, description: str, labels: list[str], buckets: tuple = DURATION_BUCKETS):
+        """Count observed values per bucket and combination of label values.
+
+        parameters:
+            name -- name of the metric
+            description -- description of the metric, which is exported as its help text
+            labels -- names of the labels of the metric
+            buckets -- ascending upper bounds of the buckets
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # the series of every combination of label values consists of the count per bucket (including the bucket +Inf) and the sum of all values
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        """Export the metric in the Prometheus text format, where the buckets are cumulative."""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for label_values, (counts, total) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    bucket = 'le="' + str(bound) + '"'
+                    lines.append(f'{self.name}_bucket{format_labels(self.labels, label_values, bucket)} {cumulative}')
+                lines.append(f'{self.name}_sum{format_labels(self.labels, label_values)} {total}')
+                lines.append(f'{self.name}_count{format_labels(self.labels, label_values)} {cumulative}')
+        return lines
+
+request_duration = Histogram('tinychef_request_duration_seconds', 'Latency of the HTTP requests per route', ['method', 'route', 'status'])
+controller_duration = Histogram('tinychef_controller_duration_seconds', 'Latency of the controller methods', ['controller', 'method'])
+dao_duration = Histogram('tinychef_dao_duration_seconds', 'Latency of the data access object methods', ['collection', 'method'])
+dao_documents = Counter('tinychef_dao_documents_total', 'Number of documents returned or written by the data access object methods', ['collection', 'method'])
+registry = [request_duration, controller_duration, dao_duration, dao_documents]
+
+def render() -> str:
+    """Export all metrics in the Prometheus text format."""
+    return '\n'.join(line for metric in registry for line in metric.render()) + '\n'
+
+def enabled() -> bool:
+    """Determine whether the instrumentation is enabled via the METRICS setting. If it is disabled, no method is wrapped, such that the instrumentation has no cost at all."""
+    return getSetting('METRICS', '').lower() in ['1', 'true', 'yes']
+
+def count_documents(result) -> int:
+    """Determine the number of documents of the result of a data access object method, where the result of a generator is the number of yielded documents (see wrap)."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    if isinstance(result, tuple) and len(result) > 0 and isinstance(result[0], list):
+        # a snapshot and its version (see DAO.versioned_snapshot)
+        return len(result[0])
+    if isinstance(result, dict) and isinstance(result.get('created'), list):
+        return len(result['created'])
+    if isinstance(result, dict) and 'modified' in result:
+        return result['modified']
+    return 0 if result is None else 1
+
+def wrap(method, observe):
+    """Wrap a method such that the time spent in it is passed to observe along with the object and the result. Coroutines are awaited by the wrapper, and the signature of the method is retained.
+    Generators are iterated by the wrapper, where only the time spent in the generator counts (not the time of the consumer between two items), and the number of yielded items is passed as the result once the generator is exhausted or closed."""
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def timed(self, *args, **kwargs):
+            iterator, duration, count = method(self, *args, **kwargs), 0.0, 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        duration += time.perf_counter() - start
+                    count += 1
+                    yield item
+            finally:
+                await iterator.aclose()
+                observe(self, duration, count)
+    elif inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            iterator, duration, count = method(self, *args, **kwargs), 0.0, 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    finally:
+                        duration += time.perf_counter() - start
+                    count += 1
+                    yield item
+            finally:
+                iterator.close()
+                observe(self, duration, count)
+    elif inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def timed(self, *args, **kwargs):
+            start = time.perf_counter()
+            result = await method(self, *args, **kwargs)
+            observe(self, time.perf_counter() - start, result)
+            return result
+    else:
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            observe(self, time.perf_counter() - start, result)
+            return result
+    timed.instrumented = True
+    return timed
+
+def instrument_dao(cls, methods: list[str]):
+    """Record the latency and the number of documents of methods of a data access object class (see dao_duration and dao_documents).
+
+    parameters:
+        cls -- the data access object class
+        methods -- names of the methods to instrument
+    """
+    for name in methods:
+        method = getattr(cls, name)
+        if getattr(method, 'instrumented', False):
+            continue
+
+        def observe(dao, duration, result, name=name):
+            dao_duration.observe(duration, dao.collection_name, name)
+            dao_documents.inc(count_documents(result), dao.collection_name, name)
+        setattr(cls, name, wrap(method, observe))
+
+def instrument_controller(cls, methods: list[str]):
+    """Record the latency of methods of a controller class (see controller_duration). Subclasses which do not override a method are recorded under their own name.
+
+    parameters:
+        cls -- the controller class
+        methods -- names of the methods to instrument
+    """
+    for name in methods:
+        method = getattr(cls, name)
+        if getattr(method, 'instrumented', False):
+            continue
+
+        def observe(controller, duration, result, name=name):
+            controller_duration.observe(duration, controller.__class__.__name__, name)
+        setattr(cls, name, wrap(method, observe))
+
+def install(app):
+    """Record the latency of every request of a Flask application per route (see request_duration). If the PROFILE_DIRECTORY setting is given, a request containing the header X-Profile is additionally profiled with cProfile, and the name of the file containing the profile is returned in the header X-Profile-File (inspect it with, e.g., `python -m pstats <file>` or snakeviz).
+
+    parameters:
+        app -- the Flask application
+    """
+    from flask import g, request
+
+    profile_directory = getSetting('PROFILE_DIRECTORY')
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        if profile_directory and 'X-Profile' in request.headers:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def stop_timer(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_directory, exist_ok=True)
+            filename = os.path.join(profile_directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{request.method}-{request.endpoint}-{os.getpid()}-{id(profiler)}.prof')
+            profiler.dump_stats(filename)
+            response.headers['X-Profile-File'] = filename
+
+        start = g.pop('request_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            request_duration.observe(time.perf_counter() - start, request.method, route, response.status_code)
+        return response
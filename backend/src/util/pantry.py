@@ -0,0 +1,117 @@
+import re
+from collections.abc import Mapping
+
+from src.util.dao import getSetting
+from src.util.units import to_base_unit
+
+# header of a request which selects the pantry whose items are used
+PANTRY_HEADER = 'X-Pantry-Id'
+
+# pantry ids are restricted to characters which are safe in cache and metric names
+PANTRY_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+def parse_pantry_id(headers) -> str:
+    """Determine the pantry selected by a request via the X-Pantry-Id header. Requests without the header use the shared pantry, i.e., all items of the collection, unless the REQUIRE_PANTRY_ID setting is enabled.
+
+    parameters:
+        headers -- the headers of the request
+
+    returns:
+        pantry_id -- the id of the selected pantry
+        None -- if no pantry is selected
+
+    raises:
+        ValueError -- in case the pantry id is invalid or missing although it is required
+    """
+    pantry_id = headers.get(PANTRY_HEADER)
+    if pantry_id is None:
+        if requires_pantry_id():
+            raise ValueError(f'the header {PANTRY_HEADER} is required')
+        return None
+    if PANTRY_ID_PATTERN.fullmatch(pantry_id) is None:
+        raise ValueError(f'invalid pantry id: {pantry_id}')
+    return pantry_id
+
+def requires_pantry_id() -> bool:
+    """Determine whether every request has to select a pantry, i.e., whether the pantries are separated from each other, which is enabled by the REQUIRE_PANTRY_ID setting."""
+    return getSetting('REQUIRE_PANTRY_ID', '').lower() in ['1', 'true', 'yes']
+
+def normalize_name(name: str) -> str:
+    """Normalize the name of an item or ingredient, such that names only differing in case or whitespace refer to the same ingredient (e.g., " Baking  powder" and "baking powder")."""
+    return ' '.join(name.split()).lower()
+
+def name_pattern(name: str) -> re.Pattern:
+    """Create a regular expression matching all item names which are equal to the given name after normalization (see normalize_name), which can be used in a MongoDB filter."""
+    return re.compile(r'^\s*' + r'\s+'.join(re.escape(word) for word in name.split()) + r'\s*$', re.IGNORECASE)
+
+def pantry_items_pipeline(pantry_ids: list[str], minimum_quantity: float = -1) -> list[dict]:
+    """Create an aggregation pipeline which sums the quantities of the items of several pantries per pantry, name, and unit in the database. Duplicate items are thereby aggregated before they are transferred, where the $match stage uses the index on pantry_id and name. The names are only trimmed and lowercased by the database, their complete normalization is done by PantryView.
+
+    parameters:
+        pantry_ids -- list of pantry ids
+        minimum_quantity -- the minimum quantity that an item needs to have in order to be included
+
+    returns:
+        pipeline -- list of aggregation stages, whose results contain the pantry_id, name, unit, and summed quantity
+    """
+    return [
+        {'$match': {'pantry_id': {'$in': list(pantry_ids)}, 'quantity': {'$gt': minimum_quantity}}},
+        {'$group': {'_id': {'pantry_id': '$pantry_id', 'name': {'$toLower': {'$trim': {'input': '$name'}}}, 'unit': '$unit'}, 'quantity': {'$sum': '$quantity'}}},
+        {'$project': {'_id': 0, 'pantry_id': '$_id.pantry_id', 'name': '$_id.name', 'unit': '$_id.unit', 'quantity': 1}}
+    ]
+
+class PantryView(Mapping):
+    def __init__(self, amounts=(), mismatched=()):
+        """Immutable view of the available amount of every ingredient of a pantry. The names are normalized (see normalize_name) and the amounts of names which are equal after normalization are summed, such that lookups take constant time and duplicate items are aggregated instead of overwriting each other.
+
+        parameters:
+          amounts -- a dict or an iterable of pairs mapping ingredient names to available amounts in base units
+          mismatched -- list of the pantry items which were left out because their unit does not match the dimension of the other items of the same name (see of)
+        """
+        aggregated = {}
+        for name, amount in (amounts.items() if isinstance(amounts, Mapping) else amounts):
+            key = normalize_name(name)
+            aggregated[key] = aggregated.get(key, 0.0) + amount
+        self._amounts = aggregated
+        self.mismatched = list(mismatched)
+
+    @classmethod
+    def of(cls, items: list[dict], minimum_quantity: float = -1) -> 'PantryView':
+        """Create the view of a list of pantry items, whose quantities are converted to base units (see to_base_unit). Quantities of different dimensions cannot be summed (e.g., 250 gram and 2 pieces of butter), hence the items of a name are only included if their base unit is the one of the first item of that name, and the others are reported at mismatched.
+
+        parameters:
+          items -- list of pantry items
+          minimum_quantity -- the minimum quantity that an item needs to have in order to be included
+
+        returns:
+          view -- the view of the available items
+        """
+        amounts, base_units, mismatched = {}, {}, []
+        for item in items:
+            if item['quantity'] <= minimum_quantity:
+                continue
+            quantity, base_unit = to_base_unit(item['quantity'], item.get('unit'))
+            key = normalize_name(item['name'])
+            if base_units.setdefault(key, base_unit) != base_unit:
+                mismatched.append(item)
+                continue
+            amounts[key] = amounts.get(key, 0.0) + quantity
+        return cls(amounts, mismatched)
+
+    def __getitem__(self, name: str) -> float:
+        return self._amounts[normalize_name(name)]
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and normalize_name(name) in self._amounts
+
+    def __iter__(self):
+        return iter(self._amounts)
+
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def items(self):
+        return self._amounts.items()
+
+    def __repr__(self) -> str:
+        return f'PantryView({self._amounts!r})'
@@ -0,0 +1,238 @@
+import re
+import datetime
+
+from bson.objectid import ObjectId
+
+# Python types of the BSON types which can be used in the bsonType keyword of a validator (see https://www.mongodb.com/docs/manual/reference/bson-types/)
+BSON_TYPES = {
+    'double': (float,),
+    'string': (str,),
+    'object': (dict,),
+    'array': (list, tuple),
+    'objectId': (ObjectId,),
+    'bool': (bool,),
+    'date': (datetime.datetime,),
+    'null': (type(None),),
+    'int': (int,),
+    'long': (int,),
+    'number': (int, float)
+}
+
+class ValidationError(ValueError):
+    def __init__(self, errors: list[str]):
+        """Signal that a document or an update violates the validator of a collection.
+
+        parameters:
+            errors -- list of messages, each naming an offending field
+        """
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+def compile_type_check(bson_types: list[str]):
+    """Compile a check whether a value is stored as one of the given BSON types, where booleans are not considered to be numbers."""
+    for bson_type in bson_types:
+        if bson_type not in BSON_TYPES:
+            raise ValueError(f'unsupported bsonType: {bson_type}')
+    python_types = tuple(python_type for bson_type in bson_types for python_type in BSON_TYPES[bson_type])
+    allows_bool = 'bool' in bson_types
+    return lambda value: isinstance(value, python_types) and (allows_bool or not isinstance(value, bool))
+
+def compile_schema(schema: dict):
+    """Compile a (sub-)schema of a $jsonSchema validator into a function, which checks a value in the same way as MongoDB does on every write (see https://www.mongodb.com/docs/manual/reference/operator/query/jsonSchema/). The keywords bsonType, required, properties, additionalProperties, enum, minimum, maximum, minLength, maxLength, pattern, and items are supported. All keywords are resolved once, such that checking a value only calls the checks which the schema requires.
+
+    parameters:
+        schema -- the (sub-)schema
+
+    returns:
+        check -- function of a value and its dotted path within the document, which returns a list of messages naming the offending fields
+    """
+    type_check, type_error = None, None
+    if 'bsonType' in schema:
+        bson_types = schema['bsonType'] if isinstance(schema['bsonType'], list) else [schema['bsonType']]
+        type_check, type_error = compile_type_check(bson_types), f'must be of type {" or ".join(bson_types)}'
+
+    # every check appends the messages of its violations to the list of errors
+    checks = []
+    if 'enum' in schema:
+        allowed = schema['enum']
+        checks.append(lambda value, path, errors: value in allowed or errors.append(f'{path} must be one of {allowed}'))
+    if 'minimum' in schema or 'maximum' in schema:
+        minimum, maximum = schema.get('minimum', float('-inf')), schema.get('maximum', float('inf'))
+        def check_range(value, path, errors):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if value < minimum:
+                    errors.append(f'{path} must be at least {minimum}')
+                elif value > maximum:
+                    errors.append(f'{path} must be at most {maximum}')
+        checks.append(check_range)
+    if 'minLength' in schema or 'maxLength' in schema or 'pattern' in schema:
+        minimum_length, maximum_length = schema.get('minLength', 0), schema.get('maxLength', float('inf'))
+        pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+        def check_string(value, path, errors):
+            if isinstance(value, str):
+                if not minimum_length <= len(value) <= maximum_length:
+                    errors.append(f'{path} must contain between {minimum_length} and {maximum_length} characters')
+                if pattern is not None and pattern.search(value) is None:
+                    errors.append(f'{path} must match {pattern.pattern}')
+        checks.append(check_string)
+    if 'items' in schema:
+        check_item = compile_schema(schema['items'])
+        def check_items(value, path, errors):
+            if isinstance(value, (list, tuple)):
+                for index, item in enumerate(value):
+                    errors += check_item(item, f'{path}.{index}')
+        checks.append(check_items)
+    if 'required' in schema or 'properties' in schema or schema.get('additionalProperties') is False:
+        required = schema.get('required', [])
+        properties = {field: compile_schema(subschema) for field, subschema in schema.get('properties', {}).items()}
+        additional = schema.get('additionalProperties', True) is not False
+        def check_object(value, path, errors):
+            if isinstance(value, dict):
+                prefix = f'{path}.' if path != 'document' else ''
+                for field in required:
+                    if field not in value:
+                        errors.append(f'{prefix}{field} is required')
+                for field, field_value in value.items():
+                    check_property = properties.get(field)
+                    if check_property is not None:
+                        errors += check_property(field_value, prefix + field)
+                    elif not additional and field != '_id':
+                        errors.append(f'{prefix}{field} is not allowed')
+        checks.append(check_object)
+
+    def check(value, path: str = 'document') -> list[str]:
+        if type_check is not None and not type_check(value):
+            return [f'{path} {type_error}']
+        errors = []
+        for check_value in checks:
+            check_value(value, path, errors)
+        return errors
+    return check
+
+def compile_coercion(schema: dict):
+    """Compile the conversion of a property value as received in a request (e.g., the string "1.5" of a form field) into the BSON type of the property. Values which cannot be converted are kept, such that the validation names the property."""
+    bson_types = schema.get('bsonType', [])
+    bson_types = bson_types if isinstance(bson_types, list) else [bson_types]
+    if len(bson_types) != 1:
+        return lambda value: value
+
+    type_check = compile_type_check(bson_types)
+    def coerce(value):
+        if type_check(value):
+            return value
+        try:
+            if bson_types[0] == 'double' and isinstance(value, (int, str)) and not isinstance(value, bool):
+                return float(value)
+            if bson_types[0] in ['int', 'long'] and isinstance(value, (float, str)):
+                number = float(value)
+                return int(number) if number.is_integer() else value
+            if bson_types[0] == 'bool' and isinstance(value, str) and value.lower() in ['true', 'false', '1', '0']:
+                return value.lower() in ['true', '1']
+            if bson_types[0] == 'string' and isinstance(value, (int, float)) and not isinstance(value, bool):
+                return str(value)
+        except ValueError:
+            pass
+        return value
+    return coerce
+
+def parse_flag(value) -> bool:
+    """Convert a flag as received in a request into a bool, where the same strings as for bool properties are accepted (see compile_coercion).
+
+    raises:
+        ValueError -- if the value is neither a bool nor one of the strings "true", "false", "1" and "0"
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ['true', 'false', '1', '0']:
+        return value.lower() in ['true', '1']
+    raise ValueError(f'invalid flag {value!r}')
+
+class SchemaValidator:
+    def __init__(self, validator: dict):
+        """Compile the $jsonSchema of a collection validator once, such that documents and updates can be checked in the application before they are sent to the database (see compile_schema).
+
+        parameters:
+            validator -- dict in the format of a MongoDB collection validator (see getValidator)
+        """
+        schema = validator.get('$jsonSchema', {})
+        self.check = compile_schema(schema)
+        self.required = set(schema.get('required', []))
+        self.properties = {field: (compile_schema(subschema), compile_coercion(subschema)) for field, subschema in schema.get('properties', {}).items()}
+        self.additional = schema.get('additionalProperties', True) is not False
+
+    def errors(self, document: dict) -> list[str]:
+        """Check a document against the validator.
+
+        returns:
+            errors -- list of messages, each naming an offending field (empty if the document is valid)
+        """
+        return self.check(document)
+
+    def validate(self, document: dict):
+        """Ensure that a document complies to the validator.
+
+        raises:
+            ValidationError -- in case the document violates the validator
+        """
+        errors = self.check(document)
+        if len(errors) > 0:
+            raise ValidationError(errors)
+
+    def update_errors(self, update: dict) -> list[str]:
+        """Check the top-level properties which an update operation sets (via $set, $inc, $mul, $min, $max) or removes (via $unset) against the validator. Properties of embedded documents and other update operators are checked by the database only.
+
+        returns:
+            errors -- list of messages, each naming an offending field (empty if no violation is detected)
+        """
+        if not isinstance(update, dict):
+            return ['the update must be a document of update operators']
+        errors = []
+        for operator, fields in update.items():
+            if not isinstance(fields, dict):
+                errors.append(f'{operator} must contain a document of fields')
+                continue
+            for field, value in fields.items():
+                if '.' in field:
+                    continue
+                if operator == '$unset':
+                    if field in self.required:
+                        errors.append(f'{field} is required')
+                elif operator in ['$inc', '$mul']:
+                    # the result of an arithmetic update keeps the type of the property, as long as the operand is a number
+                    if not isinstance(value, (int, float)) or isinstance(value, bool):
+                        errors.append(f'{field} can only be changed by a number')
+                elif operator not in ['$set', '$min', '$max']:
+                    continue
+                elif field in self.properties:
+                    errors += self.properties[field][0](value, field)
+                elif not self.additional and field != '_id':
+                    errors.append(f'{field} is not allowed')
+        return errors
+
+    def validate_update(self, update: dict):
+        """Ensure that an update operation complies to the validator (see update_errors).
+
+        raises:
+            ValidationError -- in case the update violates the validator
+        """
+        errors = self.update_errors(update)
+        if len(errors) > 0:
+            raise ValidationError(errors)
+
+    def coerce(self, document: dict) -> dict:
+        """Convert the property values of a document as received in a request into the BSON types of the properties (see compile_coercion).
+
+        returns:
+            document -- a copy of the document with converted values
+        """
+        return {field: self.properties[field][1](value) if field in self.properties else value for field, value in document.items()}
+
+    def coerce_update(self, update: dict) -> dict:
+        """Convert the values of an update operation as received in a request into the BSON types of the properties (see coerce).
+
+        returns:
+            update -- a copy of the update operation with converted values
+        """
+        if not isinstance(update, dict):
+            return update
+        return {operator: self.coerce(fields) if isinstance(fields, dict) and operator not in ['$unset', '$inc', '$mul'] else fields for operator, fields in update.items()}
@@ -0,0 +1,30 @@
+import numpy as np
+
+def select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Select the indices of the k highest scores without sorting all scores. The selection uses a partial sort (O(n + k log k)) and only orders the k selected scores.
+
+    parameters:
+        scores -- array of scores
+        k -- number of indices to select
+
+    returns:
+        indices -- array of at most k indices, ordered by descending score"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    selected = np.argpartition(-scores, k-1)[:k]
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+def sample_weighted(scores: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw k indices at random without replacement, where the probability to draw an index is proportional to its score. The sampling assigns every index the key u^(1/score) with u drawn uniformly from [0, 1) and selects the k largest keys (see Efraimidis & Spirakis, "Weighted random sampling with a reservoir", 2006).
+
+    parameters:
+        scores -- array of positive scores which serve as weights
+        k -- number of indices to draw
+        rng -- random number generator
+
+    returns:
+        indices -- array of at most k indices in the order in which they were drawn"""
+    keys = rng.random(len(scores)) ** (1 / scores)
+    return select_top_k(keys, k)
@@ -0,0 +1,83 @@
+import re
+
+# every dimension of a quantity is measured in one base unit, to which all other units of the dimension are converted
+BASE_UNITS = {
+    'mass': 'gram',
+    'volume': 'milliliter',
+    'count': 'piece'
+}
+
+# dimension and factor to the base unit of every known unit, including its abbreviations
+UNITS = {
+    'gram': ('mass', 1.0, ['g', 'gr']),
+    'milligram': ('mass', 0.001, ['mg']),
+    'kilogram': ('mass', 1000.0, ['kg', 'kilo']),
+    'ounce': ('mass', 28.349523125, ['oz']),
+    'pound': ('mass', 453.59237, ['lb', 'lbs']),
+    'milliliter': ('volume', 1.0, ['ml', 'millilitre']),
+    'centiliter': ('volume', 10.0, ['cl', 'centilitre']),
+    'deciliter': ('volume', 100.0, ['dl', 'decilitre']),
+    'liter': ('volume', 1000.0, ['l', 'litre']),
+    'teaspoon': ('volume', 4.92892159375, ['tsp']),
+    'tablespoon': ('volume', 14.78676478125, ['tbsp']),
+    'cup': ('volume', 236.5882365, []),
+    'piece': ('count', 1.0, ['pc', 'pcs', 'unit']),
+    'pack': ('count', 1.0, ['package', 'packet']),
+    'block': ('count', 1.0, []),
+    'dozen': ('count', 12.0, [])
+}
+
+def compile_conversions(units: dict) -> dict:
+    """Precompute the conversion of every spelling of a unit (name, plural, and abbreviations) to its base unit, such that a conversion only requires one dictionary lookup.
+
+    parameters:
+        units -- dictionary mapping a unit to its dimension, the factor to the base unit of the dimension, and its abbreviations
+
+    returns:
+        conversions -- dictionary mapping every lowercase spelling of a unit to the factor and the base unit
+    """
+    conversions = {}
+    for unit, (dimension, factor, abbreviations) in units.items():
+        for spelling in [unit, unit + 's'] + abbreviations:
+            conversions[spelling] = (factor, BASE_UNITS[dimension])
+    return conversions
+
+conversions = compile_conversions(UNITS)
+
+def to_base_unit(quantity: float, unit: str):
+    """Convert a quantity to the base unit of its dimension (e.g., 1 kilogram to 1000 gram). Quantities of unknown units are kept as they are, i.e., they are treated as a count of that unit.
+
+    parameters:
+        quantity -- the amount measured in the unit
+        unit -- the name or abbreviation of the unit (case insensitive)
+
+    returns:
+        quantity -- the amount measured in the base unit
+        unit -- the base unit
+    """
+    if unit is None:
+        return float(quantity), BASE_UNITS['count']
+    factor, base_unit = conversions.get(unit.strip().lower(), (1.0, unit))
+    return float(quantity) * factor, base_unit
+
+def parse_amount(amount) -> float:
+    """Obtain the amount of an ingredient of a recipe in the base unit of its dimension. An amount is either a number, which is already measured in the base unit, a string containing a number and a unit (e.g., "1.5 kg"), or a dict containing the number at "quantity" and the unit at "unit".
+
+    parameters:
+        amount -- the amount as found in src/static/recipes
+
+    returns:
+        amount -- the amount measured in the base unit
+
+    raises:
+        ValueError -- in case the amount cannot be parsed
+    """
+    if isinstance(amount, (int, float)):
+        return amount
+    if isinstance(amount, dict):
+        return to_base_unit(amount['quantity'], amount.get('unit'))[0]
+
+    match = re.fullmatch(r'\s*([0-9]*\.?[0-9]+)\s*([^\s0-9].*?)?\s*', str(amount))
+    if match is None:
+        raise ValueError(f'invalid amount: {amount}')
+    return to_base_unit(float(match.group(1)), match.group(2))[0]
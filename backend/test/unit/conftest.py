@@ -0,0 +1,24 @@
+import pytest
+
+from src.util import dao, asyncdao, memorydb
+from src.util.httpcache import response_cache
+
+@pytest.fixture
+def memory_storage(monkeypatch):
+    """Select the memory storage backend (see usesMemoryStorage) with empty collections and caches."""
+    monkeypatch.setenv('STORAGE_BACKEND', 'memory')
+    memorydb.memory_collections.clear()
+    dao.resetClients()
+    asyncdao.resetAsyncClients()
+    dao.snapshot_cache.invalidate('item')
+    response_cache.reset()
+    yield
+    memorydb.memory_collections.clear()
+    dao.resetClients()
+    asyncdao.resetAsyncClients()
+
+@pytest.fixture
+def client(memory_storage):
+    """Test client of the Flask application on the memory storage backend."""
+    from main import app
+    return app.test_client()
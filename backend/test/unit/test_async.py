@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from src.util import asyncdao
+from src.util.asyncdao import AsyncDAO, getAsyncDao
+from src.util.dao import getDao, snapshot_cache
+from src.controllers.recipecontroller import RecipeController
+from src.controllers.asyncrecipecontroller import AsyncRecipeController
+from src.static.diets import Diet
+
+@pytest.fixture
+def motor_client(monkeypatch):
+    """Replace the asynchronous MongoDB client by an in-memory mock of motor."""
+    client = AsyncMongoMockClient()
+    monkeypatch.setenv('STORAGE_BACKEND', 'mongodb')
+    monkeypatch.setattr(asyncdao, 'getAsyncClient', lambda: client)
+    asyncdao.resetAsyncClients()
+    snapshot_cache.invalidate('item')
+    # the mock does not support validators, so the collection is created in advance (see AsyncDAO.setup)
+    asyncio.run(client.tinychef.create_collection('item'))
+    yield client
+    asyncdao.resetAsyncClients()
+
+@pytest.mark.unit
+def test_async_dao_reads_and_writes_via_motor(motor_client):
+    async def scenario():
+        dao = AsyncDAO('item')
+        flour = (await dao.create({'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'}))['_id']['$oid']
+        result = await dao.create_many([{'name': 'Sugar', 'quantity': 50.0, 'unit': 'gram'}, {'name': 'Salt'}])
+        assert [error['index'] for error in result['errors']] == [1]
+
+        assert await dao.update(flour, {'$inc': {'quantity': -100.0}})
+        assert (await dao.findOne(flour))['quantity'] == 400.0
+        assert (await dao.bulk_update([{'id': flour, 'data': {'$inc': {'quantity': -100.0}}, 'filter': {'quantity': {'$gte': 1000}}}]))['matched'] == 0
+        assert [item['name'] for item in (await dao.versioned_snapshot())[0]] == ['Flour', 'Sugar']
+        assert await dao.scoped('kitchen').find() == []
+
+        assert await dao.delete(flour)
+        assert [item['name'] for item in await dao.find()] == ['Sugar']
+    asyncio.run(scenario())
+
+@pytest.mark.unit
+def test_async_controller_proposes_the_same_recipes(memory_storage):
+    getDao('item').create_many([
+        {'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'},
+        {'name': 'Milk', 'quantity': 1.0, 'unit': 'l'},
+        {'name': 'Egg', 'quantity': 6.0, 'unit': 'piece'}])
+    controller = RecipeController(items_dao=getDao('item'))
+    async_controller = AsyncRecipeController(items_dao=getAsyncDao('item'))
+
+    expected = controller.get_top_recipes(diet=Diet.NORMAL, k=3, take_best=True)
+    proposed = asyncio.run(async_controller.get_top_recipes(diet=Diet.NORMAL, k=3, take_best=True))
+
+    assert len(expected) > 0
+    assert [recipe['name'] for recipe in proposed] == [recipe['name'] for recipe in expected]
+
+@pytest.mark.unit
+def test_asgi_app_serves_items_and_recipes(memory_storage):
+    from asgi import app
+
+    async def scenario():
+        client = app.test_client()
+        response = await client.post('/items/create', form={'name': 'Flour', 'quantity': '500', 'unit': 'gram'})
+        assert response.status_code == 200
+
+        response = await client.get('/items/all')
+        assert [item['name'] for item in await response.get_json()] == ['Flour']
+
+        response = await client.get('/recipes/top?k=2')
+        assert response.status_code == 200
+        assert 0 < len((await response.get_json())['recipes']) <= 2
+        response = await client.get('/recipes/top?k=2', headers={'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+
+        assert (await client.get('/recipes/top?k=abc')).status_code == 400
+    asyncio.run(scenario())
+
+@pytest.mark.unit
+def test_async_atomic_bulk_update_reverts_increments_after_missed_guard(memory_storage):
+    async def scenario():
+        dao = getAsyncDao('item')
+        created = (await dao.create_many([{'name': 'Flour', 'quantity': 500.0, 'unit': 'g'}, {'name': 'Egg', 'quantity': 2.0, 'unit': 'piece'}]))['created']
+        flour, egg = (item['_id']['$oid'] for item in created)
+
+        result = await dao.bulk_update([
+            {'id': flour, 'data': {'$inc': {'quantity': -150.0}}, 'filter': {'quantity': {'$gte': 150.0}}},
+            {'id': egg, 'data': {'$inc': {'quantity': -3.0}}, 'filter': {'quantity': {'$gte': 3.0}}},
+        ], atomic=True)
+
+        assert (result['matched'], result['aborted']) == (1, True)
+        assert {item['name']: item['quantity'] for item in await dao.find()} == {'Flour': 500, 'Egg': 2}
+    asyncio.run(scenario())
+
+@pytest.mark.unit
+def test_async_controller_scores_outside_of_the_event_loop(memory_storage, monkeypatch):
+    getDao('item').create_many([{'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'}])
+    controller = AsyncRecipeController(items_dao=getAsyncDao('item'))
+    score_recipes = controller.score_recipes
+    threads = []
+    def record_thread(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return score_recipes(*args, **kwargs)
+    monkeypatch.setattr(controller, 'score_recipes', record_thread)
+
+    asyncio.run(controller.get_top_recipes(diet=Diet.NORMAL, k=3))
+
+    assert len(threads) == 1 and threads[0] != threading.get_ident()
@@ -0,0 +1,120 @@
+import json
+import pytest
+import numpy as np
+
+from src.static.diets import Diet
+from src.util.batch import BatchScorer, parse_batch, check_batch_access, getWorkerPool
+from src.util.catalog import RecipeCatalog
+from src.util.dao import getDao
+from src.controllers.recipecontroller import RecipeController
+
+recipes = [
+    {'name': 'Pancakes', 'diets': ['normal', 'vegetarian'], 'ingredients': {'Egg': 3, 'Milk': 100, 'Flour': 150}},
+    {'name': 'Bread', 'diets': ['normal', 'vegetarian', 'vegan'], 'ingredients': {'Flour': 500, 'Yeast': 1, 'Salt': 10}},
+    {'name': 'Omelette', 'diets': ['normal'], 'ingredients': {'Egg': 4, 'Salt': 2}}
+]
+
+@pytest.mark.unit
+def test_recommend_selects_best_recipes_per_pantry():
+    catalog = RecipeCatalog(recipes)
+    scorer = BatchScorer.of(catalog)
+    pantries = np.stack([catalog.pantry_vector(available_items) for available_items in [{'Egg': 4, 'Salt': 2}, {'Flour': 500, 'Yeast': 1}, {}]])
+
+    recommendations = scorer.recommend(Diet.NORMAL, pantries, 2, True, np.random.default_rng())
+
+    assert [[recipe['name'] for recipe in recipes] for recipes in recommendations] == [['Omelette', 'Pancakes'], ['Bread', 'Pancakes'], []]
+
+@pytest.mark.unit
+def test_parse_batch_parses_pantries():
+    entries, k, take_best, chunk_size = parse_batch({'pantries': [{'pantry_id': 'a', 'diet': 'vegan'}, {'items': [{'name': 'Egg', 'quantity': '2'}]}], 'k': 3})
+
+    assert entries == [{'diet': Diet.VEGAN, 'pantry_id': 'a'}, {'diet': Diet.NORMAL, 'items': [{'name': 'Egg', 'quantity': 2.0, 'unit': None}]}]
+    assert (k, take_best, chunk_size) == (3, True, None)
+
+@pytest.mark.unit
+@pytest.mark.parametrize('data', [
+    None,
+    {'pantries': 'a'},
+    {'pantries': ['a']},
+    {'pantries': [{'pantry_id': '../a'}]},
+    {'pantries': [{'diet': 'vegan'}]},
+    {'pantries': [{'items': [{'name': 'Egg', 'quantity': 'two'}]}]},
+    {'pantries': [], 'k': 0},
+    {'pantries': [], 'k': '3'},
+    {'pantries': [], 'chunk_size': 0}
+])
+def test_parse_batch_rejects_invalid_pantries(data):
+    with pytest.raises((ValueError, TypeError, KeyError)):
+        parse_batch(data)
+
+@pytest.mark.unit
+def test_batch_access_is_restricted_to_pantry_of_request(monkeypatch):
+    entries = [{'diet': Diet.NORMAL, 'pantry_id': 'a'}, {'diet': Diet.NORMAL, 'items': []}]
+    check_batch_access(entries + [{'diet': Diet.NORMAL, 'pantry_id': 'b'}], {})
+
+    monkeypatch.setenv('REQUIRE_PANTRY_ID', 'true')
+    check_batch_access(entries, {'X-Pantry-Id': 'a'})
+    with pytest.raises(PermissionError):
+        check_batch_access(entries, {'X-Pantry-Id': 'b'})
+    with pytest.raises(ValueError):
+        check_batch_access(entries, {})
+
+def create_pantries(pantries: dict):
+    for pantry_id, names in pantries.items():
+        getDao('item', pantry_id=pantry_id).create_many([{'name': name, 'quantity': 500.0, 'unit': 'gram'} for name in names])
+
+@pytest.mark.unit
+@pytest.mark.parametrize('workers', [0, 2])
+def test_recommend_batch_matches_top_recipes(memory_storage, workers):
+    create_pantries({'a': ['Flour', 'Milk', 'Egg'], 'b': ['Pasta', 'Tomato']})
+    controller = RecipeController(items_dao=getDao('item'))
+    entries = [{'diet': Diet.NORMAL, 'pantry_id': 'a'}, {'diet': Diet.VEGAN, 'items': [{'name': 'Flour', 'quantity': 500, 'unit': 'g'}]}, {'diet': Diet.NORMAL, 'pantry_id': 'b'}]
+
+    recommendations = list(controller.recommend_batch(entries, k=3, chunk_size=2, workers=workers))
+
+    assert [recommendation['index'] for recommendation in recommendations] == [0, 1, 2]
+    assert len(recommendations[0]['recipes']) > 0
+    for recommendation, (diet, pantry_id) in zip(recommendations[::2], [(Diet.NORMAL, 'a'), (Diet.NORMAL, 'b')]):
+        expected = controller.get_top_recipes(diet=diet, k=3, pantry_id=pantry_id)
+        assert [recipe['name'] for recipe in recommendation['recipes']] == [recipe['name'] for recipe in expected]
+
+@pytest.mark.unit
+def test_worker_pool_is_shared_per_catalog():
+    catalog = RecipeCatalog(recipes)
+
+    pool = getWorkerPool(catalog, 1)
+
+    assert getWorkerPool(catalog, 1) is pool
+    assert getWorkerPool(RecipeCatalog(recipes), 1) is not pool
+
+@pytest.mark.unit
+def test_batch_route_streams_recommendations(client, monkeypatch):
+    create_pantries({'a': ['Flour', 'Milk', 'Egg']})
+
+    response = client.post('/recipes/batch', json={'pantries': [{'pantry_id': 'a'}, {'items': []}], 'k': 2})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.status_code == 200
+    assert [line['index'] for line in lines] == [0, 1]
+    assert len(lines[0]['recipes']) > 0 and lines[1]['recipes'] == []
+
+    monkeypatch.setenv('REQUIRE_PANTRY_ID', 'true')
+    assert client.post('/recipes/batch', json={'pantries': [{'pantry_id': 'a'}]}, headers={'X-Pantry-Id': 'b'}).status_code == 403
+    assert client.post('/recipes/batch', json={'pantries': [{'pantry_id': 'a'}]}).status_code == 400
+    assert client.post('/recipes/batch', json={'pantries': [{'pantry_id': 'a'}]}, headers={'X-Pantry-Id': 'a'}).status_code == 200
+
+@pytest.mark.unit
+def test_batch_route_reports_errors(client, monkeypatch):
+    from src.blueprints.recipeblueprint import controller
+    def failing(entries, **kwargs):
+        yield {'index': 0, 'recipes': []}
+        raise RuntimeError('database unavailable')
+    def failing_at_once(entries, **kwargs):
+        raise RuntimeError('database unavailable')
+        yield
+
+    monkeypatch.setattr(controller, 'recommend_batch', failing_at_once)
+    assert client.post('/recipes/batch', json={'pantries': [{'items': []}]}).status_code == 500
+
+    monkeypatch.setattr(controller, 'recommend_batch', failing)
+    response = client.post('/recipes/batch', json={'pantries': [{'items': []}]})
+    assert response.get_data(as_text=True).splitlines()[-1] == '{"error": "Unknown server error"}'
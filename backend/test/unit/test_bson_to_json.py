@@ -0,0 +1,17 @@
+import pytest
+import json
+import datetime
+
+from bson import json_util, ObjectId, Int64
+
+from src.util.dao import bson_to_json
+
+@pytest.mark.unit
+@pytest.mark.parametrize('document', [
+    {'_id': ObjectId(), 'name': 'Flour', 'quantity': 450.0, 'unit': 'gram'},
+    {'_id': ObjectId(), 'created': datetime.datetime(2023, 3, 1, 12, 30, 15, 250000), 'nested': {'ids': [ObjectId(), ObjectId()], 'count': Int64(2)}},
+    {'_id': ObjectId(), 'quantity': float('inf'), 'expired': datetime.datetime(1960, 1, 1)},
+    None
+])
+def test_bson_to_json_matches_json_util(document):
+    assert bson_to_json(document) == json.loads(json_util.dumps(document))
@@ -0,0 +1,57 @@
+import pytest
+
+from src.util.dao import getDao, BulkUpdate
+
+@pytest.mark.unit
+def test_create_many_reports_rejected_documents_by_index(memory_storage):
+    result = getDao('item').create_many([
+        {'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'},
+        {'name': 'Sugar', 'unit': 'gram'},
+        {'name': 'Salt', 'quantity': 10.0, 'unit': 'gram'},
+    ])
+
+    assert [item['name'] for item in result['created']] == ['Flour', 'Salt']
+    assert [error['index'] for error in result['errors']] == [1]
+    assert [item['name'] for item in getDao('item').find()] == ['Flour', 'Salt']
+
+@pytest.mark.unit
+def test_bulk_update_reports_failed_updates_by_index(memory_storage):
+    created = getDao('item').create_many([{'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'}, {'name': 'Sugar', 'quantity': 50.0, 'unit': 'gram'}])['created']
+    flour, sugar = (item['_id']['$oid'] for item in created)
+
+    result = getDao('item').bulk_update([
+        {'id': flour, 'data': {'$inc': {'quantity': -100}}},
+        {'id': sugar, 'data': {'$set': {'quantity': 'many'}}},
+        {'id': sugar, 'data': {'$inc': {'quantity': -100}}, 'filter': {'quantity': {'$gte': 100}}},
+    ])
+
+    assert (result['matched'], result['modified']) == (1, 1)
+    assert [error['index'] for error in result['errors']] == [1]
+    assert {item['name']: item['quantity'] for item in getDao('item').find()} == {'Flour': 400, 'Sugar': 50}
+
+@pytest.mark.unit
+def test_bulk_route_creates_and_updates_items(client):
+    response = client.post('/items/bulk', json=[{'name': 'Flour', 'quantity': '500', 'unit': 'gram'}, {'name': 'Sugar'}])
+    assert response.status_code == 200
+    assert [item['name'] for item in response.json['created']] == ['Flour']
+    assert [error['index'] for error in response.json['errors']] == [1]
+
+    flour = response.json['created'][0]['_id']['$oid']
+    response = client.put('/items/bulk', json=[{'id': flour, 'data': {'$inc': {'quantity': -200}}}])
+    assert response.status_code == 200
+    assert (response.json['matched'], response.json['modified'], response.json['errors']) == (1, 1, [])
+    assert client.get(f'/items/byid/{flour}').json['quantity'] == 300
+
+@pytest.mark.unit
+@pytest.mark.parametrize('body', [{'name': 'Flour'}, ['Flour'], [{'id': 'abc', 'data': {}}], [{'id': '0123456789ab0123456789ab', 'data': 'quantity'}]])
+def test_bulk_route_rejects_invalid_bodies(client, body):
+    method = client.put if isinstance(body, list) and isinstance(body[0], dict) else client.post
+    assert method('/items/bulk', json=body).status_code == 400
+
+@pytest.mark.unit
+def test_prepared_bulk_update_rejects_invalid_atomic_updates_without_round_trip(memory_storage):
+    bulk = BulkUpdate([{'id': '0' * 24, 'data': {'$set': {'quantity': 'many'}}}], 'item', atomic=True)
+
+    assert bulk.operations == []
+    assert bulk.skipped()['aborted']
+    assert not BulkUpdate([{'id': '0' * 24, 'data': {'$set': {'quantity': 1.0}}}], 'item', atomic=True).compensable()
@@ -0,0 +1,206 @@
+import threading
+import pytest
+import numpy as np
+
+from src.static.diets import Diet
+from src.util import catalog as catalog_module
+from src.util.calculator import calculate_readiness
+from src.util.catalog import RecipeCatalog, CatalogWatcher, defer_watchers, start_deferred_watchers
+
+recipes = [
+    {'name': 'Pancakes', 'diets': ['normal', 'vegetarian'], 'ingredients': {'Egg': 3, 'Milk': 100, 'Flour': 150, 'Salt': 0}},
+    {'name': 'Bread', 'diets': ['normal', 'vegetarian', 'vegan'], 'ingredients': {'Flour': 500, 'Yeast': 1, 'Salt': 10}},
+    {'name': 'Omelette', 'diets': ['normal'], 'ingredients': {'Egg': 4, 'Salt': 2}}
+]
+
+@pytest.mark.unit
+@pytest.mark.parametrize('available_items', [
+    {},
+    {'Flour': 450, 'Salt': 500},
+    {'Egg': 2, 'Milk': 1000, 'Flour': 100, 'Yeast': 7, 'Salt': 1, 'Sugar': 30}
+])
+def test_readiness_matches_scalar(available_items):
+    catalog = RecipeCatalog(recipes)
+
+    readiness = catalog.readiness(available_items)
+
+    assert readiness.tolist() == [calculate_readiness(recipe, available_items) for recipe in recipes]
+
+@pytest.mark.unit
+def test_diet_masks():
+    catalog = RecipeCatalog(recipes)
+
+    assert catalog.diet_masks[Diet.NORMAL].tolist() == [True, True, True]
+    assert catalog.diet_masks[Diet.VEGETARIAN].tolist() == [True, True, False]
+    assert catalog.diet_masks[Diet.VEGAN].tolist() == [False, True, False]
+
+@pytest.mark.unit
+def test_snapshot_round_trip(tmp_path):
+    catalog = RecipeCatalog(recipes)
+    catalog.write(str(tmp_path / 'recipes.catalog'))
+
+    loaded = RecipeCatalog.load(str(tmp_path / 'recipes.catalog'))
+
+    assert loaded.names == catalog.names
+    assert loaded.readiness({'Flour': 450, 'Egg': 1}).tolist() == catalog.readiness({'Flour': 450, 'Egg': 1}).tolist()
+    assert loaded.diet_masks[Diet.VEGAN].tolist() == [False, True, False]
+    assert loaded.recipes[2] == recipes[2]
+
+@pytest.mark.unit
+def test_loaded_partitions_are_mapped_from_snapshot(tmp_path):
+    catalog = RecipeCatalog(recipes)
+    catalog.write(str(tmp_path / 'recipes.catalog'))
+
+    loaded = RecipeCatalog.load(str(tmp_path / 'recipes.catalog'))
+    partition = loaded.partitions[Diet.VEGETARIAN]
+
+    assert not partition.indices.flags.owndata and not partition.indices.flags.writeable
+    assert partition.score(loaded.pantry_vector({'Flour': 450})).tolist() == catalog.partition(Diet.VEGETARIAN).score(catalog.pantry_vector({'Flour': 450})).tolist()
+    assert partition.rows_requiring(np.array([loaded.ingredients['Egg']])).tolist() == [0]
+
+@pytest.mark.unit
+def test_open_compiles_in_memory_if_snapshot_cannot_be_replaced(tmp_path, monkeypatch):
+    directory = tmp_path / 'recipes'
+    directory.mkdir()
+    (directory / 'bread.json').write_text('{"name": "Bread", "diets": ["normal"], "ingredients": {"Flour": 500}}')
+    (tmp_path / 'recipes.catalog').write_bytes(b'outdated')
+    def fail(self, path):
+        raise PermissionError('read-only file system')
+    monkeypatch.setattr(RecipeCatalog, 'write', fail)
+
+    catalog = RecipeCatalog.open(str(directory), substitutes=None)
+
+    assert catalog.names == ['Bread']
+
+@pytest.mark.unit
+def test_replace_matches_full_compilation():
+    catalog = RecipeCatalog(recipes)
+    changed = {'name': 'Bread', 'diets': ['normal'], 'ingredients': {'Flour': 400, 'Sugar': 5}}
+    added = {'name': 'Porridge', 'diets': ['normal', 'vegan'], 'ingredients': {'Oats': 50, 'Salt': 1}}
+
+    replaced = catalog.replace([changed, added], [None, None], removed={'Omelette'})
+    compiled = RecipeCatalog([recipes[0], changed, added])
+    available_items = {'Flour': 200, 'Salt': 1, 'Oats': 100, 'Egg': 3}
+
+    assert replaced.names == compiled.names
+    assert replaced.readiness(available_items).tolist() == compiled.readiness(available_items).tolist()
+    assert replaced.diet_masks[Diet.VEGAN].tolist() == compiled.diet_masks[Diet.VEGAN].tolist()
+    assert replaced.recipes[1] == changed
+
+@pytest.mark.unit
+def test_repeated_replace_keeps_one_level_of_merged_recipes():
+    catalog = RecipeCatalog(recipes)
+    changed = {'name': 'Bread', 'diets': ['normal'], 'ingredients': {'Flour': 400, 'Sugar': 5}}
+    added = {'name': 'Porridge', 'diets': ['normal', 'vegan'], 'ingredients': {'Oats': 50, 'Salt': 1}}
+
+    for _ in range(3):
+        catalog = catalog.replace([changed, added], [None, None], removed={'Omelette'})
+    catalog = catalog.replace([], [], removed={'Bread'})
+
+    assert catalog.recipes.base is recipes
+    assert list(catalog.recipes) == [recipes[0], added]
+    assert catalog.names == [recipes[0]['name'], 'Porridge']
+
+@pytest.mark.unit
+@pytest.mark.parametrize('diet', list(Diet))
+def test_partition_readiness_matches_masked_readiness(diet):
+    catalog = RecipeCatalog(recipes)
+    available_items = {'Egg': 2, 'Flour': 100, 'Yeast': 7, 'Salt': 1}
+
+    partition = catalog.partition(diet)
+    rows, readiness = partition.rows, partition.score(catalog.pantry_vector(available_items))
+
+    assert rows.tolist() == catalog.diet_masks[diet].nonzero()[0].tolist()
+    assert readiness.tolist() == catalog.readiness(available_items)[rows].tolist()
+
+@pytest.mark.unit
+def test_recipe_by_name():
+    catalog = RecipeCatalog(recipes)
+
+    assert catalog.recipe('Bread') == recipes[1]
+    assert catalog.recipe('Lasagna') is None
+
+@pytest.mark.unit
+@pytest.mark.parametrize('changes', [
+    {},
+    {'Yeast': 0},
+    {'Egg': 4, 'Salt': 0}
+])
+def test_rescore_matches_score(changes):
+    catalog = RecipeCatalog(recipes)
+    partition = catalog.partition(Diet.NORMAL)
+    available_items = {'Egg': 2, 'Flour': 100, 'Yeast': 7, 'Salt': 1}
+
+    previous_pantry = catalog.pantry_vector(available_items)
+    pantry = catalog.pantry_vector({**available_items, **changes})
+
+    readiness = partition.rescore(pantry, previous_pantry, partition.score(previous_pantry))
+
+    assert readiness.tolist() == partition.score(pantry).tolist()
+
+@pytest.mark.unit
+def test_score_many_matches_score():
+    catalog = RecipeCatalog(recipes)
+    partition = catalog.partition(Diet.VEGETARIAN)
+    pantries = [catalog.pantry_vector(available_items) for available_items in [{}, {'Flour': 450, 'Salt': 500}, {'Egg': 2, 'Milk': 1000, 'Yeast': 7}]]
+
+    readiness = partition.score_many(np.stack(pantries))
+
+    assert readiness.tolist() == [partition.score(pantry).tolist() for pantry in pantries]
+
+substitutes = [
+    {'ingredient': 'Milk', 'substitute': 'Whole Milk', 'factor': 1, 'diets': ['normal', 'vegetarian']},
+    {'ingredient': 'Milk', 'substitute': 'Oat Milk', 'factor': 1, 'diets': ['normal', 'vegetarian', 'vegan']},
+    {'ingredient': 'Egg', 'substitute': 'Chicken Egg', 'factor': 2, 'diets': ['normal']}
+]
+
+@pytest.mark.unit
+def test_substitutes_comply_to_diet():
+    catalog = RecipeCatalog(recipes, substitutes=substitutes)
+    available_items = {'Egg': 1, 'Chicken Egg': 1, 'Whole Milk': 30, 'Oat Milk': 50, 'Flour': 150}
+    pantry = catalog.pantry_vector(available_items)
+
+    readiness = catalog.partition(Diet.VEGETARIAN).score(pantry)
+
+    assert readiness[0] == pytest.approx((1 / 3 + 0.8 + 1 + 0) / 4)
+    assert catalog.used_substitutes('Pancakes', pantry, Diet.VEGETARIAN) == [
+        {'ingredient': 'Milk', 'substitute': 'Whole Milk', 'amount': 30.0},
+        {'ingredient': 'Milk', 'substitute': 'Oat Milk', 'amount': 50.0}
+    ]
+    assert catalog.used_substitutes('Omelette', pantry, Diet.NORMAL) == [{'ingredient': 'Egg', 'substitute': 'Chicken Egg', 'amount': 1.0}]
+
+@pytest.mark.unit
+def test_substitutes_are_kept_in_snapshot(tmp_path):
+    catalog = RecipeCatalog(recipes, substitutes=substitutes)
+    catalog.write(str(tmp_path / 'recipes.catalog'))
+    loaded = RecipeCatalog.load(str(tmp_path / 'recipes.catalog'))
+    partition = loaded.partition(Diet.NORMAL)
+    pantries = [loaded.pantry_vector(available_items) for available_items in [{'Oat Milk': 100}, {'Chicken Egg': 1, 'Salt': 3}]]
+
+    assert partition.score_many(np.stack(pantries)).tolist() == [catalog.partition(Diet.NORMAL).score(pantry).tolist() for pantry in pantries]
+    assert partition.rescore(pantries[1], pantries[0], partition.score(pantries[0])).tolist() == partition.score(pantries[1]).tolist()
+
+@pytest.mark.unit
+def test_prepare_creates_all_partitions():
+    catalog = RecipeCatalog(recipes)
+    catalog.prepare()
+
+    assert set(catalog.partitions) == set(Diet)
+    assert all(partition.ingredient_indptr is not None for partition in catalog.partitions.values())
+    assert catalog.partition(Diet.NORMAL).rows_requiring(np.array([catalog.ingredients['Egg']])).tolist() == [0, 2]
+
+@pytest.mark.unit
+def test_deferred_watchers_are_only_started_on_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_module, 'deferred_watchers', None)
+    (tmp_path / 'bread.json').write_text('{"name": "Bread", "diets": ["normal"], "ingredients": {"Flour": 500}}')
+    watcher = CatalogWatcher(RecipeCatalog(recipes), on_change=lambda catalog: None, directory=str(tmp_path), interval=60)
+    threads = threading.active_count()
+
+    defer_watchers()
+    watcher.start()
+    assert threading.active_count() == threads
+
+    start_deferred_watchers()
+    assert threading.active_count() == threads + 1
+    assert catalog_module.deferred_watchers is None
+    watcher.stop()
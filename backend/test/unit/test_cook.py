@@ -0,0 +1,121 @@
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import OperationFailure
+
+from src.controllers.recipecontroller import RecipeController
+from src.util.dao import getDao
+
+def item(id: str, name: str, quantity: float, unit: str) -> dict:
+    return {'_id': {'$oid': id}, 'name': name, 'quantity': quantity, 'unit': unit}
+
+@pytest.mark.unit
+def test_plan_consumption_converts_units_and_consumes_in_order():
+    recipe = {'name': 'Pancakes', 'ingredients': {'Flour': '150 g', 'Milk': 100, 'Egg': 3}}
+    items = [item('a', 'Flour', 0.1, 'kg'), item('b', 'Flour', 100, 'g'), item('c', 'Milk', 1, 'l'), item('d', 'Egg', 2, 'piece')]
+
+    updates, consumed, missing = RecipeController.plan_consumption(recipe, items, servings=1)
+
+    assert [(entry['id'], entry['quantity']) for entry in consumed] == [('a', 0.1), ('b', pytest.approx(50)), ('c', pytest.approx(0.1)), ('d', 2)]
+    assert updates[0] == {'id': 'a', 'data': {'$inc': {'quantity': -0.1}}, 'filter': {'quantity': {'$gte': 0.1}}}
+    assert missing == [{'name': 'Egg', 'amount': 1}]
+
+@pytest.mark.unit
+def test_plan_consumption_scales_servings():
+    recipe = {'name': 'Omelette', 'ingredients': {'Egg': 4, 'Salt': 2}}
+
+    updates, consumed, missing = RecipeController.plan_consumption(recipe, [item('a', 'Egg', 12, 'piece')], servings=2)
+
+    assert [entry['quantity'] for entry in consumed] == [8]
+    assert missing == [{'name': 'Salt', 'amount': 4}]
+
+def add_items(*entries) -> dict:
+    created = getDao('item').create_many([{'name': name, 'quantity': quantity, 'unit': unit} for name, quantity, unit in entries])['created']
+    return {entry['name']: entry['_id']['$oid'] for entry in created}
+
+def quantities() -> dict:
+    return {entry['name']: entry['quantity'] for entry in getDao('item').find()}
+
+@pytest.mark.unit
+def test_atomic_bulk_update_reverts_increments_after_missed_guard(memory_storage):
+    ids = add_items(('Flour', 500.0, 'g'), ('Egg', 2.0, 'piece'))
+
+    result = getDao('item').bulk_update([
+        {'id': ids['Flour'], 'data': {'$inc': {'quantity': -150.0}}, 'filter': {'quantity': {'$gte': 150.0}}},
+        {'id': ids['Egg'], 'data': {'$inc': {'quantity': -3.0}}, 'filter': {'quantity': {'$gte': 3.0}}},
+    ], atomic=True)
+
+    assert (result['matched'], result['atomic'], result['aborted']) == (1, False, True)
+    assert quantities() == {'Flour': 500, 'Egg': 2}
+
+@pytest.mark.unit
+def test_atomic_bulk_update_applies_all_matching_increments(memory_storage):
+    ids = add_items(('Flour', 500.0, 'g'), ('Egg', 2.0, 'piece'))
+
+    result = getDao('item').bulk_update([
+        {'id': ids['Flour'], 'data': {'$inc': {'quantity': -150.0}}, 'filter': {'quantity': {'$gte': 150.0}}},
+        {'id': ids['Egg'], 'data': {'$inc': {'quantity': -2.0}}, 'filter': {'quantity': {'$gte': 2.0}}},
+    ], atomic=True)
+
+    assert (result['matched'], result['modified'], result['aborted']) == (2, 2, False)
+    assert quantities() == {'Flour': 350, 'Egg': 0}
+
+@pytest.mark.unit
+def test_cook_consumes_nothing_after_concurrent_change(memory_storage, monkeypatch):
+    ids = add_items(('Flour', 500.0, 'g'), ('Egg', 5.0, 'piece'))
+    plan = RecipeController.plan_consumption
+    def plan_and_take_eggs(*args, **kwargs):
+        planned = plan(*args, **kwargs)
+        getDao('item').update(ids['Egg'], {'$set': {'quantity': 1.0}})
+        return planned
+    monkeypatch.setattr(RecipeController, 'plan_consumption', staticmethod(plan_and_take_eggs))
+
+    result = RecipeController(items_dao=getDao('item')).cook('Pancakes', partial=True)
+
+    assert (result['cooked'], result['conflict'], result['consumed']) == (False, True, [])
+    assert quantities() == {'Flour': 500, 'Egg': 1}
+
+@pytest.mark.unit
+def test_cook_route(client):
+    add_items(('Flour', 500.0, 'g'), ('Egg', 5.0, 'piece'))
+
+    response = client.post('/recipes/cook', json={'recipe': 'Pancakes', 'partial': 'false'})
+    assert response.status_code == 409
+    assert (response.json['cooked'], response.json['conflict']) == (False, False)
+    assert quantities() == {'Flour': 500, 'Egg': 5}
+
+    response = client.post('/recipes/cook', json={'recipe': 'Pancakes', 'partial': True})
+    assert response.status_code == 200
+    assert [entry['quantity'] for entry in response.json['consumed']] == [3, 150]
+    assert quantities() == {'Flour': 350, 'Egg': 2}
+
+    assert client.post('/recipes/cook', json={'recipe': 'Pancakes', 'partial': 'sometimes'}).status_code == 400
+    assert client.post('/recipes/cook', json={'recipe': 'Omelette'}).status_code == 404
+
+@pytest.mark.unit
+def test_atomic_bulk_update_reverts_increments_after_database_failure(memory_storage, monkeypatch):
+    ids = add_items(('Flour', 500.0, 'g'), ('Egg', 5.0, 'piece'))
+    dao = getDao('item')
+    update_one = dao.collection.update_one
+    def fail_on_egg(filter, data, *args, **kwargs):
+        if filter['_id'] == ObjectId(ids['Egg']) and '$gte' in str(filter):
+            raise OperationFailure('connection reset')
+        return update_one(filter, data, *args, **kwargs)
+    monkeypatch.setattr(dao.collection, 'update_one', fail_on_egg)
+
+    with pytest.raises(OperationFailure):
+        dao.bulk_update([
+            {'id': ids['Flour'], 'data': {'$inc': {'quantity': -150.0}}, 'filter': {'quantity': {'$gte': 150.0}}},
+            {'id': ids['Egg'], 'data': {'$inc': {'quantity': -3.0}}, 'filter': {'quantity': {'$gte': 3.0}}},
+        ], atomic=True)
+
+    assert quantities() == {'Flour': 500, 'Egg': 5}
+
+@pytest.mark.unit
+def test_cook_without_any_available_ingredient_is_rejected(client):
+    add_items(('Rice', 500.0, 'g'))
+
+    response = client.post('/recipes/cook', json={'recipe': 'Pancakes', 'partial': True})
+
+    assert response.status_code == 409
+    assert (response.json['cooked'], response.json['consumed']) == (False, [])
+    assert quantities() == {'Rice': 500}
@@ -0,0 +1,94 @@
+import os
+import time
+import threading
+import pytest
+
+from src.util import dao
+from src.util.dao import PoolMonitor, getDao, getSetting
+
+@pytest.mark.unit
+def test_environment_takes_precedence_over_env_file(monkeypatch):
+    monkeypatch.setitem(dao.settings, '.env', {'SNAPSHOT_TTL': '5', 'MONGO_URL': 'mongodb://file'})
+    monkeypatch.setenv('SNAPSHOT_TTL', '1')
+
+    assert getSetting('SNAPSHOT_TTL') == '1'
+    assert getSetting('MONGO_URL') == 'mongodb://file'
+    assert getSetting('MISSING', 'default') == 'default'
+
+@pytest.mark.unit
+def test_pool_monitor_counts_connections():
+    monitor = PoolMonitor()
+    monitor.connection_created(None)
+    monitor.connection_created(None)
+    monitor.connection_checked_out(None)
+    monitor.connection_check_out_failed(None)
+    monitor.connection_closed(None)
+
+    assert monitor.stats() == {'open': 1, 'checked_out': 1, 'created': 2, 'failed_checkouts': 1}
+    monitor.reset()
+    assert monitor.stats() == {'open': 0, 'checked_out': 0, 'created': 0, 'failed_checkouts': 0}
+
+@pytest.mark.unit
+def test_health_reports_reachable_database(client):
+    response = client.get('/health')
+
+    assert response.status_code == 200
+    assert response.json['database'] is True
+    assert set(response.json['pool']) == {'max_size', 'open', 'checked_out', 'created', 'failed_checkouts'}
+
+@pytest.mark.unit
+def test_health_reports_unreachable_database(client, monkeypatch):
+    def unreachable():
+        raise ConnectionError('no server')
+    monkeypatch.setenv('STORAGE_BACKEND', 'mongodb')
+    monkeypatch.setattr(dao, 'getClient', unreachable)
+
+    assert client.get('/health').status_code == 503
+
+@pytest.mark.unit
+def test_child_does_not_inherit_held_locks(memory_storage):
+    items = getDao('item')
+    held, release = threading.Event(), threading.Event()
+    def hold():
+        with dao.clients_lock, items.lock:
+            held.set()
+            release.wait()
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+
+    pid = os.fork()
+    if pid == 0:
+        # the child only continues if resetClients replaced the held locks
+        with dao.clients_lock:
+            items.collection
+        os._exit(0)
+    try:
+        deadline = time.monotonic() + 10
+        while (status := os.waitpid(pid, os.WNOHANG)) == (0, 0):
+            if time.monotonic() > deadline:
+                os.kill(pid, 9)
+                pytest.fail('the child process deadlocked')
+            time.sleep(0.01)
+        assert os.waitstatus_to_exitcode(status[1]) == 0
+    finally:
+        release.set()
+        thread.join()
+
+@pytest.mark.unit
+def test_scoped_daos_are_not_kept(memory_storage):
+    for pantry_id in ['a', 'b', 'c']:
+        assert getDao('item', pantry_id=pantry_id).collection is getDao('item').collection
+
+    assert list(dao.daos) == ['item']
+
+@pytest.mark.unit
+def test_scoped_write_invalidates_snapshot_of_collection(memory_storage):
+    items = getDao('item')
+    assert items.versioned_snapshot()[0] == []
+    version = items.snapshot_version()
+
+    getDao('item', pantry_id='kitchen').create({'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'})
+
+    assert items.snapshot_version() > version
+    assert [item['name'] for item in items.versioned_snapshot()[0]] == ['Flour']
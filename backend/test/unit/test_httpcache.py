@@ -0,0 +1,41 @@
+import pytest
+
+from werkzeug.datastructures import ETags
+
+from src.util.cache import LRUCache
+from src.util.dao import SnapshotCache
+from src.util.httpcache import ResponseCache
+
+@pytest.mark.unit
+def test_etag_changes_with_versions_and_parameters():
+    cache = ResponseCache(max_bytes=1024, ttl=60, cache_control='no-cache')
+    etag = cache.etag('items', ('item', 1), [('limit', '5')])
+
+    assert cache.etag('items', ('item', 1), [('limit', '5')]) == etag
+    assert cache.etag('items', ('item', 2), [('limit', '5')]) != etag
+    assert cache.etag('items', ('item', 1), [('limit', '6')]) != etag
+    assert cache.matches(ETags([etag]), etag) and not cache.matches(ETags(['other']), etag)
+
+    cache.reset()
+    assert cache.etag('items', ('item', 1), [('limit', '5')]) != etag
+
+@pytest.mark.unit
+def test_bodies_are_evicted_by_size():
+    cache = LRUCache(10, weigh=len)
+    cache.put('a', b'12345')
+    cache.put('b', b'123456')
+    cache.put('c', b'12345678901')
+
+    assert cache.get('a') is None and cache.get('b') == b'123456' and cache.get('c') is None
+    assert cache.stats()['weight'] == 6
+
+@pytest.mark.unit
+def test_invalidate_pantry_changes_collection_version():
+    cache = SnapshotCache(ttl=60)
+
+    cache.get('item', lambda: ['Flour', 'Salt'])
+    version = cache.version('item')
+    cache.invalidate('item/a')
+
+    assert cache.version('item') > version
+    assert cache.get('item', lambda: ['Sugar']) == ['Sugar']
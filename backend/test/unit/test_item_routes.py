@@ -0,0 +1,88 @@
+import json
+import pytest
+
+from src.util.dao import getDao
+from src.controllers.controller import Controller
+
+def create_items(client, names: list[str]):
+    for name in names:
+        client.post('/items/create', data={'name': name, 'quantity': '100', 'unit': 'gram'})
+
+@pytest.mark.unit
+def test_iter_find_fetches_all_batches(client):
+    create_items(client, ['Flour', 'Sugar', 'Salt'])
+
+    items = list(getDao('item').iter_find(batch_size=2))
+
+    assert [item['name'] for item in items] == ['Flour', 'Sugar', 'Salt']
+
+@pytest.mark.unit
+@pytest.mark.parametrize('stream', ['ndjson', 'json'])
+def test_stream_lists_all_items(client, stream):
+    create_items(client, ['Flour', 'Sugar', 'Salt'])
+
+    response = client.get(f'/items/all?stream={stream}&batch_size=1')
+
+    body = response.get_data(as_text=True)
+    items = [json.loads(line) for line in body.splitlines()] if stream == 'ndjson' else json.loads(body)
+    assert response.status_code == 200
+    assert [item['name'] for item in items] == ['Flour', 'Sugar', 'Salt']
+
+@pytest.mark.unit
+def test_stream_of_empty_collection(client):
+    assert client.get('/items/all?stream=json').get_data(as_text=True) == '[]'
+    assert client.get('/items/all?stream=ndjson').get_data(as_text=True) == ''
+
+@pytest.mark.unit
+def test_stream_failing_before_first_item(client, monkeypatch):
+    def iter_all(self, **kwargs):
+        raise ConnectionError('database unavailable')
+        yield
+    monkeypatch.setattr(Controller, 'iter_all', iter_all)
+
+    assert client.get('/items/all?stream=ndjson').status_code == 500
+
+@pytest.mark.unit
+def test_stream_failing_after_first_item(client, monkeypatch):
+    def iter_all(self, **kwargs):
+        yield {'name': 'Flour'}
+        raise ConnectionError('database unavailable')
+    monkeypatch.setattr(Controller, 'iter_all', iter_all)
+
+    ndjson = client.get('/items/all?stream=ndjson').get_data(as_text=True).splitlines()
+    array = client.get('/items/all?stream=json').get_data(as_text=True)
+
+    assert json.loads(ndjson[-1]) == {'error': 'Unknown server error'}
+    assert array == '[{"name": "Flour"}'
+
+@pytest.mark.unit
+def test_pages_continue_at_cursor(client):
+    create_items(client, ['Flour', 'Sugar', 'Salt', 'Yeast', 'Butter'])
+
+    names, after = [], None
+    while True:
+        response = client.get('/items/all?limit=2' + (f'&after={after}' if after else ''))
+        names += [item['name'] for item in response.json]
+        after = response.headers.get('X-Next-Cursor')
+        if after is None:
+            break
+
+    assert names == ['Flour', 'Sugar', 'Salt', 'Yeast', 'Butter']
+
+    first_page = getDao('item').find(limit=3)
+    rest = getDao('item').find(after=first_page[-1]['_id']['$oid'], limit=5)
+    assert [item['name'] for item in rest] == ['Yeast', 'Butter']
+
+@pytest.mark.unit
+@pytest.mark.parametrize('query', ['after=abc', 'limit=0', 'limit=x', 'min_quantity=many', 'batch_size=0', 'stream=xml'])
+def test_listing_rejects_invalid_parameters(client, query):
+    assert client.get(f'/items/all?{query}').status_code == 400
+
+@pytest.mark.unit
+def test_listing_filters_by_name_prefix_and_quantity(client):
+    create_items(client, ['Flour', 'Flax Seeds', 'Sugar'])
+    client.post('/items/create', data={'name': 'Flakes', 'quantity': '10', 'unit': 'gram'})
+
+    assert [item['name'] for item in client.get('/items/all?name=Fl').json] == ['Flour', 'Flax Seeds', 'Flakes']
+    assert [item['name'] for item in client.get('/items/all?name=Fl&min_quantity=50').json] == ['Flour', 'Flax Seeds']
+    assert client.get('/items/all?name=F.').json == []
@@ -0,0 +1,88 @@
+import pytest
+from pymongo.errors import BulkWriteError, WriteError
+from bson.objectid import ObjectId
+
+from src.util import dao, memorydb
+from src.util.dao import getSchemaValidator, getIndexes
+from src.util.memorydb import MemoryCollection
+
+def item_collection(log_path: str = None) -> MemoryCollection:
+    return MemoryCollection('item', getSchemaValidator('item'), getIndexes('item'), log_path)
+
+@pytest.mark.unit
+def test_validator_is_enforced():
+    collection = item_collection()
+
+    with pytest.raises(BulkWriteError) as error:
+        collection.insert_many([{'name': 'Flour', 'quantity': 1.0, 'unit': 'kg'}, {'name': 'Sugar', 'quantity': 'a lot', 'unit': 'g'}, {'name': 'Salt', 'unit': 'g'}], ordered=False)
+    assert [write_error['index'] for write_error in error.value.details['writeErrors']] == [1, 2]
+    assert 'quantity' in error.value.details['writeErrors'][0]['errmsg']
+
+    with pytest.raises(WriteError):
+        collection.update_one({'name': 'Flour'}, {'$set': {'quantity': 'none'}})
+    assert collection.find_one({'name': 'Flour'})['quantity'] == 1.0
+
+@pytest.mark.unit
+def test_filters_use_indexes():
+    collection = item_collection()
+    ids = collection.insert_many([{'name': name, 'quantity': float(quantity), 'unit': 'g', 'pantry_id': pantry_id} for name, quantity, pantry_id in [('Flour', 500, 'a'), ('Sugar', 200, 'a'), ('Flour', 100, 'b')]]).inserted_ids
+
+    assert [document['quantity'] for document in collection.find({'name': 'Flour', 'pantry_id': 'b'})] == [100.0]
+    assert len(collection.candidates({'pantry_id': 'a', 'quantity': {'$gt': 300}})) == 2
+    assert [document['name'] for document in collection.find({'pantry_id': 'a', 'quantity': {'$gt': 300}})] == ['Flour']
+    assert [document['_id'] for document in collection.find({'_id': {'$in': [ids[2], ObjectId()]}})] == [ids[2]]
+    assert [document['name'] for document in collection.find({'name': {'$regex': '^s', '$options': 'i'}}, ['name'])] == ['Sugar']
+
+@pytest.mark.unit
+def test_dao_on_memory_storage(monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'memory')
+    monkeypatch.setattr(memorydb, 'memory_collections', {})
+    monkeypatch.setattr(dao, 'daos', {})
+
+    items = dao.getDao('item', pantry_id='a')
+    created = items.create_many([{'name': 'Flour', 'quantity': 500.0, 'unit': 'g'}, {'name': 'Egg', 'quantity': 6.0, 'unit': 'piece'}])['created']
+    dao.getDao('item').create({'name': 'Milk', 'quantity': 1.0, 'unit': 'l'})
+    result = items.bulk_update([{'id': created[0]['_id']['$oid'], 'data': {'$inc': {'quantity': -200.0}}, 'filter': {'quantity': {'$gte': 200.0}}}])
+
+    assert result == {'matched': 1, 'modified': 1, 'errors': []}
+    assert [(item['name'], item['quantity']) for item in items.find(filter={'_id': [item['_id'] for item in created]}, toid=['_id'])] == [('Flour', 300.0), ('Egg', 6.0)]
+    assert len(dao.getDao('item').find()) == 3
+
+@pytest.mark.unit
+def test_log_is_replayed(tmp_path):
+    log_path = str(tmp_path / 'item.jsonl')
+    collection = item_collection(log_path)
+    flour = collection.insert_one({'name': 'Flour', 'quantity': 500.0, 'unit': 'g'}).inserted_id
+    sugar = collection.insert_one({'name': 'Sugar', 'quantity': 200.0, 'unit': 'g'}).inserted_id
+    collection.update_one({'_id': flour}, {'$inc': {'quantity': -100.0}})
+    collection.delete_one({'_id': sugar})
+
+    restored = item_collection(log_path)
+
+    assert list(restored.find()) == [{'_id': flour, 'name': 'Flour', 'quantity': 400.0, 'unit': 'g'}]
+    assert len(open(log_path).readlines()) == 1
+
+@pytest.mark.unit
+def test_torn_last_line_of_log_is_dropped(tmp_path):
+    log_path = str(tmp_path / 'item.jsonl')
+    flour = item_collection(log_path).insert_one({'name': 'Flour', 'quantity': 500.0, 'unit': 'g'}).inserted_id
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "document": {"_id": {"$oid"')
+
+    restored = item_collection(log_path)
+    restored.insert_one({'name': 'Sugar', 'quantity': 200.0, 'unit': 'g'})
+
+    assert [document['name'] for document in item_collection(log_path).find()] == ['Flour', 'Sugar']
+    assert restored.find_one({'_id': flour})['quantity'] == 500.0
+
+@pytest.mark.unit
+def test_malformed_line_within_log_is_reported(tmp_path):
+    log_path = str(tmp_path / 'item.jsonl')
+    item_collection(log_path).insert_one({'name': 'Flour', 'quantity': 500.0, 'unit': 'g'})
+    with open(log_path, 'r+', encoding='utf-8') as f:
+        content = f.read()
+        f.seek(0)
+        f.write('{"op": "put"\n' + content)
+
+    with pytest.raises(ValueError):
+        item_collection(log_path)
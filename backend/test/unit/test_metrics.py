@@ -0,0 +1,103 @@
+import os
+import pstats
+import asyncio
+import pytest
+from flask import Flask
+
+from src.util import metrics
+from src.util.metrics import Histogram, Counter
+from src.util.dao import DAO, getDao
+from src.controllers.recipecontroller import RecipeController
+
+@pytest.mark.unit
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0))
+    for value in [0.05, 0.5, 0.5, 2.0]:
+        histogram.observe(value, '/recipes/')
+
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{route="/recipes/",le="0.1"} 1',
+        'latency_seconds_bucket{route="/recipes/",le="1.0"} 3',
+        'latency_seconds_bucket{route="/recipes/",le="+Inf"} 4',
+        'latency_seconds_sum{route="/recipes/"} 3.05',
+        'latency_seconds_count{route="/recipes/"} 4'
+    ]
+
+@pytest.mark.unit
+def test_counter_escapes_labels():
+    counter = Counter('documents_total', 'Documents', ['collection'])
+    counter.inc(2, 'item "a"')
+
+    assert counter.render()[2:] == ['documents_total{collection="item \\"a\\""} 2']
+
+class Source:
+    def __init__(self):
+        self.observed = []
+
+    def items(self, count):
+        yield from range(count)
+
+    async def async_items(self, count):
+        for item in range(count):
+            yield item
+
+    async def total(self, count):
+        return list(range(count))
+
+def record(source, duration, result):
+    source.observed.append((duration >= 0, result))
+
+@pytest.mark.unit
+def test_wrap_counts_the_items_of_generators():
+    source = Source()
+    items, async_items, total = metrics.wrap(Source.items, record), metrics.wrap(Source.async_items, record), metrics.wrap(Source.total, record)
+
+    assert list(items(source, 3)) == [0, 1, 2]
+    assert next(items(source, 5)) == 0
+    async def consume():
+        return [item async for item in async_items(source, 2)], await total(source, 4)
+    assert asyncio.run(consume()) == ([0, 1], [0, 1, 2, 3])
+
+    # the abandoned generator is only observed once it is closed
+    assert source.observed[:1] + source.observed[-2:] == [(True, 3), (True, 2), (True, [0, 1, 2, 3])]
+    assert [metrics.count_documents(result) for duration, result in source.observed[-2:]] == [2, 4]
+
+@pytest.mark.unit
+def test_instrumented_requests_record_metrics_and_profiles(client, monkeypatch, tmp_path):
+    # the instrumentation replaces the methods of the classes, which are restored after the test
+    for cls, names in [(DAO, metrics.DAO_METHODS), (RecipeController, ['get_top_recipes'])]:
+        for name in names:
+            monkeypatch.setattr(cls, name, getattr(cls, name))
+    metrics.instrument_dao(DAO, metrics.DAO_METHODS)
+    metrics.instrument_controller(RecipeController, ['get_top_recipes'])
+    monkeypatch.setenv('PROFILE_DIRECTORY', str(tmp_path))
+
+    from src.blueprints.itemblueprint import item_blueprint
+    from src.blueprints.recipeblueprint import recipe_blueprint
+    app = Flask('instrumented')
+    app.register_blueprint(item_blueprint, url_prefix='/items')
+    app.register_blueprint(recipe_blueprint, url_prefix='/recipes')
+    metrics.install(app)
+    instrumented = app.test_client()
+
+    getDao('item').create_many([{'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'}, {'name': 'Egg', 'quantity': 6.0, 'unit': 'piece'}])
+    snapshots = metrics.dao_duration.series.get(('item', 'versioned_snapshot'), [[0], 0.0])[0]
+
+    response = instrumented.get('/recipes/top', headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    assert os.path.dirname(response.headers['X-Profile-File']) == str(tmp_path)
+    assert pstats.Stats(response.headers['X-Profile-File']).total_calls > 0
+
+    streamed = metrics.dao_documents.values.get(('item', 'iter_find'), 0)
+    response = instrumented.get('/items/all?stream=ndjson')
+    assert len(response.data.splitlines()) == 2
+    assert 'X-Profile-File' not in response.headers
+
+    assert metrics.dao_documents.values[('item', 'iter_find')] == streamed + 2
+    assert sum(metrics.dao_duration.series[('item', 'versioned_snapshot')][0]) > sum(snapshots)
+    assert ('RecipeController', 'get_top_recipes') in metrics.controller_duration.series
+    assert ('GET', '/recipes/top', 200) in metrics.request_duration.series
+
+    exported = client.get('/metrics').data.decode()
+    assert 'tinychef_request_duration_seconds_count{method="GET",route="/items/all",status="200"}' in exported
+    assert 'tinychef_dao_documents_total{collection="item",method="versioned_snapshot"}' in exported
@@ -0,0 +1,44 @@
+import pytest
+
+from src.util.calculator import calculate_readiness
+from src.util.catalog import RecipeCatalog
+from src.util.pantry import PantryView, normalize_name
+
+@pytest.mark.unit
+def test_pantry_view_aggregates_normalized_names():
+    pantry = PantryView.of([
+        {'name': 'Flour', 'quantity': 0.5, 'unit': 'kg'},
+        {'name': ' flour ', 'quantity': 250, 'unit': 'g'},
+        {'name': 'Baking  Powder', 'quantity': 10, 'unit': 'g'},
+        {'name': 'Salt', 'quantity': 0, 'unit': 'g'}
+    ], minimum_quantity=0)
+
+    assert pantry['FLOUR'] == 750
+    assert pantry.get('baking powder') == 10
+    assert 'Salt' not in pantry
+    assert len(pantry) == 2
+    assert normalize_name('  Baking \t Powder ') == 'baking powder'
+    with pytest.raises(TypeError):
+        pantry['Flour'] = 1
+
+@pytest.mark.unit
+def test_readiness_of_pantry_view_matches_catalog():
+    recipes = [{'name': 'Bread', 'diets': ['normal'], 'ingredients': {'Flour': 500, 'Yeast': 1, 'Sea Salt': 10}}]
+    pantry = PantryView({'flour': 200, 'Flour ': 50, 'sea  salt': 10})
+
+    assert calculate_readiness(recipes[0], pantry) == pytest.approx(0.5)
+    assert RecipeCatalog(recipes).readiness(pantry)[0] == pytest.approx(0.5)
+
+@pytest.mark.unit
+def test_pantry_view_does_not_sum_different_dimensions():
+    butter = {'name': 'butter', 'quantity': 2, 'unit': 'piece'}
+    pantry = PantryView.of([
+        {'name': 'Butter', 'quantity': 0.25, 'unit': 'kg'},
+        butter,
+        {'name': 'Butter', 'quantity': 50, 'unit': 'g'},
+        {'name': 'Milk', 'quantity': 1, 'unit': 'l'}
+    ])
+
+    assert pantry['Butter'] == 300
+    assert pantry['Milk'] == 1000
+    assert pantry.mismatched == [butter]
@@ -0,0 +1,15 @@
+import pytest
+
+@pytest.mark.unit
+@pytest.mark.parametrize('k', ['abc', '0', '-1', ''])
+def test_top_rejects_invalid_k(client, k):
+    assert client.get(f'/recipes/top?k={k}').status_code == 400
+
+@pytest.mark.unit
+def test_top_defaults_to_five_recipes(client):
+    client.post('/items/create', data={'name': 'Flour', 'quantity': '500', 'unit': 'gram'})
+
+    response = client.get('/recipes/top')
+
+    assert response.status_code == 200
+    assert 0 < len(response.json['recipes']) <= 5
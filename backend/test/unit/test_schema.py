@@ -0,0 +1,33 @@
+import pytest
+
+from src.util.dao import getSchemaValidator
+from src.util.schema import SchemaValidator, ValidationError
+
+@pytest.mark.unit
+def test_errors_name_offending_fields():
+    validator = getSchemaValidator('item')
+
+    assert validator.errors({'name': 'Flour', 'quantity': 1.0, 'unit': 'kg'}) == []
+    assert validator.errors({'name': 'Flour', 'quantity': True, 'pantry_id': 3}) == ['unit is required', 'quantity must be of type double', 'pantry_id must be of type string']
+    with pytest.raises(ValidationError) as error:
+        validator.validate({'name': 'Flour', 'quantity': 1, 'unit': 'kg'})
+    assert error.value.errors == ['quantity must be of type double']
+
+@pytest.mark.unit
+def test_nested_schema():
+    validator = SchemaValidator({'$jsonSchema': {'bsonType': 'object', 'additionalProperties': False, 'properties': {
+        'tags': {'bsonType': 'array', 'items': {'bsonType': 'string', 'maxLength': 5}},
+        'size': {'bsonType': 'object', 'required': ['value'], 'properties': {'value': {'bsonType': 'int', 'minimum': 1}}}
+    }}})
+
+    assert validator.errors({'tags': ['a', 'toolong', 1], 'size': {'value': 0}, 'color': 'red'}) == [
+        'tags.1 must contain between 0 and 5 characters', 'tags.2 must be of type string', 'size.value must be at least 1', 'color is not allowed']
+
+@pytest.mark.unit
+def test_coercion_and_updates():
+    validator = getSchemaValidator('item')
+
+    assert validator.coerce({'name': 'Flour', 'quantity': '1.5', 'unit': 'kg', 'note': '2'}) == {'name': 'Flour', 'quantity': 1.5, 'unit': 'kg', 'note': '2'}
+    assert validator.coerce({'quantity': 'much'}) == {'quantity': 'much'}
+    assert validator.coerce_update({'$set': {'quantity': 2}, '$inc': {'quantity': 1}}) == {'$set': {'quantity': 2.0}, '$inc': {'quantity': 1}}
+    assert validator.update_errors({'$set': {'quantity': 'much'}, '$inc': {'quantity': 1}, '$unset': {'unit': ''}}) == ['quantity must be of type double', 'unit is required']
@@ -0,0 +1,24 @@
+import pytest
+import numpy as np
+
+from src.util.selection import select_top_k, sample_weighted
+
+@pytest.mark.unit
+def test_select_top_k():
+    scores = np.array([0.2, 0.9, 0.5, 0.7, 0.1])
+
+    assert select_top_k(scores, 3).tolist() == [1, 3, 2]
+
+@pytest.mark.unit
+def test_select_top_k_more_than_available():
+    scores = np.array([0.2, 0.9])
+
+    assert select_top_k(scores, 5).tolist() == [1, 0]
+
+@pytest.mark.unit
+def test_sample_weighted_without_replacement():
+    scores = np.array([0.2, 0.9, 0.5, 0.7, 0.1])
+
+    selected = sample_weighted(scores, 5, np.random.default_rng(0))
+
+    assert sorted(selected.tolist()) == [0, 1, 2, 3, 4]
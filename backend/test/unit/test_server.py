@@ -0,0 +1,16 @@
+import runpy
+import pytest
+
+from src.util import catalog
+
+@pytest.mark.unit
+@pytest.mark.parametrize('server, application', [('wsgi', 'wsgi:create_app()'), ('asgi', 'asgi:app')])
+def test_gunicorn_creates_the_application_once(server, application, monkeypatch):
+    monkeypatch.setenv('SERVER', server)
+    # the configuration defers the catalog watchers of this process, which is undone after the test
+    monkeypatch.setattr(catalog, 'deferred_watchers', None)
+    config = runpy.run_path('gunicorn.conf.py')
+
+    assert config['wsgi_app'] == application
+    assert config['preload_app']
+    assert catalog.deferred_watchers == []
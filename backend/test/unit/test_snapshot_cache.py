@@ -0,0 +1,92 @@
+import pytest
+
+from src.util.dao import SnapshotCache
+
+@pytest.mark.unit
+def test_snapshot_is_reused():
+    cache = SnapshotCache(ttl=60)
+    loads = []
+
+    cache.get('item', lambda: loads.append(1) or ['Flour'])
+    snapshot = cache.get('item', lambda: loads.append(1) or ['Sugar'])
+
+    assert snapshot == ['Flour']
+    assert len(loads) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+@pytest.mark.unit
+def test_invalidate_reloads_snapshot():
+    cache = SnapshotCache(ttl=60)
+
+    cache.get('item', lambda: ['Flour'])
+    cache.invalidate('item')
+    snapshot = cache.get('item', lambda: ['Sugar'])
+
+    assert snapshot == ['Sugar']
+
+@pytest.mark.unit
+def test_expired_snapshot_is_reloaded():
+    cache = SnapshotCache(ttl=0)
+
+    cache.get('item', lambda: ['Flour'])
+    snapshot = cache.get('item', lambda: ['Sugar'])
+
+    assert snapshot == ['Sugar']
+
+@pytest.mark.unit
+def test_invalidate_collection_reloads_pantries():
+    cache = SnapshotCache(ttl=60)
+
+    cache.get('item/a', lambda: ['Flour'])
+    cache.get('item/b', lambda: ['Salt'])
+    version = cache.version('item/b')
+    cache.invalidate('item/a')
+
+    assert cache.get('item/b', lambda: ['Sugar']) == ['Salt']
+    assert cache.version('item/b') == version
+
+    cache.invalidate('item')
+
+    assert cache.get('item/b', lambda: ['Sugar']) == ['Sugar']
+    assert cache.version('item/b') > version
+
+@pytest.mark.unit
+def test_versioned_snapshot_changes_version_on_expiry():
+    cache = SnapshotCache(ttl=60)
+
+    snapshot, version = cache.get_versioned('item', lambda: ['Flour'])
+    assert cache.get_versioned('item', lambda: ['Sugar']) == (['Flour'], version)
+
+    cache.ttl = 0
+    snapshot, expired_version = cache.get_versioned('item', lambda: ['Sugar'])
+    assert snapshot == ['Sugar']
+    assert expired_version > version
+
+@pytest.mark.unit
+def test_snapshot_loaded_during_invalidation_keeps_previous_version():
+    cache = SnapshotCache(ttl=60)
+    version = cache.version('item')
+
+    def load():
+        cache.invalidate('item')
+        return ['Flour']
+    snapshot, loaded_version = cache.get_versioned('item', load)
+
+    assert snapshot == ['Flour']
+    assert loaded_version == version < cache.version('item')
+
+@pytest.mark.unit
+def test_least_recently_used_parts_are_forgotten():
+    cache = SnapshotCache(ttl=60, max_parts=2)
+    cache.get('item/a', lambda: ['Flour'])
+    version = cache.version('item/a')
+    # a snapshot of the first part which is loaded while the part is forgotten must not be stored
+    found, snapshot, loaded_version, generation = cache.lookup('item/a', 'name')
+
+    cache.get('item/b', lambda: ['Salt'])
+    cache.get('item/c', lambda: ['Sugar'])
+
+    assert sorted(cache.stats()['collections']) == ['item/b', 'item/c']
+    assert cache.store('item/a', 'name', generation, 0, ['Flour']) is None
+    assert cache.get('item/a', lambda: ['Yeast']) == ['Yeast']
+    assert cache.version('item/a') > version
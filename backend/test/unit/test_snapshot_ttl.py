@@ -0,0 +1,51 @@
+import time
+import pytest
+
+from src.util import memorydb
+from src.util.dao import getDao, snapshot_cache
+from src.controllers.recipecontroller import RecipeController
+from src.static.diets import Diet
+
+@pytest.fixture
+def short_ttl(memory_storage, monkeypatch):
+    """Let snapshots expire after 0.2 seconds."""
+    monkeypatch.setattr(snapshot_cache, 'ttl', 0.2)
+
+def insert_flour():
+    # bypass the data access object, like another process does, such that the snapshot is not invalidated
+    memorydb.getMemoryCollection('item').insert_one({'name': 'Flour', 'quantity': 500.0, 'unit': 'gram'})
+
+@pytest.mark.unit
+def test_readiness_follows_expired_snapshot(short_ttl):
+    controller = RecipeController(items_dao=getDao('item'))
+    assert controller.get_top_recipes(diet=Diet.NORMAL, k=5) == []
+
+    insert_flour()
+    assert controller.get_top_recipes(diet=Diet.NORMAL, k=5) == []
+
+    time.sleep(0.25)
+    assert len(controller.get_top_recipes(diet=Diet.NORMAL, k=5)) > 0
+
+@pytest.mark.unit
+def test_top_recipes_etag_follows_expired_snapshot(short_ttl, client):
+    response = client.get('/recipes/top')
+    assert response.json['recipes'] == []
+    assert client.get('/recipes/top', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    insert_flour()
+    time.sleep(0.25)
+
+    revalidated = client.get('/recipes/top', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 200
+    assert len(revalidated.json['recipes']) > 0
+
+@pytest.mark.unit
+def test_available_items_follow_expired_snapshot(short_ttl):
+    controller = RecipeController(items_dao=getDao('item'))
+    assert 'Flour' not in controller.get_available_items()
+
+    insert_flour()
+    assert 'Flour' not in controller.get_available_items()
+
+    time.sleep(0.25)
+    assert controller.get_available_items()['Flour'] == 500
@@ -0,0 +1,34 @@
+import pytest
+
+from src.util.calculator import calculate_readiness
+from src.util.catalog import RecipeCatalog
+from src.util.units import to_base_unit, parse_amount
+
+@pytest.mark.unit
+@pytest.mark.parametrize('quantity, unit, expected', [
+    (1, 'kilogram', (1000, 'gram')),
+    (2, 'KG', (2000, 'gram')),
+    (0.5, 'liters', (500, 'milliliter')),
+    (3, 'pack', (3, 'piece')),
+    (4, 'handful', (4, 'handful'))
+])
+def test_to_base_unit(quantity, unit, expected):
+    assert to_base_unit(quantity, unit) == expected
+
+@pytest.mark.unit
+@pytest.mark.parametrize('amount, expected', [
+    (150, 150),
+    ('1.5 kg', 1500),
+    ('2', 2),
+    ({'quantity': 2, 'unit': 'tablespoons'}, 2 * 14.78676478125)
+])
+def test_parse_amount(amount, expected):
+    assert parse_amount(amount) == pytest.approx(expected)
+
+@pytest.mark.unit
+def test_readiness_of_units():
+    recipe = {'name': 'Bread', 'diets': ['normal'], 'ingredients': {'Flour': '0.5 kg', 'Water': {'quantity': 0.3, 'unit': 'liter'}}}
+    available_items = {'Flour': to_base_unit(1, 'kilogram')[0], 'Water': to_base_unit(150, 'milliliter')[0]}
+
+    assert calculate_readiness(recipe, available_items) == pytest.approx(0.75)
+    assert RecipeCatalog([recipe]).readiness(available_items).tolist() == [calculate_readiness(recipe, available_items)]
@@ -0,0 +1,14 @@
+# coding=utf-8
+from flask import Flask
+
+def create_app() -> Flask:
+    """Create the backend as a WSGI application for a pre-forking server, e.g., `gunicorn --config gunicorn.conf.py` (see gunicorn.conf.py). The application is created once in the master process, which also prepares the recipe catalog and its indexes, such that all worker processes share them instead of creating their own copies. Clients of the database are only created in the workers after forking (see resetClients).
+
+    returns:
+      app -- the Flask application"""
+    from main import app
+    from src.blueprints.recipeblueprint import controller
+
+    # the catalog is memory-mapped from its snapshot, and its partitions are created before forking such that the workers share them copy-on-write
+    controller.catalog.prepare()
+    return app